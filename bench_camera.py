@@ -0,0 +1,41 @@
+import argparse
+import time
+from camera_utils_updated import Camera
+
+
+def run(enable_depth, duration, width, height):
+    """Captures for duration seconds, returns get_capture_stats() per camera and the startup time (s)."""
+    camera = Camera(width, height, enable_depth=enable_depth)
+    camera.start_capture()
+    time.sleep(1.0)  # Auto exposure settles, the first frames come in bursts
+    for cam_type in camera.pipelines:
+        camera.frame_counts[cam_type] = 0
+        camera.depth_counts[cam_type] = 0
+        camera.depth_skipped[cam_type] = 0
+        camera.dropped[cam_type] = 0
+        camera.align_time[cam_type] = 0.0
+        camera.view_time[cam_type] = 0.0
+    camera._capture_started_at = time.perf_counter()
+    time.sleep(duration)
+    stats = camera.get_capture_stats()
+    camera.close()
+    return stats, camera.startup_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Color/depth capture throughput of the registered cameras.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    for enable_depth in (False, True):
+        stats, startup_time = run(enable_depth, args.duration, args.width, args.height)
+        print(f"depth={'on ' if enable_depth else 'off'} startup of {len(stats)} cameras: {startup_time:.2f} s")
+        for cam_type, s in stats.items():
+            line = f"depth={'on ' if enable_depth else 'off'} {cam_type:5s}: color {s['fps']:5.1f} fps, " \
+                   f"dropped {s['dropped']}, timeouts {s['timeouts']}"
+            if enable_depth:
+                line += f", depth {s['depth_fps']:5.1f} fps, skipped {s['depth_skipped']}, " \
+                        f"align {s['mean_align_ms']:.1f} ms"
+            print(line)
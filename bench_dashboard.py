@@ -0,0 +1,47 @@
+import argparse
+import threading
+import time
+import numpy as np
+from dobot_emulator import DobotEmulator
+from dashboard_client import DashboardClient
+
+QUERIES = [("GetPose",), ("GetAngle",), ("RobotMode",), ("InverseSolution", 400, 0, 200, 180, 0, 0, 0, 1)]
+
+
+def run(client, n_threads, duration):
+    """n_threads callers issue blocking queries for duration seconds, returns per-query latencies."""
+    latencies = [[] for _ in range(n_threads)]
+    stop_at = time.perf_counter() + duration
+
+    def worker(i):
+        k = i
+        while time.perf_counter() < stop_at:
+            name, *args = QUERIES[k % len(QUERIES)]
+            start = time.perf_counter()
+            getattr(client, name)(*args)
+            latencies[i].append(time.perf_counter() - start)
+            k += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.concatenate([np.asarray(lat) for lat in latencies])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard queries/s and latency against the emulator.")
+    parser.add_argument("--latency", type=float, default=0.002, help="Emulated reply latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0005)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with DobotEmulator(latency=args.latency, jitter=args.jitter) as emulator:
+        for max_in_flight in (1, args.threads):
+            client = DashboardClient("127.0.0.1", emulator.dashboard_port, max_in_flight=max_in_flight)
+            lat = run(client, args.threads, args.duration)
+            client.close()
+            print(f"max_in_flight={max_in_flight:2d}: {len(lat) / args.duration:8.0f} queries/s, "
+                  f"p50 {np.percentile(lat, 50) * 1000:6.2f} ms, p99 {np.percentile(lat, 99) * 1000:6.2f} ms")
@@ -0,0 +1,82 @@
+import argparse
+import multiprocessing
+import threading
+import time
+import numpy as np
+from dobot_emulator import DobotEmulator
+from robot_manager import RobotManager
+
+
+def serve_emulators(n_arms, latency, jitter, conn):
+    """Runs the emulators in their own process so they don't share the GIL with the manager."""
+    emulators = [DobotEmulator(dashboard_port=0, move_port=0, feedback_port=0, latency=latency, jitter=jitter,
+                               enable_delay=0.1) for _ in range(n_arms)]
+    for emulator in emulators:
+        emulator.start()
+    conn.send([(e.dashboard_port, e.move_port, e.feedback_port) for e in emulators])
+    conn.recv()
+    for emulator in emulators:
+        emulator.stop()
+
+
+def run(n_arms, rate_hz, duration, latency, jitter):
+    """Streams a ServoP circle to n_arms emulated arms from one control loop.
+
+    Returns per-arm mean/max submit-to-reply latency, feedback age percentiles and the
+    thread count of this process.
+    """
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve_emulators, args=(n_arms, latency, jitter, child_conn), daemon=True)
+    server.start()
+    manager = RobotManager()
+    for i, ports in enumerate(conn.recv()):
+        manager.add_robot(f"arm{i}", "127.0.0.1", *ports)
+    manager.connect()
+
+    arms = list(manager.arms.values())
+    pose_buf = np.empty(6)
+    angles_buf = np.empty(6)
+    ages = []
+    period = 1.0 / rate_hz
+    start = time.perf_counter()
+    next_tick = start
+    while next_tick - start < duration:
+        phase = 2 * np.pi * (next_tick - start) / 4.0
+        for arm in arms:
+            arm.send_actions(400 + 30 * np.cos(phase), 30 * np.sin(phase), 200, 180, 0, 0)
+            _, _, stamp, _ = arm.get_state(pose_buf, angles_buf)
+            ages.append(time.perf_counter() - stamp)
+        next_tick += period
+        sleep_duration = next_tick - time.perf_counter()
+        if sleep_duration > 0:
+            time.sleep(sleep_duration)
+    threads = threading.active_count()
+
+    stats = [arm.get_command_stats()['ServoP'] for arm in arms]
+    manager.disconnect()
+    conn.send(None)
+    server.join()
+    ages = np.asarray(ages)
+    return {'mean_latency': np.mean([s['mean_latency'] for s in stats]),
+            'max_latency': max(s['max_latency'] for s in stats),
+            'dropped': sum(s['dropped'] for s in stats),
+            'sent': sum(s['sent'] for s in stats),
+            'age_p50': np.percentile(ages, 50), 'age_p99': np.percentile(ages, 99),
+            'threads': threads}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-arm latency of RobotManager as the number of arms grows.")
+    parser.add_argument("--arms", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rate", type=float, default=125.0, help="ServoP rate per arm in Hz.")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.001, help="Emulated reply latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    results = {n: run(n, args.rate, args.duration, args.latency, args.jitter) for n in args.arms}
+    print(f"{'arms':>4} {'mean lat ms':>11} {'max lat ms':>10} {'sent':>6} {'dropped':>7} "
+          f"{'age p50 ms':>10} {'age p99 ms':>10} {'threads':>7}")
+    for n, r in results.items():
+        print(f"{n:4d} {r['mean_latency'] * 1000:11.2f} {r['max_latency'] * 1000:10.2f} {r['sent']:6d} "
+              f"{r['dropped']:7d} {r['age_p50'] * 1000:10.2f} {r['age_p99'] * 1000:10.2f} {r['threads']:7d}")
@@ -1,101 +1,856 @@
-import pyrealsense2 as rs
+try:
+    import pyrealsense2 as rs
+except ImportError:  # Machines without librealsense can still use ReplayCamera
+    rs = None
 import time
+import cv2
 import numpy as np
 import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import deque
+from frame_utils import FramePool, FrameBuffer, slot_arrays
+
+# Camera registry: name -> serial, plus optionally resolution (width, height), fps, color
+# format and derived views. Missing fields default to Camera's width/height/fps arguments,
+# bgr8 and no views. Views are {view name: {'size': (width, height), 'crop': None | 'center' |
+# (x, y, width, height)}}, e.g. 'views': {'small': {'size': (224, 224), 'crop': 'center'}}.
+CAMERA_CONFIG = {
+    'top': {'name': 'Intel RealSense D435I', 'serial': '317222071930'},
+    'wrist': {'name': 'Intel RealSense D415', 'serial': '217222067470'},
+}
+# Channels per color format, frames of single-channel formats are (height, width) arrays
+FORMAT_CHANNELS = {'bgr8': 3, 'rgb8': 3, 'y8': 1}
+
+
+def frame_info(frame, arrival_time):
+    """RealSense metadata of a frame: frame number, timestamps (ms) and host arrival time.
+
+    capture_time is the exposure time on the time.perf_counter() clock (the clock of
+    Robot.get_data_at), taken from the global timestamp if the camera provides one and
+    from the arrival time otherwise.
+    """
+    timestamp = frame.get_timestamp()
+    is_global = frame.get_frame_timestamp_domain() == rs.timestamp_domain.global_time
+    sensor_timestamp = None
+    if frame.supports_frame_metadata(rs.frame_metadata_value.sensor_timestamp):
+        sensor_timestamp = frame.get_frame_metadata(rs.frame_metadata_value.sensor_timestamp)
+    if is_global:
+        # Global time is on the host's system clock, move it onto perf_counter
+        capture_time = timestamp / 1000.0 - (time.time() - time.perf_counter())
+    else:
+        capture_time = arrival_time
+    return {'frame_number': frame.get_frame_number(), 'timestamp': timestamp, 'global_time': is_global,
+            'sensor_timestamp': sensor_timestamp, 'arrival_time': arrival_time, 'capture_time': capture_time}
+
+
+def view_region(resolution, view):
+    """(x, y, width, height) of the frame region a derived view is resized from.
+
+    crop None takes the whole frame, 'center' the largest centered region with the view's
+    aspect ratio (so the resize does not distort), a tuple is an explicit region of interest.
+    """
+    width, height = resolution
+    crop = view.get('crop')
+    if crop is None:
+        return 0, 0, width, height
+    if crop == 'center':
+        view_width, view_height = view['size']
+        scale = min(width / view_width, height / view_height)
+        w, h = int(round(view_width * scale)), int(round(view_height * scale))
+        return (width - w) // 2, (height - h) // 2, w, h
+    x, y, w, h = crop
+    if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > width or y + h > height:
+        raise ValueError(f"Crop {crop} is outside the {width}x{height} frame.")
+    return x, y, w, h
+
+
+def resize_views(frame, out_views, regions, views):
+    """Fills out_views[name] from the regions of frame, see view_region()."""
+    for name, (x, y, w, h) in regions.items():
+        # INTER_AREA averages the source pixels, no aliasing when shrinking
+        cv2.resize(frame[y:y + h, x:x + w], views[name]['size'], dst=out_views[name], interpolation=cv2.INTER_AREA)
+
+
+class FrameSynchronizer:
+    """Matches the frames of all cameras by capture time and keeps skew statistics for an episode.
+
+    match() takes each of the last few frames of the first camera in turn and picks the
+    closest frame of every other camera to it. The skew of such a set is the spread of its
+    capture times; the freshest set within tolerance_ms is returned, or the tightest set
+    (flagged) if none is.
+    """
+
+    def __init__(self, tolerance_ms=10.0):
+        self.tolerance_ms = tolerance_ms
+        self.reset()
+
+    def reset(self):
+        """Clears the statistics, call at the start of each episode."""
+        self.skews = []
+        self.out_of_tolerance = 0
+
+    def match(self, histories):
+        """Returns ({cam_type: entry}, skew_ms, within_tolerance) from {cam_type: [FrameBuffer, ...]}."""
+        if not histories or not all(histories.values()):
+            return None
+        cam_types = list(histories)
+        best = None
+        closest = None
+        for reference in histories[cam_types[0]]:
+            t = reference.info['capture_time']
+            matched = {cam_types[0]: reference}
+            for cam_type in cam_types[1:]:
+                matched[cam_type] = min(histories[cam_type], key=lambda entry: abs(entry.info['capture_time'] - t))
+            times = [entry.info['capture_time'] for entry in matched.values()]
+            skew = (max(times) - min(times)) * 1000.0
+            if closest is None or skew < closest[1]:
+                closest = (matched, skew)
+            if skew <= self.tolerance_ms:
+                age = min(times)
+                if best is None or age > best[2]:
+                    best = (matched, skew, age)
+        if best is None:
+            self.out_of_tolerance += 1
+            self.skews.append(closest[1])
+            return closest[0], closest[1], False
+        self.skews.append(best[1])
+        return best[0], best[1], True
+
+    def get_stats(self):
+        """Matched set count and skew (ms) statistics since the last reset()."""
+        if not self.skews:
+            return {'pairs': 0, 'out_of_tolerance': 0}
+        skews = np.asarray(self.skews)
+        return {'pairs': len(skews), 'out_of_tolerance': self.out_of_tolerance,
+                'mean_skew_ms': float(np.mean(skews)), 'p95_skew_ms': float(np.percentile(skews, 95)),
+                'max_skew_ms': float(np.max(skews))}
 
 
 class Camera:
-    def __init__(self, width=640, height=480):
-        # Camera configuration
-        self.camera_config = {
-            'top': {'name': 'Intel RealSense D435I', 'serial': '317222071930', 'resolution': (width, height)},
-            'wrist': {'name': 'Intel RealSense D415', 'serial': '217222067470', 'resolution': (width, height)}
-        }
-        self.primary_pipeline, self.wrist_pipeline = self.setup_cameras()
-
-        # --- NEW: Threading and Frame Management ---
-        self.latest_top_frame = np.zeros((height, width, 3), dtype=np.uint8)
-        self.latest_wrist_frame = np.zeros((height, width, 3), dtype=np.uint8)
-        self._frame_lock = threading.Lock()
-        self._capture_thread = None
+    """RealSense cameras from a registry (top and wrist by default), each captured by its own
+    thread into a frame pool.
+
+    camera_config maps a camera name to its serial and optionally resolution, fps and format,
+    see CAMERA_CONFIG. All pipelines are started concurrently; camera_names keeps the
+    registry order, which is also the order of capture_frames().
+
+    Derived views (downscaled and/or cropped, see CAMERA_CONFIG) are computed once per
+    frame by the capture thread into arrays that come with the frame's pooled buffer
+    (FrameBuffer.views), so consumers such as the recorder never resize themselves.
+
+    Every published frame gets a per-camera sequence number (info['seq'], from 1; the zero
+    placeholders have no info). wait_for_new_frame() blocks on a condition variable until
+    the cameras have frames newer than the ones get_synced_frames() last returned, which
+    also counts duplicate and skipped frames per episode (get_frame_stats()).
+
+    With enable_depth, all cameras also stream 16-bit depth. Aligning depth to color
+    (rs.align) costs several ms per frame, so it runs in one depth worker per camera fed
+    through a single-slot mailbox: the capture thread only hands the frameset over and the
+    color rate does not depend on the alignment. If the worker falls behind, the older
+    waiting frameset is skipped (counted as depth_skipped). Capture and alignment rates are
+    in get_capture_stats(), bench_camera.py measures them with and without depth.
+    """
+
+    def __init__(self, width=640, height=480, enable_depth=False, camera_config=None, fps=30):
+        self.enable_depth = enable_depth
+        # Camera configuration, completed with the defaults
+        self.camera_config = {}
+        for cam_type, cam_info in (camera_config or CAMERA_CONFIG).items():
+            entry = {'resolution': (width, height), 'fps': fps, 'format': 'bgr8', 'views': {}}
+            entry.update(cam_info)
+            if entry['format'] not in FORMAT_CHANNELS:
+                raise ValueError(f"Unsupported format {entry['format']} for camera {cam_type}.")
+            self.camera_config[cam_type] = entry
+        self.camera_names = list(self.camera_config)
+        self.view_regions = {cam_type: {name: view_region(cam_info['resolution'], view)
+                                        for name, view in cam_info['views'].items()}
+                             for cam_type, cam_info in self.camera_config.items()}
+        self.startup_time = 0.0
+
+        # --- Threading and Frame Management: one capture thread and slot per camera ---
+        # Frames are copied once out of the driver's buffer into a fixed pool per camera. The pool
+        # covers the history, frames handed to the control loop and the recorder queue; if it
+        # runs dry (recorder far behind) new frames are dropped instead of allocating.
+        self.pool_size = 32
+        self.frame_pools = {cam_type: self._create_frame_pool(cam_type) for cam_type in self.camera_names}
+        # Zero frames handed out until a camera delivered its first frame, not pooled
+        self.placeholders = {cam_type: FrameBuffer(None, self.frame_shape(cam_type), np.uint8,
+                                                   self.view_shapes(cam_type))
+                             for cam_type in self.camera_names}
+        self.frame_counts = {cam_type: 0 for cam_type in self.camera_names}
+        self.dropped = {cam_type: 0 for cam_type in self.camera_names}
+        self.timeouts = {cam_type: 0 for cam_type in self.camera_names}
+        self.view_time = {cam_type: 0.0 for cam_type in self.camera_names}  # Total s spent deriving views
+        self.frame_history = {cam_type: deque() for cam_type in self.camera_names}  # FrameBuffers, newest last
+        self.history_size = 4
+
+        # --- Depth: aligned to color in a worker per camera, kept in its own pool as uint16 ---
+        self.depth_pools = {cam_type: FramePool(self.frame_shape(cam_type)[:2], np.uint16, self.pool_size)
+                            for cam_type in self.camera_names} if enable_depth else {}
+        self.depth_history = {cam_type: deque() for cam_type in self.camera_names}
+        self.depth_counts = {cam_type: 0 for cam_type in self.camera_names}
+        self.depth_skipped = {cam_type: 0 for cam_type in self.camera_names}
+        self.align_time = {cam_type: 0.0 for cam_type in self.camera_names}  # Total s spent in rs.align
+        self._depth_slots = {cam_type: None for cam_type in self.camera_names}
+        self._depth_cond = threading.Condition()
+        self._depth_threads = {}
+        self.synchronizer = FrameSynchronizer(tolerance_ms=10.0)
+        self._frame_locks = {cam_type: threading.Lock() for cam_type in self.camera_names}
+
+        # --- Freshness: sequence numbers, new frame notification and duplicate/skip counts ---
+        self.sequence = {cam_type: 0 for cam_type in self.camera_names}  # Seq of the latest published frame
+        self.delivered_seq = {cam_type: 0 for cam_type in self.camera_names}  # Last seq get_synced_frames() returned
+        self.frame_stats = {cam_type: {'delivered': 0, 'duplicates': 0, 'skipped': 0, 'placeholders': 0}
+                            for cam_type in self.camera_names}
+        self._new_frame = threading.Condition()
+        self._capture_threads = {}
         self._is_capturing = False
+        self._capture_started_at = 0.0
+        self.pipelines = self.setup_cameras()
+
+    def _create_frame_pool(self, cam_type):
+        return FramePool(self.frame_shape(cam_type), np.uint8, self.pool_size, self.view_shapes(cam_type))
+
+    def frame_shape(self, cam_type, size=None):
+        """Array shape of one camera's color frames, or of its views of size (width, height)."""
+        cam_info = self.camera_config[cam_type]
+        width, height = size or cam_info['resolution']
+        channels = FORMAT_CHANNELS[cam_info['format']]
+        return (height, width, channels) if channels > 1 else (height, width)
+
+    def view_shapes(self, cam_type):
+        """{view name: array shape} of one camera's derived views."""
+        return {name: self.frame_shape(cam_type, view['size'])
+                for name, view in self.camera_config[cam_type]['views'].items()}
 
     def setup_cameras(self):
+        """Starts all registered cameras concurrently, returns {cam_type: pipeline}.
+
+        Each pipeline is started and waited on for its first frameset in its own thread, so
+        startup takes about as long as the slowest camera instead of the sum over cameras.
+        If any camera fails to start, the others are stopped again.
+        """
+        if rs is None:
+            raise ImportError("pyrealsense2 is not installed, use ReplayCamera without cameras.")
         ctx = rs.context()
         devices = ctx.query_devices()
         available_serials = [dev.get_info(rs.camera_info.serial_number) for dev in devices]
-        pipelines = []
-        for cam_type in ['top', 'wrist']:
-            cam_info = self.camera_config[cam_type]
+        for cam_type, cam_info in self.camera_config.items():
             if cam_info['serial'] not in available_serials:
                 raise ConnectionError(f"Camera {cam_type} with serial {cam_info['serial']} not found.")
+
+        started = {}
+        errors = {}
+
+        def start_pipeline(cam_type, cam_info):
             pipeline = rs.pipeline(ctx)
             config = rs.config()
             config.enable_device(cam_info['serial'])
-            config.enable_stream(rs.stream.color, *cam_info['resolution'], rs.format.bgr8, 30)
+            config.enable_stream(rs.stream.color, *cam_info['resolution'], getattr(rs.format, cam_info['format']),
+                                 cam_info['fps'])
+            if self.enable_depth:
+                config.enable_stream(rs.stream.depth, *cam_info['resolution'], rs.format.z16, cam_info['fps'])
             try:
                 pipeline.start(config)
-                time.sleep(1)
+                started[cam_type] = pipeline
+                pipeline.wait_for_frames(5000)  # Streaming once the first frameset arrived
             except Exception as e:
-                for p in pipelines: p.stop()
-                raise e
-            pipelines.append(pipeline)
-        print("Both cameras initialized successfully.")
-        return pipelines[0], pipelines[1]
-
-    # --- NEW: Threaded capture loop ---
-    def _capture_loop(self):
-        """The target function for the frame capture thread."""
+                errors[cam_type] = e
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=start_pipeline, args=(cam_type, cam_info), daemon=True)
+                   for cam_type, cam_info in self.camera_config.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            for pipeline in started.values():
+                pipeline.stop()
+            cam_type, error = next(iter(errors.items()))
+            raise ConnectionError(f"Camera {cam_type} failed to start: {error}") from error
+        self.startup_time = time.perf_counter() - start
+        print(f"{len(started)} cameras initialized in {self.startup_time:.2f} s ({', '.join(self.camera_names)}).")
+        return {cam_type: started[cam_type] for cam_type in self.camera_names}
+
+    # --- Threaded capture: each camera waits on its own pipeline ---
+    def _capture_loop(self, cam_type):
+        """The target function for one camera's capture thread.
+
+        A timeout or error only affects this camera, the other keeps publishing.
+        """
+        pipeline = self.pipelines[cam_type]
+        pool = self.frame_pools[cam_type]
         while self._is_capturing:
             try:
-                primary_frames = self.primary_pipeline.wait_for_frames(1000)
-                wrist_frames = self.wrist_pipeline.wait_for_frames(1000)
+                frames = pipeline.wait_for_frames(1000)
+            except RuntimeError as e:
+                # wait_for_frames raises on timeout
+                self.timeouts[cam_type] += 1
+                print(f"Frame capture on {cam_type} camera timed out: {e}")
+                continue
+            except Exception as e:
+                print(f"Frame capture failed in {cam_type} thread: {e}")
+                time.sleep(0.5)
+                continue
+
+            arrival_time = time.perf_counter()
+            color_frame = frames.get_color_frame() if frames else None
+            if color_frame:
+                buffer = pool.acquire()
+                if buffer is None:
+                    self.dropped[cam_type] += 1
+                    continue
+                # The only copy: out of librealsense's buffer, which is released with color_frame
+                np.copyto(buffer.array, np.asanyarray(color_frame.get_data()))
+                buffer.info = frame_info(color_frame, arrival_time)
+                self._publish(cam_type, buffer)
+                if self.enable_depth:
+                    self._post_depth(cam_type, frames, buffer.info)
 
-                if primary_frames and wrist_frames:
-                    primary_color_frame = primary_frames.get_color_frame()
-                    wrist_color_frame = wrist_frames.get_color_frame()
+    def _publish(self, cam_type, buffer, derive_views=True):
+        """Derives the views of a filled buffer (unless already done) and makes it the camera's
+        latest frame, the history keeps the acquire() reference."""
+        regions = self.view_regions[cam_type]
+        if regions and derive_views:
+            start = time.perf_counter()
+            resize_views(buffer.array, buffer.views, regions, self.camera_config[cam_type]['views'])
+            self.view_time[cam_type] += time.perf_counter() - start
+        history = self.frame_history[cam_type]
+        with self._frame_locks[cam_type]:
+            self.sequence[cam_type] += 1
+            buffer.info['seq'] = self.sequence[cam_type]
+            history.append(buffer)
+            if len(history) > self.history_size:
+                history.popleft().release()
+            self.frame_counts[cam_type] += 1
+        with self._new_frame:
+            self._new_frame.notify_all()
 
-                    if primary_color_frame and wrist_color_frame:
-                        top_frame_data = np.asanyarray(primary_color_frame.get_data())
-                        wrist_frame_data = np.asanyarray(wrist_color_frame.get_data())
+    # --- Depth worker: rs.align off the capture thread ---
+    def _post_depth(self, cam_type, frames, info):
+        """Hands a frameset to the depth worker, replacing one it has not started on yet."""
+        frames.keep()  # Held past the next wait_for_frames(), tell librealsense not to recycle it
+        with self._depth_cond:
+            if self._depth_slots[cam_type] is not None:
+                self.depth_skipped[cam_type] += 1
+            self._depth_slots[cam_type] = (frames, info)
+            self._depth_cond.notify_all()
 
-                        with self._frame_lock:
-                            self.latest_top_frame = top_frame_data
-                            self.latest_wrist_frame = wrist_frame_data
+    def _depth_loop(self, cam_type):
+        """The target function for one camera's depth worker thread."""
+        align = rs.align(rs.stream.color)
+        pool = self.depth_pools[cam_type]
+        lock = self._frame_locks[cam_type]
+        history = self.depth_history[cam_type]
+        while self._is_capturing:
+            with self._depth_cond:
+                while self._depth_slots[cam_type] is None and self._is_capturing:
+                    self._depth_cond.wait(timeout=0.5)
+                item = self._depth_slots[cam_type]
+                self._depth_slots[cam_type] = None
+            if item is None:
+                continue
+            frames, info = item
+            try:
+                start = time.perf_counter()
+                depth_frame = align.process(frames).get_depth_frame()
+                self.align_time[cam_type] += time.perf_counter() - start
+                if not depth_frame:
+                    continue
+                buffer = pool.acquire()
+                if buffer is None:
+                    self.depth_skipped[cam_type] += 1
+                    continue
+                np.copyto(buffer.array, np.asanyarray(depth_frame.get_data()))
+                buffer.info = info  # Same frame number and timestamps as the color frame it is aligned to
+                with lock:
+                    history.append(buffer)
+                    if len(history) > self.history_size:
+                        history.popleft().release()
+                    self.depth_counts[cam_type] += 1
             except Exception as e:
-                print(f"Frame capture failed in thread: {e}")
-                time.sleep(0.5)
+                print(f"Depth alignment failed in {cam_type} thread: {e}")
 
-    # --- NEW: Thread management methods ---
     def start_capture(self):
-        """Starts the background thread for capturing frames."""
+        """Starts one background capture thread per camera."""
         if not self._is_capturing:
             self._is_capturing = True
-            self._capture_thread = threading.Thread(target=self._capture_loop)
-            self._capture_thread.daemon = True
-            self._capture_thread.start()
-            print("Camera capture thread started.")
+            self._capture_started_at = time.perf_counter()
+            for cam_type in self.pipelines:
+                thread = threading.Thread(target=self._capture_loop, args=(cam_type,))
+                thread.daemon = True
+                thread.start()
+                self._capture_threads[cam_type] = thread
+                if self.enable_depth:
+                    thread = threading.Thread(target=self._depth_loop, args=(cam_type,))
+                    thread.daemon = True
+                    thread.start()
+                    self._depth_threads[cam_type] = thread
+            print(f"Camera capture threads started ({', '.join(self.camera_names)}).")
 
     def stop_capture(self):
-        """Stops the background capture thread."""
+        """Stops the background capture threads."""
         if self._is_capturing:
             self._is_capturing = False
-            if self._capture_thread:
-                self._capture_thread.join()
-            print("Camera capture thread stopped.")
+            with self._depth_cond:
+                self._depth_cond.notify_all()
+            for thread in list(self._capture_threads.values()) + list(self._depth_threads.values()):
+                thread.join()
+            self._capture_threads = {}
+            self._depth_threads = {}
+            self._depth_slots = {cam_type: None for cam_type in self.pipelines}
+            print("Camera capture threads stopped.")
 
-    # --- MODIFIED: capture_frames is now non-blocking ---
     def capture_frames(self):
-        """This method now reads from the latest frames, making it non-blocking."""
-        with self._frame_lock:
-            return self.latest_top_frame, self.latest_wrist_frame
+        """Returns copies of the latest frames of all cameras in registry order, (top, wrist) by default."""
+        return tuple(self.get_frame(cam_type) for cam_type in self.camera_names)
+
+    def get_frames(self):
+        """Returns {cam_type: copy of the latest frame} without blocking."""
+        return {cam_type: self.get_frame(cam_type) for cam_type in self.camera_names}
+
+    def get_frame(self, cam_type):
+        """Returns a copy of the latest frame of one camera without blocking."""
+        buffer = self.get_frame_buffer(cam_type)
+        frame = buffer.array.copy()
+        buffer.release()
+        return frame
+
+    def get_view(self, cam_type, name):
+        """Returns a copy of one derived view of the latest frame of a camera without blocking."""
+        buffer = self.get_frame_buffer(cam_type)
+        view = buffer.views[name].copy()
+        buffer.release()
+        return view
+
+    def wait_for_new_frame(self, timeout=None, cam_type=None):
+        """Blocks until every camera (or only cam_type) published a frame newer than the one
+        get_synced_frames() last returned. Returns False on timeout."""
+        cam_types = self.camera_names if cam_type is None else [cam_type]
+        with self._new_frame:
+            return self._new_frame.wait_for(
+                lambda: all(self.sequence[c] > self.delivered_seq[c] for c in cam_types), timeout)
+
+    def _count_delivery(self, frames):
+        for cam_type, buffer in frames.items():
+            stats = self.frame_stats[cam_type]
+            seq = buffer.info['seq'] if buffer.info else 0
+            last = self.delivered_seq[cam_type]
+            if seq == 0:
+                stats['placeholders'] += 1
+            elif seq <= last:
+                stats['duplicates'] += 1  # Same (or an older) frame as last time
+            else:
+                stats['delivered'] += 1
+                if last:
+                    stats['skipped'] += seq - last - 1
+                self.delivered_seq[cam_type] = seq
+
+    def reset_frame_stats(self):
+        """Clears the sync and freshness statistics, call at the start of each episode."""
+        self.synchronizer.reset()
+        for cam_type in self.camera_names:
+            self.delivered_seq[cam_type] = 0
+            self.frame_stats[cam_type] = {'delivered': 0, 'duplicates': 0, 'skipped': 0, 'placeholders': 0}
+
+    def get_frame_stats(self):
+        """Per camera: frames get_synced_frames() delivered, duplicates (no new frame since the
+        previous call), skipped frames (published but never delivered, expected when the loop
+        runs slower than the camera) and placeholders since reset_frame_stats()."""
+        return {cam_type: dict(self.frame_stats[cam_type], seq=self.sequence[cam_type])
+                for cam_type in self.camera_names}
+
+    def get_frame_buffer(self, cam_type):
+        """Returns the latest FrameBuffer of one camera with a reference for the caller.
+
+        Call release() once done with it (the recorder does after writing the frame). Before
+        the first frame this is the zero placeholder, whose info is None.
+        """
+        with self._frame_locks[cam_type]:
+            history = self.frame_history[cam_type]
+            return history[-1].retain() if history else self.placeholders[cam_type]
+
+    def get_depth_buffer(self, cam_type, frame_number=None):
+        """Returns the aligned depth FrameBuffer (uint16 depth units, 1 mm at the default depth
+        scale) with a reference for the caller, the one of frame_number if still held, else the latest.
+
+        None if depth is disabled or nothing was aligned yet.
+        """
+        with self._frame_locks[cam_type]:
+            history = self.depth_history[cam_type]
+            if not history:
+                return None
+            for buffer in reversed(history):
+                if frame_number is None or buffer.info['frame_number'] == frame_number:
+                    return buffer.retain()
+            return history[-1].retain()
+
+    def get_synced_frames(self):
+        """Returns ({cam_type: FrameBuffer}, skew_ms) of the best matched recent set of frames.
+
+        The FrameBuffers hold a reference for the caller, see get_frame_buffer(); their info
+        is the frame metadata. Falls back to the latest frames (skew_ms None) until every
+        camera delivered frames. Sets outside the synchronizer's tolerance are returned
+        but counted in its stats.
+
+        With depth enabled, only color frames whose aligned depth is ready are candidates
+        (while any are), so get_depth_buffer() finds the depth of the same frame number.
+        Each call is counted in get_frame_stats().
+        """
+        # Hold the candidates while matching, the capture threads may retire them meanwhile
+        histories = {}
+        for cam_type in self.camera_names:
+            with self._frame_locks[cam_type]:
+                candidates = self.frame_history[cam_type]
+                if self.enable_depth:
+                    aligned = {buffer.info['frame_number'] for buffer in self.depth_history[cam_type]}
+                    with_depth = [buffer for buffer in candidates if buffer.info['frame_number'] in aligned]
+                    candidates = with_depth or candidates
+                histories[cam_type] = [buffer.retain() for buffer in candidates]
+        matched = self.synchronizer.match(histories)
+        if matched is None:
+            frames = {cam_type: self.get_frame_buffer(cam_type) for cam_type in self.camera_names}
+            skew = None
+        else:
+            frames, skew, _ = matched
+            for buffer in frames.values():
+                buffer.retain()
+        for history in histories.values():
+            for buffer in history:
+                buffer.release()
+        self._count_delivery(frames)
+        return frames, skew
+
+    def get_capture_stats(self):
+        """Frames, timeouts, dropped frames, frame rate and pool use per camera since start_capture()."""
+        elapsed = time.perf_counter() - self._capture_started_at if self._capture_started_at else 0.0
+        return {cam_type: {'frames': self.frame_counts[cam_type], 'timeouts': self.timeouts[cam_type],
+                           'dropped': self.dropped[cam_type],
+                           'fps': self.frame_counts[cam_type] / elapsed if elapsed > 0 else 0.0,
+                           'pool': self.frame_pools[cam_type].get_stats(),
+                           'mean_view_ms': self.view_time[cam_type] / self.frame_counts[cam_type] * 1000.0
+                           if self.frame_counts[cam_type] else 0.0,
+                           'depth_frames': self.depth_counts[cam_type],
+                           'depth_fps': self.depth_counts[cam_type] / elapsed if elapsed > 0 else 0.0,
+                           'depth_skipped': self.depth_skipped[cam_type],
+                           'mean_align_ms': self.align_time[cam_type] / self.depth_counts[cam_type] * 1000.0
+                           if self.depth_counts[cam_type] else 0.0}
+                for cam_type in self.camera_names}
 
     # --- NEW: Graceful shutdown method ---
     def close(self):
         """Stops the thread and closes the camera pipelines."""
         self.stop_capture()
-        if self.primary_pipeline:
-            self.primary_pipeline.stop()
-        if self.wrist_pipeline:
-            self.wrist_pipeline.stop()
-        print("Cameras stopped and closed.")
\ No newline at end of file
+        for cam_type in self.pipelines:
+            with self._frame_locks[cam_type]:
+                for history in (self.frame_history[cam_type], self.depth_history[cam_type]):
+                    while history:
+                        history.popleft().release()
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        print("Cameras stopped and closed.")
+
+# --- Replay backend: same interface without cameras ---
+class VideoSource:
+    """Frames of a recorded episode MP4, resized to the camera resolution and looped at the end."""
+
+    def __init__(self, path, resolution, loop=True):
+        self.path = path
+        self.resolution = resolution
+        self.loop = loop
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise FileNotFoundError(f"Cannot open replay video {path}.")
+
+    def read(self, out):
+        """Decodes the next frame into out, returns False once a non-looping video ended."""
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            return False
+        if out.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if (frame.shape[1], frame.shape[0]) != tuple(self.resolution):
+            cv2.resize(frame, tuple(self.resolution), dst=out)
+        else:
+            np.copyto(out, frame)
+        return True
+
+    def stop(self):
+        self.capture.release()
+
+
+class SyntheticSource:
+    """Generated frames: a fixed gradient with a bright bar moving one step per frame."""
+
+    def __init__(self, resolution, bar_width=16):
+        width, height = resolution
+        self.bar_width = bar_width
+        self.count = 0
+        gradient = np.linspace(0, 255, width, dtype=np.float32)
+        self._base = np.empty((height, width, 3), dtype=np.uint8)
+        self._base[..., 0] = gradient
+        self._base[..., 1] = gradient[::-1]
+        self._base[..., 2] = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+
+    def read(self, out):
+        np.copyto(out, self._base if out.ndim == 3 else self._base[..., 1])
+        x = (self.count * 4) % out.shape[1]
+        out[:, x:x + self.bar_width] = 255
+        self.count += 1
+        return True
+
+    def stop(self):
+        pass
+
+
+class ReplayCamera(Camera):
+    """Drop-in for Camera fed from recorded MP4s or synthetic frames at a fixed rate.
+
+    sources maps camera names of the registry to an MP4 path, to an object with
+    read(out)/stop(), or to None for SyntheticSource frames. Each camera is paced at the
+    fps of its camera_config entry (fps by default). Frames go through the same pools, history, metadata
+    (capture_time is the host time the frame was produced) and synchronizer as the
+    RealSense capture, so the collection pipeline can be load-tested without cameras.
+    """
+
+    def __init__(self, sources=None, width=640, height=480, fps=30.0, camera_config=None):
+        self.sources = sources or {}
+        super().__init__(width, height, enable_depth=False, camera_config=camera_config, fps=fps)
+
+    def setup_cameras(self):
+        sources = {}
+        for cam_type in self.camera_names:
+            source = self.sources.get(cam_type)
+            resolution = self.camera_config[cam_type]['resolution']
+            if source is None:
+                source = SyntheticSource(resolution)
+            elif isinstance(source, str):
+                source = VideoSource(source, resolution)
+            sources[cam_type] = source
+        print(f"Replay cameras initialized ({', '.join(self.camera_names)}).")
+        return sources
+
+    def _capture_loop(self, cam_type):
+        """The target function for one replay camera's thread, paced on absolute deadlines."""
+        source = self.pipelines[cam_type]
+        pool = self.frame_pools[cam_type]
+        period = 1.0 / self.camera_config[cam_type]['fps']
+        frame_number = 0
+        next_frame = time.perf_counter()
+        while self._is_capturing:
+            next_frame += period
+            sleep_duration = next_frame - time.perf_counter()
+            if sleep_duration > 0:
+                time.sleep(sleep_duration)
+            elif sleep_duration < -period:
+                next_frame = time.perf_counter()  # Fell behind, don't burst to catch up
+
+            buffer = pool.acquire()
+            if buffer is None:
+                self.dropped[cam_type] += 1
+                continue
+            try:
+                ok = source.read(buffer.array)
+            except Exception as e:
+                buffer.release()
+                print(f"Replay failed in {cam_type} thread: {e}")
+                time.sleep(0.5)
+                continue
+            if not ok:
+                buffer.release()
+                print(f"Replay of {cam_type} camera reached the end.")
+                break
+            frame_number += 1
+            now = time.perf_counter()
+            buffer.info = {'frame_number': frame_number, 'timestamp': time.time() * 1000.0, 'global_time': True,
+                           'sensor_timestamp': None, 'arrival_time': now, 'capture_time': now}
+            self._publish(cam_type, buffer)
+
+
+# --- Out-of-process capture: one process per camera, frames in shared memory ---
+def _capture_process(cam_type, cam_info, shm_name, pool_size, slot_size, shape, view_shapes, regions, conn):
+    """Runs one camera's pipeline in a child process.
+
+    Fills the pool slots the main process lends it ('credit' messages) with the frame and
+    its views and answers with the slot index and metadata. Without a lent slot the frame
+    is dropped. 'revoke' takes all lent slots back, None ends the process.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = [slot_arrays(shm.buf, i * slot_size, shape, np.uint8, view_shapes) for i in range(pool_size)]
+    pipeline = rs.pipeline()
+    config = rs.config()
+    config.enable_device(cam_info['serial'])
+    config.enable_stream(rs.stream.color, *cam_info['resolution'], getattr(rs.format, cam_info['format']),
+                         cam_info['fps'])
+    try:
+        pipeline.start(config)
+        pipeline.wait_for_frames(5000)
+    except Exception as e:
+        conn.send(('failed', repr(e)))
+        return
+    conn.send(('ready',))
+
+    credits = []
+    frame = views = None
+    capturing = False
+    running = True
+    try:
+        while running:
+            while conn.poll():
+                message = conn.recv()
+                if message is None:
+                    running = False
+                    break
+                if message[0] == 'credit':
+                    credits.append(message[1])
+                    capturing = True
+                elif message[0] == 'revoke':
+                    credits = []
+                    capturing = False
+                    conn.send(('revoked',))
+            if not running:
+                break
+            try:
+                frames = pipeline.wait_for_frames(1000)
+            except RuntimeError as e:
+                if capturing:
+                    conn.send(('timeout', str(e)))
+                continue
+            arrival_time = time.perf_counter()
+            color_frame = frames.get_color_frame() if frames else None
+            if not color_frame or not capturing:
+                continue
+            if not credits:
+                conn.send(('dropped',))
+                continue
+            index = credits.pop(0)
+            frame, views = slots[index]
+            np.copyto(frame, np.asanyarray(color_frame.get_data()))
+            if regions:
+                resize_views(frame, views, regions, cam_info['views'])
+            conn.send(('frame', index, frame_info(color_frame, arrival_time)))
+    except (EOFError, BrokenPipeError):
+        pass  # Main process is gone
+    finally:
+        pipeline.stop()
+        slots = frame = views = None  # Drop the views of the shared memory before unmapping it
+        shm.close()
+
+
+class _CaptureProcess:
+    """Handle of a camera's capture process, stands in for its pipeline."""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=3.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ProcessCamera(Camera):
+    """Drop-in for Camera that captures every RealSense camera in its own process.
+
+    The frame pools are in shared memory. The main process lends each capture process a
+    few free buffers (credits); the process copies the frame and computes its views
+    straight into them and sends back only the slot index and metadata. A receiver thread
+    per camera then publishes the buffer as usual, so frames are zero-copy views of the
+    shared memory with the same sequence numbers, sync and freshness API. Copying,
+    resizing and librealsense's own threads no longer compete with the control loop for
+    the GIL. Depth is not supported in this mode.
+
+    The capture processes are forked: the collection script has no __main__ guard, which
+    spawn would need to start a process.
+    """
+
+    def __init__(self, width=640, height=480, camera_config=None, fps=30, credits=3):
+        self.credits = credits  # Buffers lent to each capture process at a time
+        super().__init__(width, height, enable_depth=False, camera_config=camera_config, fps=fps)
+
+    def _create_frame_pool(self, cam_type):
+        return FramePool(self.frame_shape(cam_type), np.uint8, self.pool_size, self.view_shapes(cam_type),
+                         shared=True)
+
+    def setup_cameras(self):
+        """Starts one capture process per camera concurrently, returns {cam_type: handle}."""
+        if rs is None:
+            raise ImportError("pyrealsense2 is not installed, use ReplayCamera without cameras.")
+        context = multiprocessing.get_context('fork')
+        start = time.perf_counter()
+        handles = {}
+        for cam_type, cam_info in self.camera_config.items():
+            conn, child_conn = context.Pipe()
+            pool = self.frame_pools[cam_type]
+            process = context.Process(target=_capture_process, daemon=True,
+                                      args=(cam_type, cam_info, pool.shm.name, pool.size, pool.slot_size,
+                                            pool.shape, pool.view_shapes, self.view_regions[cam_type], child_conn))
+            process.start()
+            handles[cam_type] = _CaptureProcess(process, conn)
+        errors = {}
+        for cam_type, handle in handles.items():
+            message = handle.conn.recv() if handle.conn.poll(10.0) else ('failed', 'no reply within 10 s')
+            if message[0] != 'ready':
+                errors[cam_type] = message[1]
+        if errors:
+            for handle in handles.values():
+                handle.stop()
+            for pool in self.frame_pools.values():
+                pool.close()
+            cam_type, error = next(iter(errors.items()))
+            raise ConnectionError(f"Camera {cam_type} failed to start: {error}")
+        self.startup_time = time.perf_counter() - start
+        print(f"{len(handles)} capture processes initialized in {self.startup_time:.2f} s "
+              f"({', '.join(self.camera_names)}).")
+        return handles
+
+    def _capture_loop(self, cam_type):
+        """The target function for one camera's receiver thread."""
+        conn = self.pipelines[cam_type].conn
+        pool = self.frame_pools[cam_type]
+        lent = {}
+        try:
+            while self._is_capturing:
+                while len(lent) < self.credits:
+                    buffer = pool.acquire()
+                    if buffer is None:
+                        break
+                    lent[buffer.index] = buffer
+                    conn.send(('credit', buffer.index))
+                if not conn.poll(0.5):
+                    continue
+                message = conn.recv()
+                if message[0] == 'frame':
+                    buffer = lent.pop(message[1])
+                    buffer.info = message[2]
+                    self._publish(cam_type, buffer, derive_views=False)
+                elif message[0] == 'dropped':
+                    self.dropped[cam_type] += 1
+                elif message[0] == 'timeout':
+                    self.timeouts[cam_type] += 1
+                    print(f"Frame capture on {cam_type} camera timed out: {message[1]}")
+            # The lent buffers are only ours again once the process confirmed it stopped using them
+            conn.send(('revoke',))
+            while conn.poll(2.0):
+                if conn.recv()[0] == 'revoked':
+                    break
+        except (EOFError, BrokenPipeError, OSError) as e:
+            print(f"Capture process of {cam_type} camera is gone: {e!r}")
+        for buffer in lent.values():
+            buffer.release()
+
+    def close(self):
+        """Stops the receiver threads and capture processes, frees the shared memory."""
+        super().close()
+        for pool in self.frame_pools.values():
+            pool.close()
@@ -0,0 +1,113 @@
+import threading
+import time
+
+
+class CommandStats:
+    """Per-command submitted/sent/dropped/error counts and submit-to-reply latencies (s).
+
+    Shared by CommandSender and the RobotManager arms' move mailboxes.
+    """
+
+    def __init__(self):
+        self.stats = {}
+
+    def get(self, command_name):
+        stats = self.stats.get(command_name)
+        if stats is None:
+            stats = {'submitted': 0, 'sent': 0, 'dropped': 0, 'errors': 0,
+                     'last_latency': 0.0, 'max_latency': 0.0, 'total_latency': 0.0}
+            self.stats[command_name] = stats
+        return stats
+
+    def submitted(self, command_name, replaced=None):
+        """Counts a command posted to a mailbox, replaced is the unsent one it overwrote."""
+        if replaced is not None:
+            self.get(replaced)['dropped'] += 1
+        self.get(command_name)['submitted'] += 1
+
+    def sent(self, command_name, submitted_at):
+        latency = time.perf_counter() - submitted_at
+        stats = self.get(command_name)
+        stats['sent'] += 1
+        stats['last_latency'] = latency
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+
+    def report(self):
+        """A copy of the counts with the mean latency added."""
+        report = {}
+        for command_name, stats in self.stats.items():
+            report[command_name] = dict(stats)
+            sent = stats['sent']
+            report[command_name]['mean_latency'] = stats['total_latency'] / sent if sent else 0.0
+        return report
+
+
+class CommandSender:
+    """Sends commands from a dedicated thread through a single-slot mailbox.
+
+    submit() only overwrites the slot, so the caller never waits on the socket. If the
+    sender is still busy with an earlier command, the unsent setpoint in the slot is
+    replaced by the new one and counted as dropped (latest command wins).
+    """
+
+    def __init__(self, send_fn, name="sender"):
+        self.send_fn = send_fn  # Blocking call that sends one command string and waits for the reply
+        self.name = name
+        self._slot = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._is_running = False
+        self.error = None  # Last send error, raised once by the next submit()
+        self.command_stats = CommandStats()
+        self.stats = self.command_stats.stats
+
+    def submit(self, command_name, command):
+        """Posts a command for sending. Raises the last send error if one occurred since."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        with self._cond:
+            self.command_stats.submitted(command_name, None if self._slot is None else self._slot[0])
+            self._slot = (command_name, command, time.perf_counter())
+            self._cond.notify()
+
+    def _send_loop(self):
+        """The target function for the sender thread."""
+        while self._is_running:
+            with self._cond:
+                while self._slot is None and self._is_running:
+                    self._cond.wait(timeout=0.5)
+                if self._slot is None:
+                    continue
+                command_name, command, submitted_at = self._slot
+                self._slot = None
+            try:
+                self.send_fn(command)
+            except Exception as e:
+                self.command_stats.get(command_name)['errors'] += 1
+                self.error = e
+                print(f"Error in {self.name} thread sending {command_name}: {e}")
+                continue
+            self.command_stats.sent(command_name, submitted_at)
+
+    def start(self):
+        """Starts the background sender thread."""
+        if not self._is_running:
+            self._is_running = True
+            self._thread = threading.Thread(target=self._send_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """Stops the sender thread, a command still in the slot is discarded."""
+        if self._is_running:
+            self._is_running = False
+            with self._cond:
+                self._cond.notify()
+            if self._thread:
+                self._thread.join()
+
+    def get_stats(self):
+        """Per-command counts and send latencies (s), latency is submit-to-reply."""
+        return self.command_stats.report()
@@ -0,0 +1,152 @@
+import threading
+import time
+
+
+class ConnectionSupervisor:
+    """Owns the reconnection of a set of named channels (dashboard, move, feedback).
+
+    Threads that hit an I/O error call handle_failure(), which marks the channel down and
+    waits for the supervisor thread to bring it back. Reconnects use bounded exponential
+    backoff, every outage is recorded with its duration.
+    """
+
+    def __init__(self, channels, on_reconnect=None, health_check=None, initial_backoff=0.05,
+                 max_backoff=2.0, max_outage=30.0, check_interval=0.1):
+        self.channels = channels  # name -> (connect_fn, close_fn)
+        self.on_reconnect = on_reconnect  # Called after channels come back, e.g. to re-apply settings
+        self.health_check = health_check  # Returns a list of channel names that look dead
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_outage = max_outage  # Give up on a channel after this many seconds down
+        self.check_interval = check_interval
+
+        self._down = {}  # name -> {'since', 'attempts', 'error'}
+        self._failed = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._is_running = False
+        self.outages = []
+
+    def report_failure(self, name, error=None):
+        """Marks a channel down, returns immediately."""
+        with self._cond:
+            if name not in self._down and name not in self._failed:
+                print(f"Connection on {name} lost: {error}. Reconnecting...")
+                self._down[name] = {'since': time.perf_counter(), 'attempts': 0, 'error': repr(error)}
+                self._cond.notify_all()
+
+    def wait_connected(self, name, timeout=None):
+        """Blocks until the channel is up. Returns False on timeout or if the supervisor gave up."""
+        if timeout is None:
+            timeout = self.max_outage
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while name in self._down:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return name not in self._failed
+
+    def handle_failure(self, name, error=None, timeout=None):
+        """report_failure() followed by wait_connected(), for callers that want to retry."""
+        self.report_failure(name, error)
+        return self.wait_connected(name, timeout)
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def is_connected(self, name):
+        return name not in self._down and name not in self._failed
+
+    def _reconnect(self, name):
+        connect_fn, close_fn = self.channels[name]
+        try:
+            close_fn()
+        except Exception:
+            pass
+        connect_fn()
+
+    def _supervise_loop(self):
+        """The target function for the supervisor thread."""
+        next_attempt = {}
+        while self._is_running:
+            if self.health_check is not None:
+                for name in self.health_check():
+                    self.report_failure(name, "health check failed")
+
+            with self._cond:
+                down = dict(self._down)
+            if not down:
+                with self._cond:
+                    self._cond.wait(self.check_interval)
+                continue
+
+            now = time.perf_counter()
+            recovered = []
+            for name, outage in down.items():
+                if now < next_attempt.get(name, 0.0):
+                    continue
+                outage['attempts'] += 1
+                try:
+                    self._reconnect(name)
+                    recovered.append(name)
+                except Exception as e:
+                    outage['error'] = repr(e)
+                    if now - outage['since'] > self.max_outage:
+                        print(f"Giving up on {name} after {now - outage['since']:.1f} s.")
+                        with self._cond:
+                            self._failed.add(name)
+                            del self._down[name]
+                            self._cond.notify_all()
+                        continue
+                    backoff = min(self.initial_backoff * 2 ** (outage['attempts'] - 1), self.max_backoff)
+                    next_attempt[name] = now + backoff
+
+            if recovered and self.on_reconnect is not None:
+                try:
+                    self.on_reconnect()
+                except Exception as e:
+                    print(f"Error re-applying settings after reconnect: {e}")
+
+            with self._cond:
+                for name in recovered:
+                    outage = self._down.pop(name)
+                    next_attempt.pop(name, None)
+                    duration = time.perf_counter() - outage['since']
+                    self.outages.append({'channel': name, 'duration': duration,
+                                         'attempts': outage['attempts'], 'error': outage['error']})
+                    print(f"Reconnected {name} after {duration * 1000:.0f} ms ({outage['attempts']} attempt(s)).")
+                self._cond.notify_all()
+                if self._down:
+                    self._cond.wait(min(self.initial_backoff, self.check_interval))
+
+    def start(self):
+        """Starts the background supervisor thread."""
+        if not self._is_running:
+            self._is_running = True
+            self._thread = threading.Thread(target=self._supervise_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        if self._is_running:
+            self._is_running = False
+            with self._cond:
+                self._cond.notify_all()
+            if self._thread:
+                self._thread.join()
+
+    def get_report(self):
+        """Current status per channel and the list of past outages (durations in s)."""
+        with self._cond:
+            status = {}
+            for name in self.channels:
+                if name in self._failed:
+                    status[name] = 'failed'
+                elif name in self._down:
+                    status[name] = 'reconnecting'
+                else:
+                    status[name] = 'connected'
+            return {'status': status, 'outages': list(self.outages)}
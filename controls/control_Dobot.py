@@ -2,6 +2,7 @@ import pygame
 import time
 from dobot import Robot
 import socket
+from safety_utils import clip_pose
 
 
 r_obj = Robot()
@@ -68,11 +69,6 @@ while running:
         y += (-left_axis_y) * UNITS_TO_JUMP
         z += (-right_axis_z) * UNITS_TO_JUMP
 
-        # Clamping
-        x = max(min(x, 750), 240)
-        y = max(min(y, 550), -330)
-        z = max(min(z, 300), -20)
-
         # =====================================================================
         # === CHECK BUTTONS FOR CONTINUOUS ROTATION (Polling) ===
         if joystick.get_button(3):  # Button 3: Continuously decrease rx
@@ -92,23 +88,22 @@ while running:
         if joystick.get_button(6):  # Button 6: Continuously decrease rz
             rz -= 1 # Reduce the amount increased for better control. Higher number makes the roation faster.
 
-        # Clamping rotation values
-        rx = max(min(rx, 180), -180)
-        ry = max(min(ry, 180), -180)
-        rz = max(min(rz, 180), -180)
+        # Clamping to the shared workspace limits
+        x, y, z, rx, ry, rz = clip_pose([x, y, z, rx, ry, rz])
         # =====================================================================
 
     try:
         r_obj.send_actions(x, y, z, rx, ry, rz)
     except (UnicodeDecodeError, socket.error) as e:
+        # robot/dobot.py has no connection supervisor, the move port is reconnected here
         print(f"Connection error ({type(e).__name__}): {e}")
         print("Attempting to reconnect to the move port...")
         r_obj.move.close()  # Close the old socket *before* reconnecting
-        r_obj.move = r_obj._connect_move()  # Re-initialize the connection
+        r_obj._connect_move()  # Re-initializes r_obj.move, the sender thread picks it up
 
         try:
-            r_obj.move.ServoP(x, y, z, rx, ry, rz)
-            print("Reconnected and sent ServoP successfully.")  # Add success message
+            r_obj.send_actions(x, y, z, rx, ry, rz)
+            print("Reconnected and sent ServoP successfully.")
 
         except Exception as e:
             print(f"Error after reconnection: {e}")
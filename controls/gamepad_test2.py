@@ -1,8 +1,13 @@
 import pygame
 import time
 from dobot import Robot
+from safety_utils import clip_pose, WORKSPACE_MAX
 import socket
 
+# This rig allows z up to 500 mm, above the shared 300 mm cell limit
+POSE_MAX = WORKSPACE_MAX.copy()
+POSE_MAX[2] = 500.0
+
 
 r_obj = Robot()
 
@@ -68,11 +73,6 @@ while running:
         y += (-left_axis_y) * UNITS_TO_JUMP
         z += (-right_axis_z) * UNITS_TO_JUMP
 
-        # Clamping
-        x = max(min(x, 750), 240)
-        y = max(min(y, 550), -330)
-        z = max(min(z, 500), -20)
-
         # =====================================================================
         # === CHECK BUTTONS FOR CONTINUOUS ROTATION (Polling) ===
         if joystick.get_button(3):  # Button 3: Continuously decrease rx
@@ -92,10 +92,8 @@ while running:
         if joystick.get_button(6):  # Button 6: Continuously decrease rz
             rz -= 1 # Reduce the amount increased for better control. Higher number makes the roation faster.
 
-        # Clamping rotation values
-        rx = max(min(rx, 180), -180)
-        ry = max(min(ry, 180), -180)
-        rz = max(min(rz, 180), -180)
+        # Clamping to the shared workspace limits, with this script's z range
+        x, y, z, rx, ry, rz = clip_pose([x, y, z, rx, ry, rz], upper=POSE_MAX)
         # =====================================================================
 
     try:
@@ -0,0 +1,237 @@
+import asyncio
+import concurrent.futures
+import re
+import threading
+from collections import deque
+
+
+_REPLY_COMMAND = re.compile(r'\}\s*,\s*(\w+)\s*\(')  # Command token of "err,{result},Cmd(args);"
+
+
+def _consume(future):
+    """Done callback that marks a reply future's exception as retrieved."""
+    if not future.cancelled():
+        future.exception()
+
+
+class AsyncDashboardClient:
+    """asyncio client for the dashboard port with pipelined commands.
+
+    Commands are written as soon as they are submitted (up to max_in_flight unanswered) and
+    the controller answers them in order, so replies are matched FIFO against the pending
+    futures. Each reply ("err,{result},Cmd(args);") echoes its command, which is checked. A
+    reply for another command means a reply was lost or reordered: it is not delivered, all
+    pending commands fail with ConnectionError and the connection is closed, so the caller
+    reconnects instead of reading another command's result.
+
+    Every command in flight takes one of max_in_flight slots, batches included, so
+    max_in_flight=1 is strict request/response.
+    """
+
+    def __init__(self, ip, port=29999, max_in_flight=8, timeout=5.0):
+        self.ip = ip
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._pending = deque()  # (command name, future) in send order
+        self._slots = None
+        self._write_lock = None
+        self._acquire_lock = None
+        self._reader_task = None
+        self.error = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.port), self.timeout)
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._write_lock = asyncio.Lock()
+        self._acquire_lock = asyncio.Lock()
+        self._reader_task = asyncio.ensure_future(self._read_replies())
+
+    async def _read_replies(self):
+        try:
+            while True:
+                data = await self._reader.readuntil(b';')
+                reply = data.decode('utf-8', errors='ignore').strip()
+                if not self._pending:
+                    print(f"Dashboard reply without a pending command: {reply}")
+                    continue
+                name = self._pending[0][0]
+                match = _REPLY_COMMAND.search(reply)
+                if match is None or match.group(1) != name:
+                    self._fail(ConnectionError(f"Dashboard reply {reply} does not match {name}, "
+                                               f"replies out of sync."))
+                    self._writer.close()
+                    return
+                _, future = self._pending.popleft()
+                if not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            self._fail(ConnectionError(f"Dashboard connection lost: {e!r}"))
+        except asyncio.CancelledError:
+            self._fail(ConnectionError("Dashboard client closed."))
+
+    def _fail(self, error):
+        self.error = error
+        while self._pending:
+            _, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    @staticmethod
+    def _format(name, args):
+        return f"{name}({','.join(str(arg) for arg in args)})"
+
+    async def call(self, name, *args):
+        """Sends name(args) and waits for its reply string."""
+        if self.error is not None:
+            raise self.error
+        command = self._format(name, args)
+        async with self._slots:
+            future = asyncio.get_running_loop().create_future()
+            async with self._write_lock:
+                # Queue and write together so the pending order is the wire order
+                self._pending.append((name, future))
+                try:
+                    self._writer.write(command.encode('utf-8'))
+                    await self._writer.drain()
+                except BaseException:
+                    # Nobody awaits the reply now, the reader fails it when the socket closes
+                    future.add_done_callback(_consume)
+                    raise
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    async def _acquire(self, n):
+        """Takes n in-flight slots. One caller at a time, so two batches cannot each hold part."""
+        acquired = 0
+        async with self._acquire_lock:
+            try:
+                while acquired < n:
+                    await self._slots.acquire()
+                    acquired += 1
+            except BaseException:
+                for _ in range(acquired):
+                    self._slots.release()
+                raise
+
+    async def call_batch(self, commands):
+        """Writes [(name, *args), ...] and waits for all replies, in order.
+
+        Up to max_in_flight commands go out in a single write, a longer batch is sent in
+        chunks, each after the replies of the previous one.
+        """
+        if self.error is not None:
+            raise self.error
+        loop = asyncio.get_running_loop()
+        commands = list(commands)
+        replies = []
+        for start in range(0, len(commands), self.max_in_flight):
+            chunk = commands[start:start + self.max_in_flight]
+            await self._acquire(len(chunk))
+            try:
+                futures = []
+                async with self._write_lock:
+                    for name, *args in chunk:
+                        future = loop.create_future()
+                        self._pending.append((name, future))
+                        futures.append(future)
+                    try:
+                        self._writer.write(''.join(self._format(name, args) for name, *args in chunk).encode('utf-8'))
+                        await self._writer.drain()
+                    except BaseException:
+                        for future in futures:
+                            future.add_done_callback(_consume)
+                        raise
+                replies += await asyncio.wait_for(asyncio.shield(asyncio.gather(*futures)), self.timeout)
+            finally:
+                for _ in chunk:
+                    self._slots.release()
+        return replies
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+class DashboardClient:
+    """Synchronous facade over AsyncDashboardClient, drop-in for DobotApiDashboard.
+
+    The event loop runs in its own thread. Any dashboard command can be called by name
+    (dashboard.GetPose(), dashboard.ToolDOExecute(1, 1)) and blocks for its reply, while
+    submit()/call_many() pipeline independent queries from any thread.
+    """
+
+    def __init__(self, ip, port=29999, max_in_flight=8, timeout=5.0):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self.client = AsyncDashboardClient(ip, port, max_in_flight, timeout)
+        try:
+            self._run(self.client.connect())
+        except Exception:
+            self._stop_loop()
+            raise
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(self.timeout + 1.0)
+
+    def submit(self, name, *args):
+        """Sends a command without waiting, returns a concurrent.futures.Future of the reply."""
+        return asyncio.run_coroutine_threadsafe(self.client.call(name, *args), self._loop)
+
+    def submit_batch(self, commands):
+        """Sends [(name, *args), ...] without waiting, returns a Future of the reply list.
+
+        Up to max_in_flight commands go out in one write, see AsyncDashboardClient.call_batch().
+        """
+        return asyncio.run_coroutine_threadsafe(self.client.call_batch(commands), self._loop)
+
+    def call_batch(self, commands):
+        """Sends [(name, *args), ...] and returns the replies."""
+        commands = list(commands)
+        chunks = max(1, -(-len(commands) // self.client.max_in_flight))
+        return self.submit_batch(commands).result(self.timeout * chunks + 1.0)
+
+    def call_many(self, commands):
+        """Pipelines [(name, *args), ...] and returns the replies in the same order."""
+        futures = [self.submit(*command) for command in commands]
+        concurrent.futures.wait(futures, self.timeout + 1.0)
+        # Fetch every outcome first so a failed batch leaves no exception unretrieved
+        errors = [future.exception(0) for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result(0) for future in futures]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def command(*args):
+            return self.submit(name, *args).result(self.timeout + 1.0)
+        return command
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1.0)
+        self._loop.close()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self.client.close())
+        except Exception:
+            pass
+        self._stop_loop()
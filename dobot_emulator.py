@@ -0,0 +1,374 @@
+import argparse
+import queue
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+import numpy as np
+from feedback_utils import FEEDBACK_DTYPE, FEEDBACK_PACKET_SIZE, FEEDBACK_TEST_VALUE, wrap_degrees
+from kinematics_utils import Kinematics
+
+
+# Controller robot modes as reported by RobotMode() and the feedback packet
+MODE_DISABLED = 4
+MODE_ENABLED = 5
+MODE_RUNNING = 7
+MODE_ERROR = 9
+
+COMMAND_PATTERN = re.compile(r'(\w+)\(([^()]*)\)')
+
+
+class _EmulatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def _format_values(values):
+    return "{" + ",".join(f"{v:.4f}" for v in values) + "}"
+
+
+def _parse_args(arg_str):
+    """Positional numeric arguments of a command, keyword arguments (t=, gain=...) are skipped."""
+    values = []
+    for arg in arg_str.split(','):
+        arg = arg.strip()
+        if arg and '=' not in arg:
+            values.append(float(arg))
+    return values
+
+
+class DobotEmulator:
+    """Hardware-free stand-in for the controller's dashboard, move and feedback ports.
+
+    Replies use the controller's text format ("0,{...},Cmd();"), so the real Robot class
+    connects to it unmodified with robot_ip="127.0.0.1". ServoP/ServoJ targets are
+    integrated into the simulated pose at the feedback rate with speed limits.
+    """
+
+    def __init__(self, host="127.0.0.1", dashboard_port=29999, move_port=30003, feedback_port=30004,
+                 latency=0.0, jitter=0.0, feedback_period=0.008, enable_delay=0.5,
+                 max_linear_speed=500.0, max_angular_speed=180.0,
+                 initial_pose=(400.0, 0.0, 200.0, 180.0, 0.0, 0.0), tool_do_feedback_bits=None):
+        self.host = host
+        self.dashboard_port = dashboard_port
+        self.move_port = move_port
+        self.feedback_port = feedback_port
+        self.latency = latency  # Seconds between receiving a dashboard/move command and its reply
+        self.jitter = jitter  # Uniform +/- spread around latency
+        self.feedback_period = feedback_period
+        self.enable_delay = enable_delay
+        self.max_linear_speed = max_linear_speed  # mm/s
+        self.max_angular_speed = max_angular_speed  # deg/s and joint deg/s
+
+        self.kinematics = Kinematics()
+        self.pose = np.array(initial_pose, dtype=np.float64)
+        self.angles = self.kinematics.inverse(self.pose)
+        self.target_pose = self.pose.copy()
+        self.target_angles = None  # Set by ServoJ, joint-space motion takes precedence
+        self.pose_speed = np.zeros(6)
+        self.joint_speed = np.zeros(6)
+        self.mode = MODE_DISABLED
+        self._enable_at = None
+        self.speed_factor = 100
+        self.acc_j = 100
+        self.tool = 0
+        self.tool_do = {1: 0, 2: 0}
+        self.tool_do_feedback_bits = tool_do_feedback_bits  # {tool DO index: DigitalOutputs bit} to report tool outputs
+        self.digital_outputs = 0
+        self.command_counts = {}
+
+        self._state_lock = threading.Lock()
+        self._servers = []
+        self._feedback_clients = []
+        self._command_clients = []
+        self._threads = []
+        self._is_running = False
+        self._start_time = time.perf_counter()
+
+    # --- Command handling ---
+    def _reply_delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _write_replies(self, sock, replies):
+        """Sends each reply once its delay has passed. Replies keep their order, and
+        commands pipelined by the client overlap their delays like on a real link."""
+        while True:
+            item = replies.get()
+            if item is None:
+                break
+            due, reply = item
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                sock.sendall(reply)
+            except OSError:
+                break
+
+    def handle_command(self, name, arg_str):
+        """Executes one command and returns the reply string."""
+        self.command_counts[name] = self.command_counts.get(name, 0) + 1
+        values = _parse_args(arg_str)
+        result = "{}"
+        error_id = 0
+        with self._state_lock:
+            if name == "EnableRobot":
+                if self.mode != MODE_ENABLED and self._enable_at is None:
+                    self._enable_at = time.perf_counter() + self.enable_delay
+            elif name == "DisableRobot":
+                self.mode = MODE_DISABLED
+                self._enable_at = None
+            elif name == "ClearError":
+                if self.mode == MODE_ERROR:
+                    self.mode = MODE_DISABLED
+            elif name == "RobotMode":
+                result = "{" + str(self.mode) + "}"
+            elif name == "SpeedFactor":
+                self.speed_factor = int(values[0])
+            elif name == "AccJ":
+                self.acc_j = int(values[0])
+            elif name == "Tool":
+                self.tool = int(values[0])
+            elif name == "GetPose":
+                result = _format_values(self.pose)
+            elif name == "GetAngle":
+                result = _format_values(self.angles)
+            elif name == "InverseSolution":
+                angles = self.kinematics.inverse(values[:6], self.angles)
+                if np.isnan(angles[0]):
+                    error_id = -1
+                else:
+                    result = _format_values(angles)
+            elif name == "ServoP":
+                if self.mode in (MODE_ENABLED, MODE_RUNNING):
+                    self.target_pose[:] = values[:6]
+                    self.target_angles = None
+                else:
+                    error_id = -1
+            elif name == "ServoJ":
+                if self.mode in (MODE_ENABLED, MODE_RUNNING):
+                    self.target_angles = np.array(values[:6], dtype=np.float64)
+                else:
+                    error_id = -1
+            elif name == "ToolDOExecute":
+                self.tool_do[int(values[0])] = int(values[1])
+            elif name == "DO" or name == "DOExecute":
+                bit = 1 << (int(values[0]) - 1)
+                self.digital_outputs = self.digital_outputs | bit if int(values[1]) else self.digital_outputs & ~bit
+        return f"{error_id},{result},{name}({arg_str});"
+
+    def _make_handler(self):
+        emulator = self
+
+        class CommandHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with emulator._state_lock:
+                    emulator._command_clients.append(self.request)
+                # Replies are small and go out back to back, don't let Nagle hold them for the client's ACK
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                replies = queue.Queue()
+                writer = threading.Thread(target=emulator._write_replies, args=(self.request, replies), daemon=True)
+                writer.start()
+                last_due = 0.0
+                pending = ""
+                while emulator._is_running:
+                    try:
+                        data = self.request.recv(1024)
+                    except OSError:
+                        break
+                    if not data:
+                        break
+                    pending += data.decode("utf-8", errors="ignore")
+                    last_end = 0
+                    for match in COMMAND_PATTERN.finditer(pending):
+                        reply = emulator.handle_command(match.group(1), match.group(2))
+                        last_due = max(last_due, time.perf_counter() + emulator._reply_delay())
+                        replies.put((last_due, reply.encode("utf-8")))
+                        last_end = match.end()
+                    pending = pending[last_end:]
+                replies.put(None)
+                with emulator._state_lock:
+                    if self.request in emulator._command_clients:
+                        emulator._command_clients.remove(self.request)
+
+        return CommandHandler
+
+    def _make_feedback_handler(self):
+        emulator = self
+
+        class FeedbackHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with emulator._state_lock:
+                    emulator._feedback_clients.append(self.request)
+                # The simulation thread writes to the socket, keep the connection open until the client leaves
+                while emulator._is_running:
+                    try:
+                        if not self.request.recv(1024):
+                            break
+                    except OSError:
+                        break
+                with emulator._state_lock:
+                    if self.request in emulator._feedback_clients:
+                        emulator._feedback_clients.remove(self.request)
+
+        return FeedbackHandler
+
+    # --- Simulation ---
+    def _step(self, dt):
+        """Integrates the commanded motion over dt seconds. Caller holds _state_lock."""
+        now = time.perf_counter()
+        if self._enable_at is not None and now >= self._enable_at:
+            self.mode = MODE_ENABLED
+            self._enable_at = None
+        if self.mode not in (MODE_ENABLED, MODE_RUNNING):
+            self.pose_speed[:] = 0.0
+            self.joint_speed[:] = 0.0
+            return
+
+        scale = self.speed_factor / 100.0
+        if self.target_angles is not None:
+            step = np.clip(self.target_angles - self.angles, -self.max_angular_speed * scale * dt,
+                           self.max_angular_speed * scale * dt)
+            self.angles += step
+            new_pose = self.kinematics.forward(self.angles)
+            self.target_pose[:] = new_pose
+        else:
+            limits = np.array([self.max_linear_speed] * 3 + [self.max_angular_speed] * 3) * scale * dt
+            delta = self.target_pose - self.pose
+            delta[3:] = wrap_degrees(delta[3:])
+            new_pose = self.pose + np.clip(delta, -limits, limits)
+            new_pose[3:] = wrap_degrees(new_pose[3:])
+            step = self.kinematics.inverse(new_pose, self.angles) - self.angles
+            if np.isnan(step[0]):
+                # Unreachable target, hold position like the controller would
+                self.target_pose[:] = self.pose
+                new_pose = self.pose.copy()
+                step = np.zeros(6)
+            self.angles += step
+        pose_delta = new_pose - self.pose
+        pose_delta[3:] = wrap_degrees(pose_delta[3:])
+        self.pose_speed = pose_delta / dt
+        self.joint_speed = step / dt
+        self.pose[:] = new_pose
+        moving = np.any(np.abs(self.pose_speed) > 1e-6)
+        self.mode = MODE_RUNNING if moving else MODE_ENABLED
+
+    def _build_packet(self, packet):
+        """Fills a FEEDBACK_DTYPE record from the simulated state. Caller holds _state_lock."""
+        packet['len'] = FEEDBACK_PACKET_SIZE
+        packet['TestValue'] = FEEDBACK_TEST_VALUE
+        packet['RobotMode'] = self.mode
+        packet['TimeStamp'] = int((time.perf_counter() - self._start_time) * 1000)
+        outputs = self.digital_outputs
+        if self.tool_do_feedback_bits:
+            for index, bit in self.tool_do_feedback_bits.items():
+                outputs = outputs | (1 << bit) if self.tool_do.get(index) else outputs & ~(1 << bit)
+        packet['DigitalOutputs'] = outputs
+        packet['SpeedScaling'] = self.speed_factor / 100.0
+        packet['QTarget'] = self.target_angles if self.target_angles is not None else self.angles
+        packet['QActual'] = self.angles
+        packet['QDActual'] = self.joint_speed
+        packet['IActual'] = self.joint_speed * 0.01
+        packet['ToolVectorActual'] = self.pose
+        packet['TCPSpeedActual'] = self.pose_speed
+
+    def _simulation_loop(self):
+        """Steps the simulation and pushes one feedback packet per period to every client."""
+        packet = np.zeros((), dtype=FEEDBACK_DTYPE)
+        next_tick = time.perf_counter()
+        while self._is_running:
+            with self._state_lock:
+                self._step(self.feedback_period)
+                self._build_packet(packet)
+                clients = list(self._feedback_clients)
+            data = packet.tobytes()
+            for client in clients:
+                try:
+                    client.sendall(data)
+                except OSError:
+                    with self._state_lock:
+                        if client in self._feedback_clients:
+                            self._feedback_clients.remove(client)
+            next_tick += self.feedback_period
+            sleep_duration = next_tick - time.perf_counter()
+            if sleep_duration > 0:
+                time.sleep(sleep_duration)
+            else:
+                next_tick = time.perf_counter()
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._is_running:
+            return
+        self._is_running = True
+        for attr, handler in [('dashboard_port', self._make_handler()),
+                              ('move_port', self._make_handler()),
+                              ('feedback_port', self._make_feedback_handler())]:
+            server = _EmulatorServer((self.host, getattr(self, attr)), handler)
+            setattr(self, attr, server.server_address[1])  # Port 0 picks a free port
+            self._servers.append(server)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        sim_thread = threading.Thread(target=self._simulation_loop, daemon=True)
+        sim_thread.start()
+        self._threads.append(sim_thread)
+        print(f"Dobot emulator listening on {self.host} "
+              f"({self.dashboard_port}/{self.move_port}/{self.feedback_port}).")
+
+    def drop_connections(self):
+        """Resets every open client connection, like a network glitch. Listening continues."""
+        with self._state_lock:
+            clients = self._command_clients + self._feedback_clients
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        print(f"Dropped {len(clients)} client connection(s).")
+
+    def stop(self):
+        if not self._is_running:
+            return
+        self._is_running = False
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        with self._state_lock:
+            for client in self._feedback_clients:
+                client.close()
+            self._feedback_clients = []
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._servers = []
+        self._threads = []
+        print("Dobot emulator stopped.")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Dobot controller emulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.0, help="Reply latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform reply jitter in seconds.")
+    parser.add_argument("--feedback-period", type=float, default=0.008)
+    args = parser.parse_args()
+
+    emulator = DobotEmulator(host=args.host, latency=args.latency, jitter=args.jitter,
+                             feedback_period=args.feedback_period)
+    emulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
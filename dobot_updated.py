@@ -1,17 +1,20 @@
 # --- START OF FILE dobot.py ---
 
-from dobot_api.dobot_api import DobotApiDashboard, DobotApiMove
+from dobot_api.dobot_api import DobotApiMove
 import traceback
+import concurrent.futures
 import time
-from enum import IntEnum
 import re
 import threading
-
-
-class RobotMode(IntEnum):
-    ENABLED = 5  # Ready and idle
-    RUNNING = 7  # Executing commands
-    ERROR = 4  # Added for completeness, check actual Dobot API for more modes
+import numpy as np
+from feedback_utils import FeedbackReader, FeedbackStore, FeedbackHistory, RobotMode
+from kinematics_utils import Kinematics, IKCache, validate_comparison_set
+from command_utils import CommandSender
+from trajectory_utils import TrajectoryLimiter, TrajectoryStreamer
+from connection_utils import ConnectionSupervisor
+from dashboard_client import DashboardClient
+from gripper_utils import GripperChannel
+from safety_utils import SafetyFilter
 
 
 class Robot:
@@ -27,23 +30,125 @@ class Robot:
         self.move_port = 30003
         self.feedback_port = 30004
         self.target_Tool = 1
+        self.dashboard_max_in_flight = 8  # Pipelined dashboard commands awaiting a reply, 1 = strict request/response
+        self.tool_offset = None  # Offset of tool target_Tool as set on the controller [x, y, z, rx, ry, rz], None if unknown
+
+        # --- Local kinematics: only used once validate_local_ik() passed on this controller and tool ---
+        self.kinematics = Kinematics()
+        self.use_local_ik = False
+        self.local_ik_error = None  # Worst joint error (deg) of the last validate_local_ik()
+
+        # --- IK cache: controller answers, warm starts near cached poses are refined locally ---
+        self.ik_cache = IKCache(size=512)
+        self.ik_warm_start = False  # Set by validate_local_ik(), turned off if a warm start disagrees with the controller
+        self.ik_warm_start_tolerance = 0.5  # deg
+        self.ik_max_warm_start_error = 0.0
+        self._ik_request = None  # Latest (pose, warm start answer) waiting for the controller
+        self._ik_event = threading.Event()
+        self._ik_thread = None
+        self._is_running_ik = False
 
         # --- Threading and State Management ---
-        self.current_pose = [0.0] * 6
-        self.current_angles = [0.0] * 6
-        self._state_lock = threading.Lock()
+        self.state = FeedbackStore()  # Lock-free, written only by the feedback thread
+        self.history = FeedbackHistory(size=256)  # ~2 s of samples at the 125 Hz packet rate
         self._feedback_thread = None
         self._is_running_feedback = False
+        self._health_pose = np.zeros(6)
+        self._health_angles = np.zeros(6)
+
+        # --- Move commands go out from the sender thread, latest setpoint wins ---
+        self.sender = CommandSender(self._send_move_command, name="move")
+
+        # --- Gripper outputs go out from their own thread, confirmed from the feedback stream ---
+        self.gripper_feedback_bits = None  # {tool DO index: bit in DigitalOutputs} if the controller reports them
+        self.gripper = GripperChannel(self._dashboard_batch, self.state.read_packet)
+
+        # --- Safety filter: workspace, joint limits and rate caps on every move command, None disables ---
+        # Its IK reachability check needs the local model, validate_local_ik() attaches it
+        self.safety = SafetyFilter(read_state_fn=self.get_state)
+
+        # --- Streaming mode limits (mm/s, deg/s and their accelerations) ---
+        self.stream_max_linear_velocity = 150.0
+        self.stream_max_angular_velocity = 60.0
+        self.stream_max_linear_acceleration = 600.0
+        self.stream_max_angular_acceleration = 240.0
+        self.stream_max_joint_velocity = 60.0
+        self.stream_max_joint_acceleration = 240.0
+        self.streamer = None
+
+        # --- Startup deadlines (s) ---
+        self.first_feedback_timeout = 2.0
+        self.enable_timeout = 20.0
+        self.enable_retry_interval = 1.0  # Min. time between EnableRobot retries
+        self.mode_poll_interval = 0.004  # Feedback packets arrive every ~8 ms
+        self.startup_report = {}
+
+        # --- Connection supervisor: reconnects dropped channels and re-applies settings ---
+        self.feedback_timeout = 1.0  # s without a feedback packet before the stream counts as dead
+        self._feedback_connected_at = 0.0
+        self.supervisor = ConnectionSupervisor(
+            {'dashboard': (self._connect_dashboard, lambda: self.dashboard.close()),
+             'move': (self._connect_move, lambda: self.move.close()),
+             'feedback': (self._connect_feedback, lambda: self.feedback.close())},
+            on_reconnect=self._reapply_settings,
+            health_check=self._check_feedback_health)
 
     def _connect_dashboard(self):
-        self.dashboard = DobotApiDashboard(self.ip, self.dashboard_port)
+        # Thread-safe and pipelined, the feedback, IK and control threads can share it
+        self.dashboard = DashboardClient(self.ip, self.dashboard_port, max_in_flight=self.dashboard_max_in_flight)
 
     def _connect_move(self):
         self.move = DobotApiMove(self.ip, self.move_port)
 
     def _connect_feedback(self):
-        # Note: This connects to the dashboard port again for polling, as in the original code.
-        self.feedback = DobotApiDashboard(self.ip, self.feedback_port)
+        # Binary real-time stream, the controller pushes one fixed-size packet every ~8 ms.
+        self.feedback = FeedbackReader(self.ip, self.feedback_port)
+        self._feedback_connected_at = time.perf_counter()
+
+    def _apply_settings(self):
+        """Sends speed, joint acceleration and tool settings to the controller."""
+        self.dashboard.call_many([("SpeedFactor", self.speed),
+                                  ("AccJ", self.acj),
+                                  ("Tool", self.target_Tool)])
+
+    def _reapply_settings(self):
+        """Supervisor hook, runs after channels were reconnected."""
+        try:
+            self._apply_settings()
+        except (OSError, UnicodeDecodeError, concurrent.futures.TimeoutError) as e:
+            # The dashboard dropped as well, its own reconnect applies the settings again.
+            # call_many has retrieved every reply, so this is the only line logged.
+            self.supervisor.report_failure("dashboard", e)
+
+    def _check_feedback_health(self):
+        """Health check for the supervisor: the feedback stream is dead if packets stopped coming."""
+        if not self._is_running_feedback:
+            return []
+        _, _, stamp, _ = self.state.read(self._health_pose, self._health_angles)
+        if time.perf_counter() - max(stamp, self._feedback_connected_at) > self.feedback_timeout:
+            return ['feedback']
+        return []
+
+    def _dashboard_call(self, name, *args):
+        """Runs a dashboard command, reconnecting and retrying once if the socket dropped."""
+        for attempt in range(2):
+            try:
+                reply = getattr(self.dashboard, name)(*args)
+                if reply == "":
+                    raise ConnectionError("Dashboard socket closed by the controller.")
+                return reply
+            except (OSError, UnicodeDecodeError) as e:
+                if attempt or not self.supervisor.is_running or not self.supervisor.handle_failure("dashboard", e):
+                    raise
+
+    def _dashboard_batch(self, commands):
+        """Sends [(name, *args), ...] in one write, reconnecting and retrying once if the socket dropped."""
+        for attempt in range(2):
+            try:
+                return self.dashboard.call_batch(commands)
+            except (OSError, UnicodeDecodeError) as e:
+                if attempt or not self.supervisor.is_running or not self.supervisor.handle_failure("dashboard", e):
+                    raise
 
     def _connect_ip(self):
         """Connect to robot dashboard, move, and feedback interfaces"""
@@ -58,42 +163,72 @@ class Robot:
             raise
 
     def initialize(self):
+        """Enables the robot and applies settings, driven by the robot mode in the feedback stream.
+
+        Falls back to polling RobotMode() on the dashboard if the feedback thread is not running.
+        Timings of each step are kept in startup_report.
+        """
         try:
+            start = time.perf_counter()
+            report = {}
+            if self._is_running_feedback:
+                if self._wait_for_feedback(lambda packet: True, self.first_feedback_timeout) is None:
+                    raise TimeoutError("No packet on the feedback stream within timeout.")
+                report['first_feedback'] = time.perf_counter() - start
+
             self.dashboard.ClearError()
             self.dashboard.EnableRobot()
-            time.sleep(2)
             print("Robot Enable command sent.")
 
-            enable_timeout = 20
-            start_enable_wait = time.perf_counter()
-            while time.perf_counter() - start_enable_wait < enable_timeout:
-                mode = self._get_robot_mode()
-                if mode == RobotMode.ENABLED:
+            last_enable = time.perf_counter()
+            last_mode = None
+            while True:
+                mode = self._read_robot_mode()
+                if mode == RobotMode.ENABLED or mode == RobotMode.RUNNING:
                     print("Robot is ENABLED.")
                     break
-                elif mode == RobotMode.ERROR:
-                    print("Robot is in ERROR state. Clearing error...")
+                now = time.perf_counter()
+                if now - start > self.enable_timeout:
+                    raise TimeoutError("Robot did not become enabled within timeout.")
+                if mode != last_mode:
+                    print(f"Waiting for robot to enable. Current mode: {mode}")
+                    last_mode = mode
+                if mode in (RobotMode.ERROR, RobotMode.DISABLED) and now - last_enable > self.enable_retry_interval:
+                    print(f"Robot is in mode {mode}. Clearing error and re-sending EnableRobot...")
                     self.dashboard.ClearError()
                     self.dashboard.EnableRobot()
-                    print("Re-sent EnableRobot command after clearing error.")
-                else:
-                    print(f"Waiting for robot to enable. Current mode: {mode}")
-                time.sleep(0.5)
-            else:
-                raise TimeoutError("Robot did not become enabled within timeout.")
-
-            self.dashboard.SpeedFactor(self.speed)
-            self.dashboard.AccJ(self.acj)
-            self.dashboard.Tool(self.target_Tool)
-            time.sleep(0.1)
+                    last_enable = now
+                time.sleep(self.mode_poll_interval)
+            report['enabled'] = time.perf_counter() - start
+
+            self._apply_settings()
+            report['settings'] = time.perf_counter() - start
+            self.startup_report.update(report)
         except Exception as e:
             print(f"Robot initialization failed: {e}")
             traceback.print_exc()
             raise
 
+    def _wait_for_feedback(self, predicate, timeout):
+        """Polls the feedback store until predicate(packet) holds. Returns the packet or None on timeout."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.state.seq:
+                packet = self.state.read_packet()
+                if predicate(packet):
+                    return packet
+            time.sleep(0.002)
+        return None
+
+    def _read_robot_mode(self):
+        """Robot mode from the latest feedback packet, or from the dashboard without feedback."""
+        if self._is_running_feedback and self.state.seq:
+            return int(self.state.read_packet()['RobotMode'])
+        return self._get_robot_mode()
+
     def _get_robot_mode(self):
         try:
-            response = self.dashboard.RobotMode()
+            response = self._dashboard_call("RobotMode")
             if isinstance(response, str) and ',' in response:
                 return int(response.split(',')[1].strip('{}'))
         except Exception as e:
@@ -101,33 +236,23 @@ class Robot:
         return None
 
     def _feedback_loop(self):
-        """The target function for the feedback thread."""
+        """The target function for the feedback thread.
+
+        Blocks on the 30004 stream, so it runs at the controller's native packet rate
+        without sending anything on the dashboard port.
+        """
         while self._is_running_feedback:
             try:
-                pose_data = self.dashboard.GetPose()
-                angle_data = self.dashboard.GetAngle()
-
-                match_pose = re.search(r'\{([-\d\.\s,]+)\}', pose_data)
-                if match_pose:
-                    position = [float(v.strip()) for v in match_pose.group(1).split(',')]
-                else:
-                    position = self.current_pose
-
-                match_angle = re.search(r'\{([-\d\.\s,]+)\}', angle_data)
-                if match_angle:
-                    angles = [float(v.strip()) for v in match_angle.group(1).split(',')]
-                else:
-                    angles = self.current_angles
-
-                with self._state_lock:
-                    self.current_pose = position
-                    self.current_angles = angles
-
-                time.sleep(0.01)  # Poll at 100Hz
+                packet = self.feedback.read_packet()
+                stamp = time.perf_counter()
+                self.state.publish(packet, stamp)
+                self.history.append(packet, stamp)
 
             except Exception as e:
-                print(f"Error in feedback loop: {e}. Loop will continue.")
-                time.sleep(1)
+                if self._is_running_feedback:
+                    print(f"Error in feedback loop: {e}. Loop will continue.")
+                    if not self.supervisor.is_running or not self.supervisor.handle_failure("feedback", e):
+                        time.sleep(1)
 
     def start_feedback(self):
         """Starts the background thread for polling robot state."""
@@ -148,14 +273,160 @@ class Robot:
 
     def get_data(self):
         """This method gets pose of the robot and joint angles from shared state."""
-        with self._state_lock:
-            # Return copies to prevent race conditions if the caller modifies the list
-            return list(self.current_pose), list(self.current_angles)
+        position, angles, _, _ = self.state.read()
+        return position.tolist(), angles.tolist()
+
+    def get_state(self, pose_out=None, angles_out=None):
+        """Returns (pose, angles, stamp, seq) without blocking on the feedback thread.
+
+        stamp is the time.perf_counter() receive time of the sample and seq counts the
+        samples received so far (0 means no feedback yet), so callers can detect stale data.
+        Pass preallocated arrays as pose_out/angles_out to avoid allocating.
+        """
+        return self.state.read(pose_out, angles_out)
+
+    def get_data_at(self, t):
+        """Gets pose and joint angles interpolated to host time t (time.perf_counter()).
+
+        Reads the feedback history only, so observations can be aligned with a camera
+        frame's capture time without any extra robot I/O.
+        """
+        position, angles = self.history.get_at(t)
+        if position is None:
+            return self.get_data()
+        return position.tolist(), angles.tolist()
+
+    def get_feedback(self):
+        """Returns a copy of the latest decoded feedback packet (speeds, currents, DI/DO, timestamp)."""
+        return self.state.read_packet()
 
     def get_action_angles(self, pose):
         """This method gets inverse solution to getpose to get action angles"""
+        if self.use_local_ik:
+            _, ref_angles, _, _ = self.state.read()
+            angles = self.kinematics.inverse(pose, ref_angles)
+            if not np.isnan(angles[0]):
+                return angles.tolist()
+            print("Local IK found no solution. Asking the controller.")
+            return self.get_action_angles_controller(pose)
+
+        cached = self.ik_cache.get(pose)
+        if cached is not None:
+            return cached.tolist()
+
+        if self.ik_warm_start:
+            near = self.ik_cache.nearest(pose)
+            if near is not None:
+                angles = self.kinematics.inverse(pose, near[1])
+                if not np.isnan(angles[0]):
+                    # Answer now, let the controller confirm it off the critical path
+                    self.ik_cache.count('warm_starts')
+                    self._request_ik(pose, angles)
+                    return angles.tolist()
+
+        self.ik_cache.count('misses')
+        angles = self.get_action_angles_controller(pose)
+        if angles is not None:
+            self.ik_cache.put(pose, angles)
+        return angles
+
+    def _request_ik(self, pose, warm_start):
+        """Hands a pose to the IK thread, an older pending request is dropped."""
+        self._ik_request = (list(pose), warm_start)
+        self._ik_event.set()
+        if not self._is_running_ik:
+            self._is_running_ik = True
+            self._ik_thread = threading.Thread(target=self._ik_loop)
+            self._ik_thread.daemon = True
+            self._ik_thread.start()
+
+    def _ik_loop(self):
+        """The target function for the IK thread. Asks the controller for pending warm-started poses."""
+        while self._is_running_ik:
+            self._ik_event.wait(timeout=0.5)
+            self._ik_event.clear()
+            request, self._ik_request = self._ik_request, None
+            if request is None:
+                continue
+            pose, warm_start = request
+            try:
+                angles = self.get_action_angles_controller(pose)
+            except Exception as e:
+                print(f"Error in IK thread: {e}")
+                continue
+            if angles is None:
+                continue
+            self.ik_cache.put(pose, angles)
+            error = float(np.max(np.abs(np.asarray(angles) - warm_start)))
+            self.ik_max_warm_start_error = max(self.ik_max_warm_start_error, error)
+            if error > self.ik_warm_start_tolerance and self.ik_warm_start:
+                self.ik_warm_start = False
+                print(f"Warning: warm-start IK is {error:.3f} deg off the controller. "
+                      f"Check the kinematics/tool offset. Warm starts disabled.")
+
+    def stop_ik(self):
+        """Stops the background IK thread."""
+        if self._is_running_ik:
+            self._is_running_ik = False
+            self._ik_event.set()
+            if self._ik_thread:
+                self._ik_thread.join()
+
+    def set_tool_offset(self, tool_offset):
+        """Sets the offset of the active tool (target_Tool) for the local kinematics.
+
+        It has to match the tool configured on the controller. A new offset invalidates the
+        local model until validate_local_ik() passes again.
+        """
+        self.tool_offset = None if tool_offset is None else [float(v) for v in tool_offset]
+        self.kinematics.set_tool(self.tool_offset)
+        self.use_local_ik = False
+        self.ik_warm_start = False
+        if self.safety is not None:
+            self.safety.kinematics = None
+
+    def validate_local_ik(self, path, tolerance=0.1):
+        """Checks the local kinematics against a comparison set from record_comparison_set().
+
+        The set must have been recorded on this controller with the current tool offset. Local
+        IK, IK warm starts and the safety filter's reachability check are enabled if every
+        pose solves within tolerance (deg) of the controller's answer. Set use_local_ik back to False afterwards to keep the controller
+        authoritative with only the warm starts. Returns True if it passed.
+        """
+        recorded_tool = np.load(path)['tool']
+        if self.tool_offset is None or not np.allclose(recorded_tool, self.kinematics.tool):
+            print(f"Comparison set was recorded with tool {recorded_tool.tolist()}, "
+                  f"the local model uses {self.tool_offset}. Local IK stays off.")
+            self.use_local_ik = self.ik_warm_start = False
+            return False
+        error = validate_comparison_set(path, self.kinematics)
+        self.local_ik_error = float(np.max(error)) if len(error) and not np.any(np.isnan(error)) else np.inf
+        self.use_local_ik = self.ik_warm_start = self.local_ik_error <= tolerance
+        if self.safety is not None:
+            self.safety.kinematics = self.kinematics if self.use_local_ik else None
+        print(f"Local IK {'enabled' if self.use_local_ik else 'stays off'} "
+              f"(worst error {self.local_ik_error:.4f} deg, tolerance {tolerance} deg).")
+        return self.use_local_ik
+
+    def get_ik_stats(self):
+        """Cache hits/warm starts/misses and the worst warm start vs controller error (deg)."""
+        stats = self.ik_cache.stats()
+        stats['max_warm_start_error'] = self.ik_max_warm_start_error
+        stats['warm_start_enabled'] = self.ik_warm_start
+        return stats
+
+    def get_trajectory_angles(self, poses):
+        """Solves a whole (N, 6) pose trajectory locally in one batched call.
+
+        Each row is solved near the current joint angles, unreachable rows are NaN.
+        """
+        _, ref_angles, _, _ = self.state.read()
+        return self.kinematics.inverse(poses, ref_angles)
+
+    def get_action_angles_controller(self, pose):
+        """Gets the inverse solution from the controller (InverseSolution round-trip)."""
         angles = None
-        angle_data = self.dashboard.InverseSolution(*pose, 0, self.target_Tool)
+        angle_data = self._dashboard_call("InverseSolution", *pose, 0, self.target_Tool)
         match = re.search(r'\{([-\d\.\s,]+)\}', angle_data)
         if match:
             angles = [float(v.strip()) for v in match.group(1).split(',')]
@@ -164,41 +435,151 @@ class Robot:
         return angles
 
     def connect(self):
+        """Connects, enables the robot and starts the background threads.
+
+        Returns once a valid pose is available from get_data(), timings are in startup_report.
+        """
+        start = time.perf_counter()
         self._connect_ip()
+        self.startup_report = {'connect': time.perf_counter() - start}
+        self.start_feedback()  # Feedback first, initialize() waits on its robot mode
         self.initialize()
-        self.start_feedback()
+        self.set_tool_offset(self.tool_offset)
+        if self.safety is not None:
+            self.safety.reset(*self.get_data())
+        self.sender.start()
+        self.gripper.feedback_bits = self.gripper_feedback_bits
+        self.gripper.start()
+        self.supervisor.start()
+        self.startup_report['total'] = time.perf_counter() - start
+        print("Startup timing (s): " + ", ".join(f"{k}={v:.3f}" for k, v in self.startup_report.items()))
 
     def disconnect(self):
+        self.supervisor.stop()
+        self.stop_streaming()
+        self.sender.stop()
+        self.gripper.stop()
         self.stop_feedback()
+        self.stop_ik()
         if self.dashboard:
             try:
                 self.dashboard.DisableRobot()
                 self.move.close()
+                self.feedback.close()
                 self.dashboard.close()
                 print("Robot disconnected.")
             except Exception as e:
                 print(f"Error disabling robot: {e}")
 
-    # --- CRITICAL MODIFICATION: Use non-blocking send ---
+    def _send_move_command(self, command):
+        """Runs on the sender thread: sends one command on the move port and waits for its reply.
+
+        If the socket dropped, waits for the supervisor to reconnect and resends once.
+        """
+        for attempt in range(2):
+            try:
+                self.move.send_data(command)
+                reply = self.move.wait_reply()
+                if reply == "":
+                    raise ConnectionError("Move socket closed by the controller.")
+                return reply
+            except (OSError, UnicodeDecodeError) as e:
+                if attempt or not self.supervisor.is_running or not self.supervisor.handle_failure("move", e):
+                    raise
+
+    def get_connection_report(self):
+        """Status of each channel and the recorded outages with their durations (s)."""
+        return self.supervisor.get_report()
+
     def send_actions(self, x, y, z, rx, ry, rz):
         """
-        Sends the ServoP command without waiting for a reply to avoid blocking the
-        main control loop. This is a "fire-and-forget" approach suitable for
-        high-frequency teleoperation.
+        Posts the ServoP setpoint to the sender thread and returns immediately. If the
+        move port is still busy, an older unsent setpoint is replaced by this one.
+        The setpoint passes the safety filter first.
+        """
+        if self.safety is not None:
+            x, y, z, rx, ry, rz = self.safety.filter_pose((x, y, z, rx, ry, rz))
+        command = f"ServoP({x:.4f},{y:.4f},{z:.4f},{rx:.4f},{ry:.4f},{rz:.4f})"
+        self.sender.submit("ServoP", command)
+
+    def send_angles(self, action_a, t=0.1):
+        """Posts a ServoJ setpoint to the sender thread and returns immediately."""
+        if self.safety is not None:
+            action_a = self.safety.filter_angles(action_a)
+        j1, j2, j3, j4, j5, j6 = action_a
+        gain = 500 # Proportional gain (200-1000). Higher = stiffer, more aggressive.
+        lookahead_time = 50 # Derivative/Damping term (20-100). Higher = smoother.
+        command = f"ServoJ({j1:.4f},{j2:.4f},{j3:.4f},{j4:.4f},{j5:.4f},{j6:.4f},t={t},gain={gain},lookahead_time={lookahead_time})"
+        self.sender.submit("ServoJ", command)
+
+    # --- Streaming mode: sparse targets in, smooth setpoints out at a fixed rate ---
+    def start_streaming(self, rate_hz=125, joint_space=False):
+        """Starts streaming ServoP (or ServoJ with joint_space) setpoints from a timer thread.
+
+        The teleop/policy loop then only calls stream_to()/stream_angles() with its latest
+        target, the streamer interpolates a velocity and acceleration limited path to it.
+        A streamer that stopped on repeated send failures is replaced.
+        """
+        if self.streamer is not None:
+            if self.streamer.error is None:
+                return
+            self.stop_streaming()
+        pose, angles = self.get_data()
+        if self.safety is not None:
+            self.safety.period = 1.0 / rate_hz  # The filter's rate limits step at the stream period
+        if joint_space:
+            limiter = TrajectoryLimiter([self.stream_max_joint_velocity] * 6,
+                                        [self.stream_max_joint_acceleration] * 6)
+            period = 1.0 / rate_hz
+            self.streamer = TrajectoryStreamer(limiter, lambda q: self.send_angles(q, t=period), rate_hz)
+            self.streamer.start(angles)
+        else:
+            limiter = TrajectoryLimiter([self.stream_max_linear_velocity] * 3 + [self.stream_max_angular_velocity] * 3,
+                                        [self.stream_max_linear_acceleration] * 3 + [self.stream_max_angular_acceleration] * 3,
+                                        wrap_mask=[False] * 3 + [True] * 3)
+            self.streamer = TrajectoryStreamer(limiter, lambda p: self.send_actions(*p), rate_hz)
+            self.streamer.start(pose)
+        print(f"Streaming {'ServoJ' if joint_space else 'ServoP'} setpoints at {rate_hz} Hz.")
+
+    def stream_to(self, pose):
+        """Sets the target pose of the streaming mode, returns immediately.
+
+        Raises ConnectionError once the streamer stopped on repeated send failures,
+        start_streaming() again after the connection is back.
         """
-        self.move.ServoP(x, y, z, rx, ry, rz) # This is the original BLOCKING call
+        self.streamer.set_target(pose)
+
+    def stream_angles(self, angles):
+        """Sets the target joint angles of the joint-space streaming mode, returns immediately."""
+        self.streamer.set_target(angles)
 
-        # # Construct the command string manually
-        # command_str = f"ServoP({x:.4f},{y:.4f},{z:.4f},{rx:.4f},{ry:.4f},{rz:.4f})"
-        # # Use the low-level send_data which does not wait for a reply
-        # self.move.send_data(command_str)
+    def get_streaming_stats(self):
+        """Streamer ticks, sent setpoints, send failures and last error, None when not streaming."""
+        return self.streamer.get_stats() if self.streamer is not None else None
+
+    def stop_streaming(self):
+        if self.streamer is not None:
+            self.streamer.stop()
+            self.streamer = None
+            print("Streaming stopped.")
+
+    def get_command_stats(self):
+        """Per-command sent/dropped counts and submit-to-reply latencies of the move port."""
+        return self.sender.get_stats()
+
+    def get_safety_stats(self):
+        """How many move commands the safety filter saw, clamped by each limit or held as unreachable."""
+        return self.safety.get_stats() if self.safety is not None else {}
 
     def toggle_gripper(self):
-        if not self.suction_on:
-            self.suction_on = 1
-            self.dashboard.ToolDOExecute(2, 0)
-            self.dashboard.ToolDOExecute(1, 1)
-        elif self.suction_on:
-            self.suction_on = 0
-            self.dashboard.ToolDOExecute(1, 0)
-            self.dashboard.ToolDOExecute(2, 1)
\ No newline at end of file
+        """Flips the commanded suction state and returns immediately, the gripper thread switches the outputs."""
+        self.suction_on = 0 if self.suction_on else 1
+        self.gripper.set(self.suction_on)
+
+    def get_gripper_state(self):
+        """Returns the last confirmed suction state (0/1), which lags suction_on while the outputs switch."""
+        return self.gripper.confirmed
+
+    def get_gripper_stats(self):
+        """Gripper request counts and latencies (s) from toggle to ack and to confirmed outputs."""
+        return self.gripper.get_stats()
\ No newline at end of file
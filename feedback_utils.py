@@ -0,0 +1,216 @@
+import socket
+from enum import IntEnum
+import numpy as np
+
+
+FEEDBACK_PACKET_SIZE = 1440
+FEEDBACK_TEST_VALUE = 0x0123456789ABCDEF
+TEST_VALUE_OFFSET = 48
+
+# Fields of the fixed-layout packet the controller pushes on port 30004
+# (TCP-IP protocol V4, little endian). Only the fields we use are named,
+# the offsets come from the controller's feedback table and the rest of
+# the 1440 bytes is skipped by numpy.
+FEEDBACK_DTYPE = np.dtype({
+    'names': ['len', 'DigitalInputs', 'DigitalOutputs', 'RobotMode', 'TimeStamp', 'TestValue',
+              'SpeedScaling', 'QTarget', 'QActual', 'QDActual', 'IActual',
+              'ToolVectorActual', 'TCPSpeedActual'],
+    'formats': ['<u2', '<u8', '<u8', '<u8', '<u8', '<u8',
+                '<f8', ('<f8', (6,)), ('<f8', (6,)), ('<f8', (6,)), ('<f8', (6,)),
+                ('<f8', (6,)), ('<f8', (6,))],
+    'offsets': [0, 8, 16, 24, 32, TEST_VALUE_OFFSET,
+                64, 192, 432, 480, 528,
+                624, 672],
+    'itemsize': FEEDBACK_PACKET_SIZE,
+})
+_MAGIC = FEEDBACK_TEST_VALUE.to_bytes(8, 'little')
+
+
+class RobotMode(IntEnum):
+    """Values of the RobotMode field (and of the RobotMode() dashboard reply)."""
+    DISABLED = 4  # Powered, not enabled
+    ENABLED = 5  # Ready and idle
+    RUNNING = 7  # Executing commands
+    ERROR = 9  # Alarm, needs ClearError()
+
+
+def is_aligned(buffer):
+    """True if the packet buffer has the TestValue at its offset."""
+    return buffer[TEST_VALUE_OFFSET:TEST_VALUE_OFFSET + 8] == _MAGIC
+
+
+def resync_offset(buffer):
+    """Where a misaligned packet buffer realigns on the TestValue field.
+
+    Returns the offset to keep buffer[offset:] from, as many bytes as the offset then have to
+    be read to complete the packet. Without a TestValue in the buffer its last 7 bytes are
+    kept, in case the value straddles two reads. Shared by the socket and asyncio readers.
+    """
+    idx = buffer.find(_MAGIC)
+    if idx < 0:
+        return FEEDBACK_PACKET_SIZE - 7
+    # If the header of that packet is already gone, the next packet starts inside the buffer
+    return (idx - TEST_VALUE_OFFSET) % FEEDBACK_PACKET_SIZE
+
+
+class FeedbackReader:
+    """Reads the binary real-time feedback stream (port 30004) into FEEDBACK_DTYPE records."""
+
+    def __init__(self, ip, port=30004, timeout=1.0):
+        self.ip = ip
+        self.port = port
+        self.socket_dobot = socket.create_connection((ip, port), timeout=timeout)
+        self._buffer = bytearray(FEEDBACK_PACKET_SIZE)
+        self._view = memoryview(self._buffer)
+        # The record is a view onto _buffer, it is overwritten by every read_packet() call
+        self.packet = np.frombuffer(self._buffer, dtype=FEEDBACK_DTYPE)[0]
+        self.packets_read = 0
+        self.resyncs = 0
+
+    def _recv_exact(self, start):
+        """Fill _buffer from start to the end of the packet."""
+        while start < FEEDBACK_PACKET_SIZE:
+            n = self.socket_dobot.recv_into(self._view[start:], FEEDBACK_PACKET_SIZE - start)
+            if n == 0:
+                raise ConnectionError("Feedback socket closed by the controller.")
+            start += n
+
+    def _resync(self):
+        """Realign to the packet boundary using the constant TestValue field."""
+        self.resyncs += 1
+        start = resync_offset(self._buffer)
+        remaining = FEEDBACK_PACKET_SIZE - start
+        self._buffer[:remaining] = self._buffer[start:]
+        self._recv_exact(remaining)
+
+    def read_packet(self):
+        """Blocks for the next packet and returns it decoded (a view, copy it to keep it)."""
+        self._recv_exact(0)
+        while not is_aligned(self._buffer):
+            print("Feedback stream out of sync. Realigning...")
+            self._resync()
+        self.packets_read += 1
+        return self.packet
+
+    def close(self):
+        if self.socket_dobot:
+            self.socket_dobot.close()
+            self.socket_dobot = None
+
+
+class FeedbackStore:
+    """Lock-free store for the latest feedback sample (one writer, any number of readers).
+
+    Two preallocated slots are used as a double buffer, each guarded by its own sequence
+    counter that is odd while the writer fills it. The writer always fills the slot that is
+    not published, so a reader only retries if it got lapped and never waits on the writer.
+    """
+
+    def __init__(self):
+        self.seq = 0  # Number of samples published so far
+        self._slot_seq = [0, 0]
+        self._pose = np.zeros((2, 6))
+        self._angles = np.zeros((2, 6))
+        self._stamp = np.zeros(2)
+        self._packet = np.zeros(2, dtype=FEEDBACK_DTYPE)
+
+    def publish(self, packet, stamp):
+        """Writer side: copies a decoded packet and its host receive time (perf_counter)."""
+        slot = (self.seq + 1) & 1
+        self._slot_seq[slot] += 1
+        self._pose[slot] = packet['ToolVectorActual']
+        self._angles[slot] = packet['QActual']
+        self._packet[slot] = packet
+        self._stamp[slot] = stamp
+        self._slot_seq[slot] += 1
+        self.seq += 1
+
+    def read(self, pose_out=None, angles_out=None):
+        """Returns (pose, angles, stamp, seq) of the latest sample.
+
+        Pass preallocated pose_out/angles_out arrays to read without allocating.
+        seq is 0 until the first packet arrives.
+        """
+        if pose_out is None:
+            pose_out = np.empty(6)
+        if angles_out is None:
+            angles_out = np.empty(6)
+        while True:
+            seq = self.seq
+            slot = seq & 1
+            slot_seq = self._slot_seq[slot]
+            if slot_seq & 1:
+                continue  # Lapped by the writer, the other slot is complete now
+            np.copyto(pose_out, self._pose[slot])
+            np.copyto(angles_out, self._angles[slot])
+            stamp = self._stamp[slot]
+            if self._slot_seq[slot] == slot_seq:
+                return pose_out, angles_out, float(stamp), seq
+
+    def read_packet(self):
+        """Returns a copy of the full latest decoded packet."""
+        while True:
+            slot = self.seq & 1
+            slot_seq = self._slot_seq[slot]
+            if slot_seq & 1:
+                continue
+            packet = self._packet[slot].copy()
+            if self._slot_seq[slot] == slot_seq:
+                return packet
+
+
+def wrap_degrees(delta):
+    return (delta + 180.0) % 360.0 - 180.0
+
+
+class FeedbackHistory:
+    """Fixed-size ring buffer of recent feedback samples with time-interpolated lookup.
+
+    Samples are appended by the feedback thread with their host receive time, so state can be
+    read back at any recent host timestamp (e.g. a camera frame's capture time).
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.count = 0  # Total samples appended, the next one goes to count % size
+        self._stamps = np.zeros(size)
+        self._pose = np.zeros((size, 6))
+        self._angles = np.zeros((size, 6))
+
+    def append(self, packet, stamp):
+        idx = self.count % self.size
+        self._stamps[idx] = stamp
+        self._pose[idx] = packet['ToolVectorActual']
+        self._angles[idx] = packet['QActual']
+        self.count += 1
+
+    def get_at(self, t):
+        """Returns (pose, angles) linearly interpolated to host time t (perf_counter).
+
+        Times outside the buffered window are clamped to the oldest/newest sample.
+        Rotations are interpolated along the shortest path across +/-180 deg.
+        Returns (None, None) while the buffer is empty.
+        """
+        while True:
+            count = self.count
+            if count == 0:
+                return None, None
+            # The slot at count % size is the next one to be overwritten, leave it out
+            first = max(0, count - self.size + 1)
+            order = np.arange(first, count) % self.size
+            stamps = self._stamps[order]
+            i = int(np.searchsorted(stamps, t))
+            lo, hi = order[max(i - 1, 0)], order[min(i, len(order) - 1)]
+            pose_lo, pose_hi = self._pose[lo].copy(), self._pose[hi].copy()
+            angles_lo, angles_hi = self._angles[lo].copy(), self._angles[hi].copy()
+            t_lo, t_hi = self._stamps[lo], self._stamps[hi]
+            if self.count - self.size < first:
+                break  # Nothing we used was overwritten while reading
+
+        if hi == lo or t_hi <= t_lo:
+            return pose_lo, angles_lo
+        alpha = (t - t_lo) / (t_hi - t_lo)
+        pose = pose_lo + alpha * (pose_hi - pose_lo)
+        pose[3:] = wrap_degrees(pose_lo[3:] + alpha * wrap_degrees(pose_hi[3:] - pose_lo[3:]))
+        angles = angles_lo + alpha * (angles_hi - angles_lo)
+        return pose, angles
@@ -4,13 +4,23 @@ import pygame
 import time
 import socket
 import threading
-from queue import Queue
 import traceback  # Useful for debugging
 
 # Assuming these are your custom utility classes
 from dobot import Robot
-from camera_utils import Camera
-from record import RecordData
+from safety_utils import clip_pose
+from camera_utils import Camera, ProcessCamera, ReplayCamera
+from record import RecordData, RecordQueue
+
+
+def drop_frames(data_packet):
+    """Releases a queued packet's frame buffers, returns the packet with only its robot state."""
+    (timestamp, frames, obs_pose, obs_angles, obs_gripper, actions_p, action_gripper,
+     sync_skew, depth) = data_packet
+    for buffer in list(frames.values()) + list(depth.values()):
+        if buffer is not None:
+            buffer.release()
+    return timestamp, {}, obs_pose, obs_angles, obs_gripper, actions_p, action_gripper, sync_skew, {}
 
 
 # --- Recorder Worker Function (runs in a separate thread) ---
@@ -28,10 +38,21 @@ def recorder_worker(queue, record_obj):
                 print("Sentinel received. Recorder thread shutting down.")
                 break
 
-            timestamp, top_frame, wrist_frame, obs_pose, obs_angles, obs_gripper, actions_p, action_gripper = data_packet
-
-            record_obj.collect_data_point(timestamp, top_frame, wrist_frame, obs_pose, obs_angles, obs_gripper,
-                                          actions_p, action_gripper)
+            (timestamp, frames, obs_pose, obs_angles, obs_gripper, actions_p, action_gripper,
+             sync_skew, depth) = data_packet
+
+            try:
+                record_obj.collect_data_point(
+                    timestamp, {cam_type: buffer.array for cam_type, buffer in frames.items()}, obs_pose, obs_angles,
+                    obs_gripper, actions_p, action_gripper,
+                    infos={cam_type: buffer.info for cam_type, buffer in frames.items()}, sync_skew=sync_skew,
+                    depth={cam_type: buffer.array if buffer else None for cam_type, buffer in depth.items()},
+                    views={cam_type: buffer.views for cam_type, buffer in frames.items()})
+            finally:
+                # The frames are written, hand the buffers back to the camera's pool
+                for buffer in list(frames.values()) + list(depth.values()):
+                    if buffer is not None:
+                        buffer.release()
         except Exception as e:
             print(f"Error in recorder thread: {e}")
             break
@@ -45,6 +66,14 @@ def recorder_worker(queue, record_obj):
 # --- Configuration ---
 TARGET_HZ = 15  # Let's aim for a slightly higher, more responsive rate
 target_period = 1 / TARGET_HZ
+CAMERA_CONFIG = None  # Camera registry {name: {'serial', 'resolution', 'fps', 'format', 'views'}}, None = top and wrist
+REPLAY_SOURCES = None  # e.g. {'top': 'top.mp4', 'wrist': None} (None = synthetic) to run without cameras
+ENABLE_DEPTH = False  # Record depth aligned to color as 16-bit PNGs next to the videos
+CAPTURE_PROCESSES = False  # Capture each camera in its own process (shared memory frames, no depth)
+RECORD_QUEUE_SIZE = 16  # Packets with frames waiting for the recorder, ~1 s at TARGET_HZ
+RECORD_QUEUE_POLICY = 'drop_video'  # 'block', 'drop_oldest' or 'drop_video' (keep the CSV row) when full
+PARALLEL_ENCODING = True  # One encoder process per video instead of encoding on the recorder thread
+STREAM_RATE_HZ = 125  # ServoP setpoints are interpolated and streamed at this rate, independent of TARGET_HZ
 episode_num = "0140"
 task = "Take out all the items from the basket and place it on the table"
 base_path = "dobot_data/02_July_pick_place_colored_boxes/obs_data"
@@ -60,23 +89,27 @@ MAX_ANGULAR_VELOCITY = 35.0  # Max speed in degrees/s
 
 # --- Initialize Objects ---
 r_obj = Robot()
-c_obj = Camera()
+if REPLAY_SOURCES is not None:
+    c_obj = ReplayCamera(REPLAY_SOURCES, camera_config=CAMERA_CONFIG)
+elif CAPTURE_PROCESSES:
+    c_obj = ProcessCamera(camera_config=CAMERA_CONFIG)
+else:
+    c_obj = Camera(enable_depth=ENABLE_DEPTH, camera_config=CAMERA_CONFIG)
 record_obj = RecordData(task, c_obj)
 
 # --- Setup Connections and Recordings ---
 r_obj.connect()  # This now also starts the robot's feedback thread
-c_obj.start_capture()  # Manually start the camera capture thread
+c_obj.start_capture()  # Manually start the camera capture threads
+c_obj.reset_frame_stats()  # Sync skew and duplicate/skipped frame statistics are per episode
+if not c_obj.wait_for_new_frame(timeout=5.0):
+    print("Warning: Not every camera delivered a frame within 5 s.")
 
-# Wait a moment for the first feedback to arrive
-time.sleep(0.5)
+# connect() returns once the feedback stream delivered the robot's pose
 initial_pose, _ = r_obj.get_data()
 if not any(initial_pose):  # Check if the pose is all zeros
-    print("Warning: Initial robot pose is all zeros. Waiting a bit longer...")
-    time.sleep(1.0)
-    initial_pose, _ = r_obj.get_data()
-    if not any(initial_pose):
-        raise RuntimeError("Failed to get initial robot pose. Check connection.")
+    raise RuntimeError("Failed to get initial robot pose. Check connection.")
 print("Initial pose is: ", initial_pose)
+r_obj.start_streaming(rate_hz=STREAM_RATE_HZ)
 
 pygame.init()
 pygame.joystick.init()
@@ -92,12 +125,14 @@ else:
     # exit()
 
 # --- Setup Threading for Recording ---
-data_queue = Queue()
+data_queue = RecordQueue(drop_frames, maxsize=RECORD_QUEUE_SIZE, policy=RECORD_QUEUE_POLICY)
 record_obj.setup_data_recording(
     base_path=base_path,
     csv_filename=csv_filename,
     top_video_filename=top_video_filename,
-    wrist_video_filename=wrist_video_filename
+    wrist_video_filename=wrist_video_filename,
+    record_depth=ENABLE_DEPTH,
+    parallel_encoding=PARALLEL_ENCODING
 )
 recorder_thread = threading.Thread(target=recorder_worker, args=(data_queue, record_obj))
 recorder_thread.start()
@@ -117,10 +152,21 @@ try:
         delta_time = loop_start_time - last_loop_time
         last_loop_time = loop_start_time
 
-        # --- Fast, NON-BLOCKING data acquisition (for observation/logging) ---
-        obs_pose, obs_angles = r_obj.get_data()
-        obs_gripper = r_obj.suction_on
-        top_frame, wrist_frame = c_obj.capture_frames()
+        # --- Fast data acquisition (for observation/logging) ---
+        # Wait (at most one period) for new frames instead of recording the previous ones again
+        c_obj.wait_for_new_frame(timeout=target_period)
+        # Best matched frame of every camera (pooled buffers, released by the recorder thread),
+        # the robot state is interpolated to the first camera's (top's) capture time
+        frames, sync_skew = c_obj.get_synced_frames()
+        reference_info = frames[c_obj.camera_names[0]].info
+        frame_time = reference_info['capture_time'] if reference_info else loop_start_time
+        obs_pose, obs_angles = r_obj.get_data_at(frame_time)
+        obs_gripper = r_obj.get_gripper_state()
+        depth = {}
+        if ENABLE_DEPTH:
+            # Depth aligned to the same color frames, looked up by frame number
+            depth = {cam_type: c_obj.get_depth_buffer(cam_type, buffer.info['frame_number'] if buffer.info else None)
+                     for cam_type, buffer in frames.items()}
 
         # --- Event Polling ---
         for event in pygame.event.get():
@@ -160,24 +206,19 @@ try:
             if joystick.get_button(6): command_pose[5] -= MAX_ANGULAR_VELOCITY * delta_time
 
             # Apply safety limits to the final commanded pose
-            command_pose[0] = max(min(command_pose[0], 750), 240)
-            command_pose[1] = max(min(command_pose[1], 550), -330)
-            command_pose[2] = max(min(command_pose[2], 300), -20)
-            command_pose[3] = max(min(command_pose[3], 180), -180)
-            command_pose[4] = max(min(command_pose[4], 180), -180)
-            command_pose[5] = max(min(command_pose[5], 180), -180)
+            command_pose = clip_pose(command_pose)
 
         # If no joystick, the command_pose simply stays where it is.
         action_gripper = r_obj.suction_on
         # action_a = r_obj.get_action_angles(command_pose)
 
-        # --- Send the calculated ideal pose to the robot (NON-BLOCKING) ---
-        r_obj.send_actions(*command_pose)
+        # --- Hand the ideal pose to the streaming thread (NON-BLOCKING) ---
+        r_obj.stream_to(command_pose)
 
         # --- Put all data into the queue for the recorder thread ---
         # We log the observation (obs_*) and the command we sent (command_pose)
         data_packet = (
-        total_timestamp, top_frame, wrist_frame, obs_pose, obs_angles, obs_gripper, command_pose, action_gripper)
+        total_timestamp, frames, obs_pose, obs_angles, obs_gripper, command_pose, action_gripper, sync_skew, depth)
         data_queue.put(data_packet)
 
         # --- FPS Control ---
@@ -198,13 +239,16 @@ finally:
     print("\nMain loop finished. Starting graceful shutdown.")
     pygame.quit()
 
-    # 1. Stop the camera thread and close pipelines
+    # 1. Stop the camera threads and close pipelines
     if 'c_obj' in locals():
+        print(f"Camera sync this episode: {c_obj.synchronizer.get_stats()}")
+        print(f"Camera frames this episode: {c_obj.get_frame_stats()}")
         c_obj.close()
 
     # 2. Signal the recorder thread to stop by sending the 'None' sentinel
     if 'data_queue' in locals():
-        data_queue.put(None)
+        print(f"Recorder queue this episode: {data_queue.get_stats()}")
+        data_queue.close()
 
     # 3. Wait for the recorder thread to finish processing all items
     if 'recorder_thread' in locals() and recorder_thread.is_alive():
@@ -0,0 +1,146 @@
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+
+
+def slot_size(shape, dtype, view_shapes=None):
+    """Bytes of one shared memory slot holding a frame and its views, 64-byte aligned."""
+    itemsize = np.dtype(dtype).itemsize
+    size = 0
+    for frame_shape in [shape] + list((view_shapes or {}).values()):
+        size += -(-int(np.prod(frame_shape)) * itemsize // 64) * 64
+    return size
+
+
+def slot_arrays(memory, offset, shape, dtype, view_shapes=None):
+    """(frame, {view name: array}) laid out as in slot_size(), views of memory at offset."""
+    itemsize = np.dtype(dtype).itemsize
+    arrays = []
+    for frame_shape in [shape] + list((view_shapes or {}).values()):
+        arrays.append(np.ndarray(frame_shape, dtype=dtype, buffer=memory, offset=offset))
+        offset += -(-int(np.prod(frame_shape)) * itemsize // 64) * 64
+    return arrays[0], dict(zip((view_shapes or {}).keys(), arrays[1:]))
+
+
+class FrameBuffer:
+    """A preallocated frame array from a FramePool, shared by reference count.
+
+    Everyone who keeps the buffer beyond the call that handed it over (the camera's
+    history, the control loop, the recorder queue) holds one reference. The buffer goes
+    back to its pool after the last release() and is then overwritten by a later frame.
+
+    views holds preallocated arrays for derived views of the frame (e.g. a downscaled
+    crop), filled together with array and shared under the same reference count. With
+    memory (a shared memory buffer) the arrays are views of it at offset instead of owned.
+    """
+
+    def __init__(self, pool, shape, dtype, view_shapes=None, memory=None, offset=0, index=0):
+        self.pool = pool
+        self.index = index  # Position in the pool, names the slot across processes
+        if memory is None:
+            self.array = np.zeros(shape, dtype=dtype)
+            self.views = {name: np.zeros(view_shape, dtype=dtype)
+                          for name, view_shape in (view_shapes or {}).items()}
+        else:
+            self.array, self.views = slot_arrays(memory, offset, shape, dtype, view_shapes)
+        self.info = None
+        self._refs = 0
+
+    def retain(self):
+        if self.pool is not None:
+            self.pool._retain(self)
+        return self
+
+    def release(self):
+        if self.pool is not None:
+            self.pool._release(self)
+
+
+class FramePool:
+    """Fixed set of FrameBuffers for one camera stream, no allocation after construction.
+
+    acquire() hands out a free buffer with one reference, or None when every buffer is
+    still referenced, in which case the caller drops the frame (counted in stats). Memory
+    use is bounded by size frames whatever the consumers do.
+
+    With shared=True the buffers are slots of one multiprocessing.shared_memory block
+    (shm, slot_size bytes each), so another process can fill them by index; close()
+    frees the block once no buffer is referenced anymore.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, size=16, view_shapes=None, shared=False):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self.view_shapes = {name: tuple(view_shape) for name, view_shape in (view_shapes or {}).items()}
+        self.shm = None
+        self.slot_size = slot_size(self.shape, self.dtype, self.view_shapes)
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * self.slot_size)
+        self._lock = threading.Lock()
+        self._closing = False
+        self.buffers = [FrameBuffer(self, self.shape, self.dtype, self.view_shapes,
+                                    self.shm.buf if shared else None, i * self.slot_size, i)
+                        for i in range(size)]
+        self._free = list(self.buffers)
+        self.stats = {'acquired': 0, 'exhausted': 0}
+
+    def acquire(self):
+        with self._lock:
+            if self._closing:
+                return None
+            if not self._free:
+                self.stats['exhausted'] += 1
+                return None
+            buffer = self._free.pop()
+            buffer._refs = 1
+            buffer.info = None
+            self.stats['acquired'] += 1
+            return buffer
+
+    def _retain(self, buffer):
+        with self._lock:
+            if buffer._refs <= 0:
+                raise RuntimeError("Retaining a frame buffer that was already returned to its pool.")
+            buffer._refs += 1
+
+    def _release(self, buffer):
+        with self._lock:
+            if buffer._refs <= 0:
+                raise RuntimeError("Frame buffer released more often than retained.")
+            buffer._refs -= 1
+            if buffer._refs == 0:
+                self._free.append(buffer)
+                if self._closing and len(self._free) == self.size:
+                    self._free_memory()
+
+    def close(self):
+        """Frees the shared memory of a shared pool, deferred until the last buffer is released."""
+        with self._lock:
+            if self.shm is None:
+                return
+            self._closing = True
+            if len(self._free) == self.size:
+                self._free_memory()
+
+    def _free_memory(self):
+        for buffer in self.buffers:
+            buffer.array = None
+            buffer.views = {}
+        try:
+            self.shm.close()
+        except BufferError:
+            print("Warning: Frame arrays still in use, shared memory is unmapped once they are dropped.")
+        self.shm.unlink()
+        self.shm = None
+
+    @property
+    def in_use(self):
+        with self._lock:
+            return self.size - len(self._free)
+
+    def get_stats(self):
+        report = dict(self.stats)
+        report['in_use'] = self.in_use
+        report['size'] = self.size
+        return report
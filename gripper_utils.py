@@ -0,0 +1,133 @@
+import threading
+import time
+
+
+class GripperChannel:
+    """Drives the suction gripper's tool outputs from a background thread.
+
+    set() only posts the wanted state (latest wins), the thread writes both ToolDOExecute
+    commands in one batch, checks the controller's replies and then waits until the
+    feedback stream shows the outputs switched. The state is only reported as confirmed
+    once that happened, with the time each stage took.
+
+    feedback_bits maps tool DO index -> bit of the packet's DigitalOutputs word. Without
+    it (the controller does not report the tool outputs there) the acknowledged replies
+    are the confirmation and confirmed_by is 'ack'.
+    """
+
+    # Tool DO levels per gripper state: 1 = suction (DO1 on, DO2 off), 0 = release
+    OUTPUTS = {1: ((2, 0), (1, 1)), 0: ((1, 0), (2, 1))}
+
+    def __init__(self, send_batch_fn, read_packet_fn, feedback_bits=None, confirm_timeout=0.5,
+                 poll_interval=0.002):
+        self.send_batch_fn = send_batch_fn  # Sends [(name, *args), ...] in one write, returns the replies
+        self.read_packet_fn = read_packet_fn  # Returns the latest feedback packet (or None)
+        self.feedback_bits = feedback_bits
+        self.confirm_timeout = confirm_timeout
+        self.poll_interval = poll_interval
+
+        self.commanded = 0
+        self.confirmed = 0
+        self.confirmed_by = None  # 'feedback' or 'ack'
+        self.pending = False
+        self.last_actuation = {}
+        self.stats = {'requests': 0, 'sent': 0, 'confirmed': 0, 'superseded': 0, 'errors': 0, 'timeouts': 0,
+                      'max_actuation_latency': 0.0, 'total_actuation_latency': 0.0}
+
+        self._slot = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._is_running = False
+
+    def set(self, on):
+        """Posts the wanted gripper state, returns immediately."""
+        with self._cond:
+            if self._slot is not None:
+                self.stats['superseded'] += 1
+            self._slot = (1 if on else 0, time.perf_counter())
+            self.commanded = self._slot[0]
+            self.pending = True
+            self.stats['requests'] += 1
+            self._cond.notify()
+
+    def _outputs_match(self, state):
+        packet = self.read_packet_fn()
+        if packet is None:
+            return False
+        outputs = int(packet['DigitalOutputs'])
+        return all((outputs >> self.feedback_bits[index] & 1) == level
+                   for index, level in self.OUTPUTS[state] if index in self.feedback_bits)
+
+    def _actuate(self, state, submitted_at):
+        commands = [("ToolDOExecute", index, level) for index, level in self.OUTPUTS[state]]
+        replies = self.send_batch_fn(commands)
+        acked_at = time.perf_counter()
+        for reply in replies:
+            if reply.split(',', 1)[0].strip() != '0':
+                raise RuntimeError(f"Controller rejected {reply}")
+        self.stats['sent'] += 1
+
+        confirmed_by = 'ack'
+        if self.feedback_bits:
+            deadline = acked_at + self.confirm_timeout
+            while not self._outputs_match(state):
+                if time.perf_counter() > deadline or self._slot is not None:
+                    # Timed out, or a newer request supersedes this one, which is then the one to confirm
+                    if self._slot is None:
+                        self.stats['timeouts'] += 1
+                        print(f"Gripper outputs not confirmed by feedback within {self.confirm_timeout} s.")
+                    return
+                time.sleep(self.poll_interval)
+            confirmed_by = 'feedback'
+
+        confirmed_at = time.perf_counter()
+        latency = confirmed_at - submitted_at
+        with self._cond:
+            self.confirmed = state
+            self.confirmed_by = confirmed_by
+            self.pending = self._slot is not None
+            self.last_actuation = {'state': state, 'ack_latency': acked_at - submitted_at,
+                                   'actuation_latency': latency, 'confirmed_by': confirmed_by}
+            self.stats['confirmed'] += 1
+            self.stats['total_actuation_latency'] += latency
+            self.stats['max_actuation_latency'] = max(self.stats['max_actuation_latency'], latency)
+
+    def _gripper_loop(self):
+        """The target function for the gripper thread."""
+        while self._is_running:
+            with self._cond:
+                while self._slot is None and self._is_running:
+                    self._cond.wait(timeout=0.5)
+                if self._slot is None:
+                    continue
+                state, submitted_at = self._slot
+                self._slot = None
+            try:
+                self._actuate(state, submitted_at)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Error in gripper thread: {e}")
+
+    def start(self):
+        """Starts the background gripper thread."""
+        if not self._is_running:
+            self._is_running = True
+            self._thread = threading.Thread(target=self._gripper_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        if self._is_running:
+            self._is_running = False
+            with self._cond:
+                self._cond.notify()
+            if self._thread:
+                self._thread.join()
+
+    def get_stats(self):
+        """Counts and latencies (s); actuation latency is set() to confirmed outputs."""
+        report = dict(self.stats)
+        confirmed = report['confirmed']
+        report['mean_actuation_latency'] = report['total_actuation_latency'] / confirmed if confirmed else 0.0
+        report['last_actuation'] = dict(self.last_actuation)
+        return report
@@ -0,0 +1,399 @@
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+from feedback_utils import wrap_degrees
+
+
+# Standard DH parameters (mm, deg) of the 6-axis arm. The CR geometry is UR-like, with
+# -90 deg offsets on J2 and J4 so that zero joint angles match the controller's zero pose.
+CR5_DH = {
+    'd': [147.0, 0.0, 0.0, 141.0, 116.0, 105.0],
+    'a': [0.0, -427.0, -357.0, 0.0, 0.0, 0.0],
+    'alpha': [90.0, 0.0, 0.0, 90.0, -90.0, 0.0],
+    'offset': [0.0, -90.0, 0.0, -90.0, 0.0, 0.0],
+}
+
+
+def pose_to_matrix(poses):
+    """(..., 6) poses [x, y, z, rx, ry, rz] (mm, deg) to (..., 4, 4) transforms.
+
+    Rotation follows the controller convention R = Rz(rz) @ Ry(ry) @ Rx(rx).
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    rx, ry, rz = np.moveaxis(np.radians(poses[..., 3:6]), -1, 0)
+    cx, sx, cy, sy, cz, sz = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry), np.cos(rz), np.sin(rz)
+    T = np.zeros(poses.shape[:-1] + (4, 4))
+    T[..., 0, 0] = cz * cy
+    T[..., 0, 1] = cz * sy * sx - sz * cx
+    T[..., 0, 2] = cz * sy * cx + sz * sx
+    T[..., 1, 0] = sz * cy
+    T[..., 1, 1] = sz * sy * sx + cz * cx
+    T[..., 1, 2] = sz * sy * cx - cz * sx
+    T[..., 2, 0] = -sy
+    T[..., 2, 1] = cy * sx
+    T[..., 2, 2] = cy * cx
+    T[..., :3, 3] = poses[..., :3]
+    T[..., 3, 3] = 1.0
+    return T
+
+
+def matrix_to_pose(T):
+    """(..., 4, 4) transforms to (..., 6) poses, inverse of pose_to_matrix."""
+    T = np.asarray(T, dtype=np.float64)
+    poses = np.empty(T.shape[:-2] + (6,))
+    poses[..., :3] = T[..., :3, 3]
+    poses[..., 3] = np.arctan2(T[..., 2, 1], T[..., 2, 2])
+    poses[..., 4] = np.arctan2(-T[..., 2, 0], np.hypot(T[..., 2, 1], T[..., 2, 2]))
+    poses[..., 5] = np.arctan2(T[..., 1, 0], T[..., 0, 0])
+    poses[..., 3:] = np.degrees(poses[..., 3:])
+    return poses
+
+
+def _dh_matrix(theta, d, a, alpha):
+    """Batched standard DH link transform, theta in rad (any shape), d/a/alpha scalars."""
+    ct, st = np.cos(theta), np.sin(theta)
+    ca, sa = np.cos(alpha), np.sin(alpha)
+    T = np.zeros(np.shape(theta) + (4, 4))
+    T[..., 0, 0] = ct
+    T[..., 0, 1] = -st * ca
+    T[..., 0, 2] = st * sa
+    T[..., 0, 3] = a * ct
+    T[..., 1, 0] = st
+    T[..., 1, 1] = ct * ca
+    T[..., 1, 2] = -ct * sa
+    T[..., 1, 3] = a * st
+    T[..., 2, 1] = sa
+    T[..., 2, 2] = ca
+    T[..., 2, 3] = d
+    T[..., 3, 3] = 1.0
+    return T
+
+
+# --- Plain float 3x4 transforms [[r00, r01, r02, px], ...] for the single-pose path ---
+def _pose_rt(pose):
+    """One pose [x, y, z, rx, ry, rz] to a 3x4 transform, as pose_to_matrix."""
+    x, y, z, rx, ry, rz = pose
+    rx, ry, rz = math.radians(rx), math.radians(ry), math.radians(rz)
+    cx, sx, cy, sy, cz, sz = math.cos(rx), math.sin(rx), math.cos(ry), math.sin(ry), math.cos(rz), math.sin(rz)
+    return ((cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx, x),
+            (sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx, y),
+            (-sy, cy * sx, cy * cx, z))
+
+
+def _rt_mul(A, B):
+    (b00, b01, b02, b03), (b10, b11, b12, b13), (b20, b21, b22, b23) = B
+    return tuple((a0 * b00 + a1 * b10 + a2 * b20, a0 * b01 + a1 * b11 + a2 * b21,
+                  a0 * b02 + a1 * b12 + a2 * b22, a0 * b03 + a1 * b13 + a2 * b23 + a3) for a0, a1, a2, a3 in A)
+
+
+def _rt_inv(A):
+    (r00, r01, r02, x), (r10, r11, r12, y), (r20, r21, r22, z) = A
+    return ((r00, r10, r20, -(r00 * x + r10 * y + r20 * z)),
+            (r01, r11, r21, -(r01 * x + r11 * y + r21 * z)),
+            (r02, r12, r22, -(r02 * x + r12 * y + r22 * z)))
+
+
+def _rt_dh(theta, d, a, ca, sa):
+    ct, st = math.cos(theta), math.sin(theta)
+    return ((ct, -st * ca, st * sa, a * ct),
+            (st, ct * ca, -ct * sa, a * st),
+            (0.0, sa, ca, d))
+
+
+def _acos_unit(x, tol=1e-9):
+    """acos with rounding noise clipped, None clearly outside [-1, 1] (as _clip_unit)."""
+    if abs(x) > 1.0 + tol:
+        return None
+    return math.acos(min(max(x, -1.0), 1.0))
+
+
+def _clip_unit(x, tol=1e-9):
+    """Clips rounding noise into [-1, 1] for arccos, values clearly outside become NaN."""
+    return np.where(np.abs(x) <= 1.0 + tol, np.clip(x, -1.0, 1.0), np.nan)
+
+
+def _invert(T):
+    """Batched inverse of rigid transforms."""
+    inv = np.zeros_like(T)
+    R = np.swapaxes(T[..., :3, :3], -1, -2)
+    inv[..., :3, :3] = R
+    inv[..., :3, 3] = -np.einsum('...ij,...j->...i', R, T[..., :3, 3])
+    inv[..., 3, 3] = 1.0
+    return inv
+
+
+class Kinematics:
+    """Closed-form forward/inverse kinematics for the 6-axis arm, batched with NumPy.
+
+    tool is the active tool offset [x, y, z, rx, ry, rz] relative to the flange, it must
+    match the tool index selected on the controller (Robot.target_Tool).
+    """
+
+    def __init__(self, dh=CR5_DH, tool=None):
+        self.d = np.asarray(dh['d'], dtype=np.float64)
+        self.a = np.asarray(dh['a'], dtype=np.float64)
+        self.alpha = np.radians(dh['alpha'])
+        self.offset = np.radians(dh['offset'])
+        self.set_tool(tool)
+
+        # Plain float copies for the single-pose path
+        self._dh = [(float(d), float(a), math.cos(alpha), math.sin(alpha))
+                    for d, a, alpha in zip(self.d, self.a, self.alpha)]
+        self._offset = [float(o) for o in self.offset]
+
+    def set_tool(self, tool):
+        self.tool = np.zeros(6) if tool is None else np.asarray(tool, dtype=np.float64)
+        self._tool_T = pose_to_matrix(self.tool)
+        self._tool_T_inv = _invert(self._tool_T)
+        self._tool_rt_inv = tuple(tuple(row) for row in self._tool_T_inv[:3].tolist())
+
+    def _link(self, i, theta):
+        return _dh_matrix(theta, self.d[i], self.a[i], self.alpha[i])
+
+    def forward(self, joints):
+        """(..., 6) joint angles (deg) to (..., 6) tool poses."""
+        theta = np.radians(np.asarray(joints, dtype=np.float64)) + self.offset
+        T = self._link(0, theta[..., 0])
+        for i in range(1, 6):
+            T = T @ self._link(i, theta[..., i])
+        return matrix_to_pose(T @ self._tool_T)
+
+    def _solve_flange(self, T06):
+        """All 8 analytic solutions for flange targets T06 (N, 4, 4). Returns theta (N, 8, 6) in rad.
+
+        Unreachable branches come back as NaN.
+        """
+        d4, d6 = self.d[3], self.d[5]
+        a2, a3 = self.a[1], self.a[2]
+        N = T06.shape[0]
+        theta = np.full((N, 2, 2, 2, 6), np.nan)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Shoulder: the wrist centre p05 lies at distance d4 from the J1 plane
+            p05 = T06[:, :3, 3] - d6 * T06[:, :3, 2]
+            psi = np.arctan2(p05[:, 1], p05[:, 0])
+            phi = np.arccos(d4 / np.hypot(p05[:, 0], p05[:, 1]))
+            t1 = psi[:, None] + np.stack([phi, -phi], axis=1) + np.pi / 2  # (N, 2)
+            s1, c1 = np.sin(t1), np.cos(t1)
+
+            # Wrist 2
+            p06 = T06[:, :3, 3]
+            cos5 = _clip_unit((p06[:, 0, None] * s1 - p06[:, 1, None] * c1 - d4) / d6)
+            t5 = np.stack([np.arccos(cos5), -np.arccos(cos5)], axis=2)  # (N, 2, 2)
+            s5 = np.sin(t5)
+
+            # Wrist 3, undefined when s5 == 0 (wrist singularity), 0 is picked there
+            R = T06[:, :3, :3]
+            y6 = (-R[:, 0, 1, None] * s1 + R[:, 1, 1, None] * c1)[:, :, None] / s5
+            x6 = (R[:, 0, 0, None] * s1 - R[:, 1, 0, None] * c1)[:, :, None] / s5
+            t6 = np.where(np.abs(s5) < 1e-9, 0.0, np.arctan2(y6, x6))
+
+            # Elbow: planar 2-link problem in frame 1
+            T01 = self._link(0, t1)[:, :, None]
+            T45 = self._link(4, t5)
+            T56 = self._link(5, t6)
+            T14 = _invert(T01) @ T06[:, None, None] @ _invert(T45 @ T56)
+            p13 = T14[..., :3, 3] - d4 * T14[..., :3, 1]
+            p13_norm = np.linalg.norm(p13, axis=-1)
+            cos3 = _clip_unit((p13_norm ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3))
+            t3 = np.stack([np.arccos(cos3), -np.arccos(cos3)], axis=-1)  # (N, 2, 2, 2)
+            t2 = (-np.arctan2(p13[..., 1], -p13[..., 0]))[..., None] + \
+                np.arcsin(a3 * np.sin(t3) / p13_norm[..., None])
+
+            # Wrist 1 closes the chain
+            T12 = self._link(1, t2)
+            T23 = self._link(2, t3)
+            T34 = _invert(T12 @ T23) @ T14[:, :, :, None]
+            t4 = np.arctan2(T34[..., 1, 0], T34[..., 0, 0])
+
+        theta[..., 0] = t1[:, :, None, None]
+        theta[..., 1] = t2
+        theta[..., 2] = t3
+        theta[..., 3] = t4
+        theta[..., 4] = t5[..., None]
+        theta[..., 5] = t6[..., None]
+        return theta.reshape(N, 8, 6)
+
+    def _inverse_one(self, pose, ref):
+        """Single-pose inverse() on plain floats, the same solutions as _solve_flange.
+
+        Axes 2-4 are parallel, so once J1, J5 and J6 fix T14 the elbow is planar and J4
+        follows from the summed angle J2 + J3 + J4; no per-branch matrix products.
+        """
+        (r00, r01, r02, px), (r10, r11, r12, py), (r20, r21, r22, pz) = T06 = \
+            _rt_mul(_pose_rt(pose), self._tool_rt_inv)
+        d4, d6 = self._dh[3][0], self._dh[5][0]
+        a2, a3 = self._dh[1][1], self._dh[2][1]
+        offset = self._offset
+        best = None
+        best_dist = math.inf
+
+        wx, wy = px - d6 * r02, py - d6 * r12
+        r = math.hypot(wx, wy)
+        if r == 0.0 or abs(d4 / r) > 1.0:
+            return [math.nan] * 6
+        psi = math.atan2(wy, wx)
+        phi = math.acos(d4 / r)
+        for t1 in (psi + phi + math.pi / 2, psi - phi + math.pi / 2):
+            s1, c1 = math.sin(t1), math.cos(t1)
+            acos5 = _acos_unit((px * s1 - py * c1 - d4) / d6)
+            if acos5 is None:
+                continue
+            T01_inv = _rt_inv(_rt_dh(t1, *self._dh[0]))
+            for t5 in (acos5, -acos5):
+                s5 = math.sin(t5)
+                if abs(s5) < 1e-9:
+                    t6 = 0.0  # Wrist singularity
+                else:
+                    t6 = math.atan2((-r01 * s1 + r11 * c1) / s5, (r00 * s1 - r10 * c1) / s5)
+                T46 = _rt_mul(_rt_dh(t5, *self._dh[4]), _rt_dh(t6, *self._dh[5]))
+                T14 = _rt_mul(T01_inv, _rt_mul(T06, _rt_inv(T46)))
+                # p13 = p14 - d4 * y14, the y axis of T14 is the base z of the planar chain
+                x13 = T14[0][3] - d4 * T14[0][1]
+                y13 = T14[1][3] - d4 * T14[1][1]
+                norm13 = math.hypot(x13, y13, T14[2][3] - d4 * T14[2][1])
+                acos3 = _acos_unit((norm13 ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3))
+                if acos3 is None:
+                    continue
+                t234 = math.atan2(T14[1][0], T14[0][0])
+                for t3 in (acos3, -acos3):
+                    t2 = -math.atan2(y13, -x13) + math.asin(a3 * math.sin(t3) / norm13)
+                    theta = (t1, t2, t3, t234 - t2 - t3, t5, t6)
+                    joints = []
+                    dist = 0.0
+                    for t, o, ref_j in zip(theta, offset, ref):
+                        j = math.degrees(t - o)
+                        j += 360.0 * round((ref_j - j) / 360.0)  # Whole turns towards the reference
+                        joints.append(j)
+                        dist += (j - ref_j) ** 2
+                    if dist < best_dist:
+                        best, best_dist = joints, dist
+        return best if best is not None else [math.nan] * 6
+
+    def inverse(self, poses, ref_joints=None):
+        """(..., 6) tool poses to (..., 6) joint angles (deg).
+
+        Of the analytic solutions, the one nearest ref_joints (current joints, broadcastable
+        to poses) is returned, like the controller's InverseSolution near the current
+        configuration. Rows without a valid solution are NaN.
+
+        A single pose takes the plain float path (~80 us measured, the NumPy batch path costs
+        ~400 us for one row); batches cost ~11 us per row.
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        if poses.ndim == 1:
+            ref = [0.0] * 6 if ref_joints is None else np.asarray(ref_joints, dtype=np.float64).tolist()
+            if np.ndim(ref[0]) == 0:
+                return np.array(self._inverse_one(poses.tolist(), ref))
+        batch_shape = poses.shape[:-1]
+        T = pose_to_matrix(poses.reshape(-1, 6)) @ self._tool_T_inv
+        theta = self._solve_flange(T)
+        joints = np.degrees(theta - self.offset)  # (N, 8, 6)
+
+        ref = np.zeros(6) if ref_joints is None else np.asarray(ref_joints, dtype=np.float64)
+        ref = np.broadcast_to(ref, batch_shape + (6,)).reshape(-1, 1, 6)
+        # Shift each joint by whole turns towards the reference before comparing
+        joints = joints + 360.0 * np.round((ref - joints) / 360.0)
+        dist = np.sum((joints - ref) ** 2, axis=-1)
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        best = np.argmin(dist, axis=1)
+        result = joints[np.arange(len(best)), best]
+        return result.reshape(batch_shape + (6,))
+
+
+def record_comparison_set(robot, poses, path):
+    """Records the controller's InverseSolution for each pose next to its current joints.
+
+    The .npz file at path can then be checked offline with validate_comparison_set().
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    controller = np.full_like(poses, np.nan)
+    _, ref = robot.get_data()
+    for i, pose in enumerate(poses):
+        angles = robot.get_action_angles_controller(pose)
+        if angles is not None:
+            controller[i] = angles
+    np.savez(path, poses=poses, joints=controller, ref_joints=np.asarray(ref), tool=robot.kinematics.tool)
+    print(f"Saved {len(poses)} InverseSolution samples to {path}")
+
+
+def validate_comparison_set(path, kinematics=None):
+    """Compares local IK with a recorded comparison set. Returns per-sample max joint error (deg)."""
+    data = np.load(path)
+    if kinematics is None:
+        kinematics = Kinematics(tool=data['tool'])
+    local = kinematics.inverse(data['poses'], data['ref_joints'])
+    error = np.max(np.abs(local - data['joints']), axis=-1)
+    print(f"IK vs controller over {len(error)} poses: max {np.nanmax(error):.4f} deg, "
+          f"mean {np.nanmean(error):.4f} deg, {np.sum(np.isnan(local[:, 0]))} unsolved locally")
+    return error
+
+
+class IKCache:
+    """LRU of solved joint vectors keyed by the quantized pose.
+
+    resolution is the key grid (mm, deg). nearest() looks at the most recent entries for one
+    within near_distance, its joints are a warm start for solving nearby poses locally.
+    The control loop reads it while the IK thread puts confirmed solutions, so every access
+    to the entries and counters holds a lock.
+    """
+
+    def __init__(self, size=512, resolution=(0.5, 0.5), near_distance=(5.0, 3.0), recent=8):
+        self.size = size
+        self.resolution = np.array([resolution[0]] * 3 + [resolution[1]] * 3)
+        self.near_distance = near_distance
+        self.recent = recent
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.warm_starts = 0
+        self.misses = 0
+
+    def key(self, pose):
+        return tuple(np.round(np.asarray(pose, dtype=np.float64) / self.resolution).astype(np.int64).tolist())
+
+    def get(self, pose):
+        key = self.key(pose)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def nearest(self, pose):
+        """Returns (pose, joints) of a recent entry close to pose, or None."""
+        pose = np.asarray(pose, dtype=np.float64)
+        with self._lock:
+            recent = []
+            for entry in reversed(self._entries.values()):
+                if len(recent) >= self.recent:
+                    break
+                recent.append(entry)
+        for cached_pose, joints in recent:
+            delta = pose - cached_pose
+            if np.max(np.abs(delta[:3])) <= self.near_distance[0] and \
+                    np.max(np.abs(wrap_degrees(delta[3:]))) <= self.near_distance[1]:
+                return cached_pose, joints
+        return None
+
+    def put(self, pose, joints):
+        key = self.key(pose)
+        entry = (np.array(pose, dtype=np.float64), np.array(joints, dtype=np.float64))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def count(self, name):
+        """Increments the 'warm_starts' or 'misses' counter."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'warm_starts': self.warm_starts, 'misses': self.misses,
+                    'entries': len(self._entries)}
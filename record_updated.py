@@ -2,8 +2,177 @@
 import csv
 import traceback
 import os
+import threading
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import deque
 from datetime import datetime
 import cv2
+import numpy as np
+
+
+def _encode_process(path, fourcc, fps, resolution, is_color, shm_name, shape, slots, conn):
+    """Runs one video stream's cv2.VideoWriter in a child process.
+
+    Receives slot indices, encodes the frame in that slot and sends the index back once
+    the slot may be reused. None closes the video and ends the process.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frame_bytes = int(np.prod(shape))
+    frames = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=i * frame_bytes) for i in range(slots)]
+    writer = cv2.VideoWriter(path, fourcc, fps, resolution, is_color)
+    try:
+        while True:
+            index = conn.recv()
+            if index is None:
+                break
+            writer.write(frames[index])
+            conn.send(index)
+    except EOFError:
+        pass  # Recorder is gone, keep what was encoded
+    finally:
+        writer.release()
+        frames = None
+        shm.close()
+
+
+class VideoEncoder:
+    """A video stream encoded in its own process, same write()/release() as cv2.VideoWriter.
+
+    write() copies the frame into a free shared memory slot and hands the index to the
+    encoder process, so encoding of all streams runs in parallel on separate cores instead
+    of one after the other on the recorder thread. It only waits when all slots are still
+    being encoded (counted in stats). The process is forked, see ProcessCamera.
+    """
+
+    def __init__(self, path, fourcc, fps, resolution, is_color=True, slots=4):
+        width, height = resolution
+        self.shape = (height, width, 3) if is_color else (height, width)
+        frame_bytes = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * frame_bytes)
+        self.frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=i * frame_bytes)
+                       for i in range(slots)]
+        self.free = list(range(slots))
+        self.stats = {'frames': 0, 'waits': 0, 'wait_time': 0.0}
+        context = multiprocessing.get_context('fork')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_encode_process, daemon=True,
+                                       args=(path, fourcc, fps, resolution, is_color, self.shm.name, self.shape,
+                                             slots, child_conn))
+        self.process.start()
+
+    def write(self, frame):
+        while self.conn.poll():
+            self.free.append(self.conn.recv())
+        if not self.free:
+            start = time.perf_counter()
+            self.free.append(self.conn.recv())
+            self.stats['waits'] += 1
+            self.stats['wait_time'] += time.perf_counter() - start
+        index = self.free.pop()
+        np.copyto(self.frames[index], frame)
+        self.conn.send(index)
+        self.stats['frames'] += 1
+
+    def release(self):
+        """Waits for the queued frames to be encoded and the video to be closed."""
+        if self.shm is None:
+            return
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join()
+        self.frames = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+
+class RecordQueue:
+    """Bounded queue between the control loop and the recorder thread.
+
+    At most maxsize queued packets carry frames. When that many are waiting, put() follows
+    the policy:
+      'block'       waits for the recorder (at most block_timeout s, then as 'drop_video'),
+      'drop_oldest' discards the oldest queued packet, state and frames,
+      'drop_video'  keeps the new packet's state (its CSV row) but drops its frames.
+    drop_frames_fn(packet) releases a packet's frame buffers and returns its state-only
+    version. Queue depth, high-water mark and drop counters are in get_stats().
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'drop_video')
+
+    def __init__(self, drop_frames_fn, maxsize=16, policy='drop_video', block_timeout=1.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown recorder queue policy {policy}, use one of {self.POLICIES}.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.drop_frames_fn = drop_frames_fn
+        self.block_timeout = block_timeout
+        self._items = deque()  # (packet, has_frames)
+        self._frame_items = 0
+        self._cond = threading.Condition()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clears the counters, call at the start of each episode."""
+        with self._cond:
+            self.stats = {'put': 0, 'dropped_packets': 0, 'dropped_video': 0, 'blocked': 0,
+                          'blocked_time': 0.0, 'max_blocked_time': 0.0, 'high_water': len(self._items)}
+
+    def put(self, packet):
+        with self._cond:
+            self.stats['put'] += 1
+            has_frames = True
+            if self._frame_items >= self.maxsize and self.policy == 'block':
+                start = time.perf_counter()
+                self.stats['blocked'] += 1
+                self._cond.wait_for(lambda: self._frame_items < self.maxsize, self.block_timeout)
+                blocked = time.perf_counter() - start
+                self.stats['blocked_time'] += blocked
+                self.stats['max_blocked_time'] = max(self.stats['max_blocked_time'], blocked)
+            if self._frame_items >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    oldest, oldest_has_frames = self._items.popleft()
+                    if oldest_has_frames:
+                        self._frame_items -= 1
+                        self.drop_frames_fn(oldest)
+                    self.stats['dropped_packets'] += 1
+                else:
+                    packet = self.drop_frames_fn(packet)
+                    has_frames = False
+                    self.stats['dropped_video'] += 1
+            self._items.append((packet, has_frames))
+            self._frame_items += has_frames
+            self.stats['high_water'] = max(self.stats['high_water'], len(self._items))
+            self._cond.notify_all()
+
+    def get(self):
+        """Returns the next packet, blocks until there is one. None after close()."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items)
+            packet, has_frames = self._items.popleft()
+            self._frame_items -= has_frames
+            self._cond.notify_all()
+            return packet
+
+    def close(self):
+        """Queues the end-of-recording sentinel behind the remaining packets, never dropped."""
+        with self._cond:
+            self._items.append((None, False))
+            self._cond.notify_all()
+
+    def qsize(self):
+        return len(self._items)
+
+    def get_stats(self):
+        """Live depth (packets, and those with frames), high-water mark and drop/block counts."""
+        with self._cond:
+            return dict(self.stats, depth=len(self._items), frame_depth=self._frame_items,
+                        maxsize=self.maxsize, policy=self.policy)
+
 
 class RecordData:
     def __init__(self, task, c_obj):
@@ -13,16 +182,40 @@ class RecordData:
         self.csv_writer = None
         self.csv_file = None
         self.collection_rate = 15
+        self.camera_names = []
+        self.video_writers = {}  # (camera name, view name or None for the full frame) -> cv2.VideoWriter
+        self.depth_dirs = None  # Camera name -> directory when depth is recorded
+        self.depth_png_compression = 1  # zlib level, 1 keeps up with 2 cameras at 15 Hz
+        self.frame_index = 0
+        self.placeholder_rows = 0  # Data points dropped because a camera had not delivered a frame yet
+        self.video_index = 0  # Frames written to the videos, behind frame_index once video was dropped
 
     def setup_data_recording(self, base_path="dobot_data", csv_filename="robot_log", top_video_filename="top_camera",
-                         wrist_video_filename="wrist_camera"):
-        """MODIFICATION: Updated CSV header for new observation data."""
+                         wrist_video_filename="wrist_camera", record_depth=False, video_filenames=None,
+                         record_full=True, parallel_encoding=True):
+        """MODIFICATION: Updated CSV header for new observation data.
+        One video (and frame number/capture time columns) per camera of c_obj's registry,
+        video_filenames maps camera names to file names (top/wrist also via their own arguments,
+        others default to {name}_camera).
+        Each derived view of a camera is its own video, {file name}_{view name}, at the view's
+        size; record_full=False leaves out the full-resolution videos of cameras that have views.
+        With parallel_encoding every video is encoded by its own VideoEncoder process, otherwise by
+        cv2.VideoWriter on the recorder thread.
+        With record_depth, aligned depth goes losslessly to 16-bit PNGs, one directory per camera,
+        named by the row index of the CSV."""
         os.makedirs(base_path, exist_ok=True)
         timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.camera_names = list(self.c_obj.camera_names)
+        filenames = {'top': top_video_filename, 'wrist': wrist_video_filename}
+        filenames.update(video_filenames or {})
+        filenames = {cam_type: filenames.get(cam_type, f"{cam_type}_camera") for cam_type in self.camera_names}
 
         csv_path = os.path.join(base_path, f"{csv_filename}_{timestamp_str}.csv")
         self.csv_file = open(csv_path, 'w', newline='')
         self.csv_writer = csv.writer(self.csv_file)
+        frame_columns = []
+        for cam_type in self.camera_names:
+            frame_columns += [f"{cam_type}_frame_number", f"{cam_type}_capture_time"]
         self.csv_writer.writerow([
             'timestamp',
             'obs_x', 'obs_y', 'obs_z', 'obs_rx', 'obs_ry', 'obs_rz',  # Observed pose
@@ -30,18 +223,33 @@ class RecordData:
             'obs_gripper',
             'action_x', 'action_y', 'action_z', 'action_rx', 'action_ry', 'action_rz',
             'action_gripper',
+            *frame_columns, 'sync_skew_ms', 'video_frame',
             # 'action_j1', 'action_j2', 'action_j3', 'action_j4', 'action_j5', 'action_j6',
             f"{self.task}"
         ])
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        resolution_top = self.c_obj.camera_config['top']['resolution']
-        self.top_video_writer = cv2.VideoWriter(os.path.join(base_path, f"{top_video_filename}_{timestamp_str}.mp4"),
-                                                fourcc, self.collection_rate, resolution_top)
+        self.video_writers = {}
+        for cam_type in self.camera_names:
+            cam_info = self.c_obj.camera_config[cam_type]
+            is_color = len(self.c_obj.frame_shape(cam_type)) == 3
+            streams = {name: (f"{filenames[cam_type]}_{name}", view['size']) for name, view in cam_info['views'].items()}
+            if record_full or not streams:
+                streams[None] = (filenames[cam_type], cam_info['resolution'])
+            for view, (filename, resolution) in streams.items():
+                writer_class = VideoEncoder if parallel_encoding else cv2.VideoWriter
+                self.video_writers[(cam_type, view)] = writer_class(
+                    os.path.join(base_path, f"{filename}_{timestamp_str}.mp4"), fourcc, self.collection_rate,
+                    resolution, is_color)
 
-        resolution_wrist = self.c_obj.camera_config['wrist']['resolution']
-        self.wrist_video_writer = cv2.VideoWriter(
-            os.path.join(base_path, f"{wrist_video_filename}_{timestamp_str}.mp4"), fourcc, self.collection_rate,
-            resolution_wrist)
+        self.frame_index = 0
+        self.placeholder_rows = 0
+        self.video_index = 0
+        self.depth_dirs = None
+        if record_depth:
+            self.depth_dirs = {cam_type: os.path.join(base_path, f"{filenames[cam_type]}_depth_{timestamp_str}")
+                               for cam_type in self.camera_names}
+            for depth_dir in self.depth_dirs.values():
+                os.makedirs(depth_dir, exist_ok=True)
 
         print(f"Initialized data recording with timestamp {timestamp_str}")
 
@@ -54,32 +262,82 @@ class RecordData:
             self.csv_file = None
             self.csv_writer = None
             print("CSV file closed.")
+        encoder_stats = self.get_encoder_stats()
+        if encoder_stats:
+            print(f"Video encoders: {encoder_stats}")
+        for video_writer in self.video_writers.values():
+            video_writer.release()
+        self.video_writers = {}
         print("All data recording files closed.")
 
 
-    def collect_data_point(self, timestamp, top_frame, wrist_frame, obs_pose, obs_angles,obs_gripper, actions_p, action_gripper, action_a=None):
-        """MODIFICATION: This function now receives feedback data instead of fetching it."""
+    def get_encoder_stats(self):
+        """Frames and waits for a free slot (s) per VideoEncoder stream."""
+        return {stream: dict(writer.stats) for stream, writer in self.video_writers.items()
+                if isinstance(writer, VideoEncoder)}
+
+    def _write_depth(self, cam_type, depth):
+        if depth is None:
+            print(f"Warning: No depth frame from {cam_type} camera for row {self.frame_index}.")
+            return
+        path = os.path.join(self.depth_dirs[cam_type], f"{self.frame_index:06d}.png")
+        cv2.imwrite(path, depth, [cv2.IMWRITE_PNG_COMPRESSION, self.depth_png_compression])
+
+    @staticmethod
+    def _frame_columns(info):
+        if info is None:
+            return ['', '']
+        return [info['frame_number'], f"{info['capture_time']:.6f}"]
+
+    def collect_data_point(self, timestamp, frames, obs_pose, obs_angles, obs_gripper, actions_p, action_gripper,
+                           action_a=None, infos=None, sync_skew=None, depth=None, views=None):
+        """MODIFICATION: This function now receives feedback data instead of fetching it.
+        frames maps camera names to images, infos to their frame metadata, views to {view name: image}
+        and depth to the aligned uint16 depth images if depth is recorded; sync_skew is the capture
+        time spread (ms). Data points with a camera's zero placeholder frame (info None) are dropped.
+        With frames empty (video dropped by the RecordQueue) only the CSV row is written, its
+        video_frame column is then empty; otherwise it is the frame's index in the videos."""
+        infos = infos or {}
+        depth = depth or {}
+        views = views or {}
         try:
-            # top_frame, wrist_frame = self.c_obj.capture_frames()
-            if top_frame is None or wrist_frame is None:
+            # frames = self.c_obj.get_frames()
+            state_only = not frames
+            if not state_only and any(frames.get(cam_type) is None for cam_type in self.camera_names):
                 print("Warning: Failed to capture camera frames for data point.")
                 return False
+            if infos and any(infos.get(cam_type) is None for cam_type in self.camera_names):
+                self.placeholder_rows += 1
+                print("Warning: Skipping data point, not every camera delivered a frame yet.")
+                return False
 
             #obs_pose, obs_angles = self.r_obj.get_data()
 
             if self.csv_writer:
+                frame_columns = []
+                for cam_type in self.camera_names:
+                    frame_columns += self._frame_columns(infos.get(cam_type))
                 row_data = [
                     f"{timestamp:.4f}",
                     *obs_pose,  # OBSERVED pose from feedback
                     *obs_angles,  # OBSERVED angles from feedback
                     obs_gripper,
                     *actions_p,
-                    action_gripper
+                    action_gripper,
+                    *frame_columns,
+                    f"{sync_skew:.3f}" if sync_skew is not None else '',
+                    '' if state_only else self.video_index
                 ]
                 self.csv_writer.writerow(row_data)
 
-            if self.top_video_writer: self.top_video_writer.write(top_frame)
-            if self.wrist_video_writer: self.wrist_video_writer.write(wrist_frame)
+            if not state_only:
+                for (cam_type, view), video_writer in self.video_writers.items():
+                    video_writer.write(frames[cam_type] if view is None else views[cam_type][view])
+                if self.depth_dirs:
+                    for cam_type in self.camera_names:
+                        self._write_depth(cam_type, depth.get(cam_type))
+                self.video_index += 1
+            self.frame_index += 1
 
             return True
         except Exception as e:
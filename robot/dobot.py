@@ -3,6 +3,7 @@ import traceback
 import time
 from enum import IntEnum
 import re
+from command_utils import CommandSender
 
 
 class RobotMode(IntEnum):
@@ -24,6 +25,8 @@ class Robot:
         self.move_port = 30003
         self.feedback_port = 30004
         self.target_Tool = 1
+        # Move commands go out from the sender thread, latest setpoint wins
+        self.sender = CommandSender(self._send_move_command, name="move")
 
     #TODO : change the mentod name to dashboard_connect and for move alsoo
 
@@ -138,9 +141,11 @@ class Robot:
     def connect(self):
         self._connect_ip()
         self.initialize()
+        self.sender.start()
 
 
     def disconnect(self):
+        self.sender.stop()
         if self.dashboard:
             try:
                 self.dashboard.ClearError()
@@ -152,11 +157,16 @@ class Robot:
             except Exception as e:
                 print(f"Error disabling robot: {e}")
 
+    def _send_move_command(self, command):
+        # Runs on the sender thread, reading the reply keeps it from piling up on the socket
+        self.move.send_data(command)
+        return self.move.wait_reply()
+
     def send_actions(self, x, y, z, rx, ry, rz):
         #need to write a check logic where the actions are in the range. or else it raises a error.
         # actions = str(actions)[1:-1]
         command= f"ServoP({x}, {y}, {z}, {rx}, {ry}, {rz})"
-        self.move.send_data(command)
+        self.sender.submit("ServoP", command)
         #self.move.ServoP(x, y, z, rx, ry, rz)## later change it to send_data
 
     def send_angles(self, action_a):
@@ -165,7 +175,7 @@ class Robot:
         gain = 500 # Proportional gain (200-1000). Higher = stiffer, more aggressive.
         lookahead_time = 50 # Derivative/Damping term (20-100). Higher = smoother.  t={0.070}
         command = f"ServoJ({j1:.4f},{j2:.4f},{j3:.4f},{j4:.4f},{j5:.4f},{j6:.4f},t= {0.1}, gain={gain},lookahead_time={lookahead_time})"
-        self.move.send_data(command)
+        self.sender.submit("ServoJ", command)
         #self.move.ServoJ(j1,j2, j3, j4, j5, j6, t= 0.11, gain=500,lookahead_time=60)## later change it to send_data
 
     def toggle_gripper(self):
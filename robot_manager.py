@@ -0,0 +1,359 @@
+import asyncio
+import threading
+import time
+import numpy as np
+from feedback_utils import (FEEDBACK_DTYPE, FEEDBACK_PACKET_SIZE, FeedbackStore, FeedbackHistory, RobotMode,
+                            is_aligned, resync_offset)
+from command_utils import CommandStats
+from connection_utils import ConnectionSupervisor
+from dashboard_client import AsyncDashboardClient
+from safety_utils import SafetyFilter
+
+
+class ArmConnection:
+    """One arm's dashboard, move and feedback streams, served by the manager's event loop.
+
+    Mirrors the Robot API the control loop uses (get_data/get_state/send_actions/send_angles),
+    with the same per-arm FeedbackStore, SafetyFilter and single-slot, latest-wins move mailbox.
+    Lost channels are reported to the manager's ConnectionSupervisor, which reconnects them.
+    """
+
+    def __init__(self, manager, name, ip, dashboard_port=29999, move_port=30003, feedback_port=30004):
+        self.manager = manager
+        self.name = name
+        self.ip = ip
+        self.dashboard_port = dashboard_port
+        self.move_port = move_port
+        self.feedback_port = feedback_port
+        self.speed = 40
+        self.acj = 20
+        self.target_Tool = 1
+
+        self.state = FeedbackStore()
+        self.history = FeedbackHistory(size=256)
+        self.dashboard = None
+        self.packets_read = 0
+        self.resyncs = 0
+        self.command_stats = CommandStats()
+        self.error = None  # Last move error, raised once by the next submit()
+        # Workspace, joint limits and rate caps on every move command, None disables
+        self.safety = SafetyFilter(read_state_fn=self.get_state)
+
+        self._move_reader = None
+        self._move_writer = None
+        self._feedback_reader = None
+        self._feedback_writer = None
+        self._slot = None
+        self._slot_event = None
+        self._feedback_task_handle = None
+        self._send_task_handle = None
+        self._feedback_connected_at = 0.0
+        self._health_pose = np.zeros(6)
+        self._health_angles = np.zeros(6)
+        self._buffer = bytearray(FEEDBACK_PACKET_SIZE)
+        self._packet = np.frombuffer(self._buffer, dtype=FEEDBACK_DTYPE)[0]
+
+    def _report_failure(self, channel, error):
+        supervisor = self.manager.supervisor
+        if supervisor is not None and supervisor.is_running:
+            supervisor.report_failure(f"{self.name}.{channel}", error)
+
+    # --- Coroutines, run on the manager's loop ---
+    async def connect(self):
+        await self._connect_dashboard()
+        await self._connect_move()
+        await self._connect_feedback()
+        self._slot_event = asyncio.Event()
+        self._send_task_handle = asyncio.ensure_future(self._send_task())
+
+    async def _connect_dashboard(self):
+        self.dashboard = AsyncDashboardClient(self.ip, self.dashboard_port, self.manager.max_in_flight,
+                                              self.manager.timeout)
+        await self.dashboard.connect()
+
+    async def _connect_move(self):
+        self._move_reader, self._move_writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.move_port), self.manager.timeout)
+
+    async def _connect_feedback(self):
+        self._feedback_reader, self._feedback_writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.feedback_port), self.manager.timeout)
+        self._feedback_connected_at = time.perf_counter()
+        self._feedback_task_handle = asyncio.ensure_future(self._feedback_task())
+
+    async def _close_channel(self, channel):
+        if channel == 'dashboard':
+            if self.dashboard is not None:
+                await self.dashboard.close()
+            return
+        if channel == 'feedback' and self._feedback_task_handle is not None:
+            self._feedback_task_handle.cancel()
+        writer = self._move_writer if channel == 'move' else self._feedback_writer
+        if writer is not None:
+            writer.close()
+
+    async def reconnect(self, channel):
+        """Closes and reopens one channel ('dashboard', 'move' or 'feedback')."""
+        await self._close_channel(channel)
+        await {'dashboard': self._connect_dashboard, 'move': self._connect_move,
+               'feedback': self._connect_feedback}[channel]()
+
+    async def _read_packet(self):
+        """Reads the next packet into _buffer, realigning on the TestValue field if needed."""
+        data = await self._feedback_reader.readexactly(FEEDBACK_PACKET_SIZE)
+        while not is_aligned(data):
+            self.resyncs += 1
+            start = resync_offset(data)
+            data = data[start:] + await self._feedback_reader.readexactly(start)
+        self._buffer[:] = data
+        self.packets_read += 1
+
+    async def _feedback_task(self):
+        try:
+            while True:
+                await self._read_packet()
+                stamp = time.perf_counter()
+                self.state.publish(self._packet, stamp)
+                self.history.append(self._packet, stamp)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            print(f"[{self.name}] Feedback stream lost: {e!r}")
+            self._report_failure('feedback', e)
+
+    async def _send_task(self):
+        while True:
+            await self._slot_event.wait()
+            self._slot_event.clear()
+            command_name, command, submitted_at = self._slot
+            self._slot = None
+            try:
+                self._move_writer.write(command.encode('utf-8'))
+                await self._move_writer.drain()
+                reply = await asyncio.wait_for(self._move_reader.readuntil(b';'), self.manager.timeout)
+                if not reply:
+                    raise ConnectionError("Move socket closed by the controller.")
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, OSError) as e:
+                self.command_stats.get(command_name)['errors'] += 1
+                self.error = ConnectionError(f"[{self.name}] Move port error: {e!r}")
+                print(self.error)
+                # A timed out reply would pair with the next command, reconnect either way
+                self._report_failure('move', e)
+                continue
+            if not reply.startswith(b'0'):
+                print(f"[{self.name}] {command_name} rejected: {reply.decode('utf-8', errors='ignore')}")
+            self.command_stats.sent(command_name, submitted_at)
+
+    async def enable(self, timeout=20.0, retry_interval=1.0, poll_interval=0.004):
+        """Enables the arm, waiting on the robot mode in its feedback stream, then applies settings."""
+        start = time.perf_counter()
+        while not self.state.seq:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError(f"[{self.name}] No packet on the feedback stream within timeout.")
+            await asyncio.sleep(poll_interval)
+        await self.dashboard.call_batch([("ClearError",), ("EnableRobot",)])
+        last_enable = time.perf_counter()
+        while True:
+            mode = int(self.state.read_packet()['RobotMode'])
+            if mode in (RobotMode.ENABLED, RobotMode.RUNNING):
+                break
+            now = time.perf_counter()
+            if now - start > timeout:
+                raise TimeoutError(f"[{self.name}] Robot did not become enabled within timeout.")
+            if mode in (RobotMode.ERROR, RobotMode.DISABLED) and now - last_enable > retry_interval:
+                await self.dashboard.call_batch([("ClearError",), ("EnableRobot",)])
+                last_enable = now
+            await asyncio.sleep(poll_interval)
+        await self.apply_settings()
+        if self.safety is not None:
+            self.safety.reset(*self.get_data())
+        print(f"[{self.name}] Robot is ENABLED ({time.perf_counter() - start:.3f} s).")
+
+    async def apply_settings(self):
+        """Sends speed, joint acceleration and tool settings, again after every reconnect."""
+        await self.dashboard.call_batch([("SpeedFactor", self.speed), ("AccJ", self.acj), ("Tool", self.target_Tool)])
+
+    async def close(self):
+        if self._send_task_handle is not None:
+            self._send_task_handle.cancel()
+        for channel in ('feedback', 'move', 'dashboard'):
+            await self._close_channel(channel)
+
+    # --- Thread-safe API for control loops ---
+    def _post(self, command_name, command, submitted_at):
+        self.command_stats.submitted(command_name, None if self._slot is None else self._slot[0])
+        self._slot = (command_name, command, submitted_at)
+        self._slot_event.set()
+
+    def submit(self, command_name, command):
+        """Posts a move command to this arm's mailbox. Raises the last send error if one occurred since."""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.manager._loop.call_soon_threadsafe(self._post, command_name, command, time.perf_counter())
+
+    def send_actions(self, x, y, z, rx, ry, rz):
+        """Posts a ServoP setpoint, it passes the safety filter first."""
+        if self.safety is not None:
+            x, y, z, rx, ry, rz = self.safety.filter_pose((x, y, z, rx, ry, rz))
+        self.submit("ServoP", f"ServoP({x:.4f},{y:.4f},{z:.4f},{rx:.4f},{ry:.4f},{rz:.4f})")
+
+    def send_angles(self, action_a, t=0.1):
+        """Posts a ServoJ setpoint, it passes the safety filter first."""
+        if self.safety is not None:
+            action_a = self.safety.filter_angles(action_a)
+        j1, j2, j3, j4, j5, j6 = action_a
+        self.submit("ServoJ", f"ServoJ({j1:.4f},{j2:.4f},{j3:.4f},{j4:.4f},{j5:.4f},{j6:.4f},"
+                              f"t={t},gain=500,lookahead_time=50)")
+
+    def call(self, name, *args):
+        """Runs a dashboard command and returns its reply, blocks the calling thread.
+
+        If the dashboard dropped, waits for the supervisor to reconnect it and retries once.
+        """
+        for attempt in range(2):
+            try:
+                return self.manager._run(self.dashboard.call(name, *args))
+            except OSError as e:
+                supervisor = self.manager.supervisor
+                if attempt or supervisor is None or not supervisor.is_running or \
+                        not supervisor.handle_failure(f"{self.name}.dashboard", e):
+                    raise
+
+    def get_data(self):
+        pose, angles, _, _ = self.state.read()
+        return pose.tolist(), angles.tolist()
+
+    def get_state(self, pose_out=None, angles_out=None):
+        return self.state.read(pose_out, angles_out)
+
+    def get_data_at(self, t):
+        position, angles = self.history.get_at(t)
+        if position is None:
+            return self.get_data()
+        return position.tolist(), angles.tolist()
+
+    def get_feedback(self):
+        return self.state.read_packet()
+
+    def get_safety_stats(self):
+        return self.safety.get_stats() if self.safety is not None else {}
+
+    def get_command_stats(self):
+        return self.command_stats.report()
+
+
+class RobotManager:
+    """Drives several arms from one process over a single asyncio I/O loop.
+
+    A Robot per arm needs a feedback, sender, IK and supervisor thread each; here every
+    arm's three sockets are served by one event loop thread, whatever the number of arms.
+    Arms are added by name and used like Robot objects: manager["left"].send_actions(...).
+    One ConnectionSupervisor reconnects the channels of all arms ("left.move", ...).
+    """
+
+    def __init__(self, max_in_flight=8, timeout=5.0):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.feedback_timeout = 1.0  # s without a feedback packet before an arm's stream counts as dead
+        self.arms = {}
+        self.supervisor = None
+        self._loop = None
+        self._thread = None
+
+    def add_robot(self, name, ip, dashboard_port=29999, move_port=30003, feedback_port=30004):
+        arm = ArmConnection(self, name, ip, dashboard_port, move_port, feedback_port)
+        self.arms[name] = arm
+        return arm
+
+    def __getitem__(self, name):
+        return self.arms[name]
+
+    def _run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout or self.timeout + 1.0)
+
+    def connect(self, enable_timeout=20.0):
+        """Starts the I/O loop, then connects and enables all arms concurrently."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+        start = time.perf_counter()
+
+        async def connect_all():
+            await asyncio.gather(*(arm.connect() for arm in self.arms.values()))
+            await asyncio.gather(*(arm.enable(enable_timeout) for arm in self.arms.values()))
+
+        try:
+            self._run(connect_all(), timeout=enable_timeout + self.timeout + 1.0)
+        except Exception as e:
+            print(f"Failed to bring up the arms: {e}")
+            raise
+        print(f"{len(self.arms)} arm(s) connected and enabled in {time.perf_counter() - start:.3f} s.")
+        self._start_supervisor()
+
+    # --- Reconnection, the supervisor thread drives the arms' coroutines on the loop ---
+    def _start_supervisor(self):
+        channels = {}
+        for name, arm in self.arms.items():
+            for channel in ('dashboard', 'move', 'feedback'):
+                channels[f"{name}.{channel}"] = (
+                    lambda arm=arm, channel=channel: self._run(arm.reconnect(channel)), lambda: None)
+        self.supervisor = ConnectionSupervisor(channels, on_reconnect=self._reapply_settings,
+                                               health_check=self._check_feedback_health)
+        self.supervisor.start()
+
+    def _reapply_settings(self):
+        """Supervisor hook, re-applies the settings on every arm whose dashboard is up."""
+        arms = [arm for name, arm in self.arms.items() if self.supervisor.is_connected(f"{name}.dashboard")]
+
+        async def apply_all():
+            return await asyncio.gather(*(arm.apply_settings() for arm in arms), return_exceptions=True)
+
+        for arm, result in zip(arms, self._run(apply_all())):
+            if isinstance(result, Exception):
+                self.supervisor.report_failure(f"{arm.name}.dashboard", result)
+
+    def _check_feedback_health(self):
+        """Health check for the supervisor: arms whose feedback packets stopped coming."""
+        now = time.perf_counter()
+        dead = []
+        for name, arm in self.arms.items():
+            _, _, stamp, _ = arm.state.read(arm._health_pose, arm._health_angles)
+            if now - max(stamp, arm._feedback_connected_at) > self.feedback_timeout:
+                dead.append(f"{name}.feedback")
+        return dead
+
+    def get_connection_report(self):
+        """Status of each arm channel and the recorded outages with their durations (s)."""
+        return self.supervisor.get_report() if self.supervisor is not None else {}
+
+    def disconnect(self):
+        if self.supervisor is not None:
+            self.supervisor.stop()
+        if self._loop is None:
+            return
+
+        async def close_all():
+            for arm in self.arms.values():
+                try:
+                    await arm.dashboard.call("DisableRobot")
+                except Exception as e:
+                    print(f"[{arm.name}] Error disabling robot: {e}")
+                await arm.close()
+
+        try:
+            self._run(close_all())
+        except Exception as e:
+            print(f"Error disconnecting arms: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1.0)
+        self._loop.close()
+        self._loop = None
+        print("Arms disconnected.")
+
+    def get_command_stats(self):
+        """Per-arm, per-command sent/dropped counts and submit-to-reply latencies (s)."""
+        return {name: arm.get_command_stats() for name, arm in self.arms.items()}
+
+    def get_safety_stats(self):
+        """Per-arm safety filter counts, how often each limit clamped a command."""
+        return {name: arm.get_safety_stats() for name, arm in self.arms.items()}
@@ -0,0 +1,341 @@
+import math
+import time
+import numpy as np
+
+# Cell workspace for ServoP targets [x, y, z, rx, ry, rz] (mm, deg). Single source for the
+# limits the teleop scripts used to copy; z tops out at 300 mm as in final_data_collection.
+WORKSPACE_MIN = np.array([240.0, -330.0, -20.0, -180.0, -180.0, -180.0])
+WORKSPACE_MAX = np.array([750.0, 550.0, 300.0, 180.0, 180.0, 180.0])
+
+# CR5 joint ranges (deg), J3 is the only joint that cannot turn fully
+CR5_JOINT_MIN = np.array([-360.0, -360.0, -160.0, -360.0, -360.0, -360.0])
+CR5_JOINT_MAX = np.array([360.0, 360.0, 160.0, 360.0, 360.0, 360.0])
+
+
+def clip_pose(pose, lower=WORKSPACE_MIN, upper=WORKSPACE_MAX):
+    """Clamps a pose (or (N, 6) poses) into the workspace box, returns a list (or array)."""
+    clipped = np.clip(np.asarray(pose, dtype=np.float64), lower, upper)
+    return clipped.tolist() if clipped.ndim == 1 else clipped
+
+
+class SafetyFilter:
+    """Workspace, joint limit and rate limit filter in front of the move commands.
+
+    Poses are clamped into the box [lower, upper] and, if planes (A, b) are given, into
+    the polytope A @ xyz <= b (e.g. to cut out a fixture or a wall). Each command is then
+    limited to max_velocity/max_acceleration per axis relative to the previous one, over the
+    nominal command period. A command the limits cannot follow is tracked along a braking
+    profile that settles exactly on it. With kinematics, the filtered pose is solved near
+    the last safe joints and held at the last safe pose if it is unreachable or outside
+    [joint_min, joint_max]. Joint commands get the rate limits against the joint limits and,
+    with kinematics, their forward kinematics has to lie inside the box and planes or the
+    last safe joints are held.
+
+    Every clamp is counted in stats by kind. filter_trajectory() does the same for a whole
+    (N, 6) array, check_trajectory() tests reachability within the joint limits with the
+    batch IK of kinematics.
+    """
+
+    def __init__(self, lower=WORKSPACE_MIN, upper=WORKSPACE_MAX, planes=None,
+                 max_velocity=(250.0, 250.0, 250.0, 90.0, 90.0, 90.0),
+                 max_acceleration=(2000.0, 2000.0, 2000.0, 720.0, 720.0, 720.0),
+                 joint_min=CR5_JOINT_MIN, joint_max=CR5_JOINT_MAX,
+                 max_joint_velocity=90.0, max_joint_acceleration=720.0,
+                 kinematics=None, read_state_fn=None, period=1.0 / 125, max_dt=0.05, stale_after=0.5):
+        self.lower = np.array(lower, dtype=np.float64)
+        self.upper = np.array(upper, dtype=np.float64)
+        self.A = None
+        self.b = None
+        self.max_velocity = np.broadcast_to(np.asarray(max_velocity, dtype=np.float64), (6,)).copy()
+        self.max_acceleration = np.broadcast_to(np.asarray(max_acceleration, dtype=np.float64), (6,)).copy()
+        self.joint_min = np.array(joint_min, dtype=np.float64)
+        self.joint_max = np.array(joint_max, dtype=np.float64)
+        self.max_joint_velocity = np.broadcast_to(np.asarray(max_joint_velocity, dtype=np.float64), (6,)).copy()
+        self.max_joint_acceleration = np.broadcast_to(np.asarray(max_joint_acceleration, dtype=np.float64), (6,)).copy()
+        self.kinematics = kinematics
+        self.read_state_fn = read_state_fn  # Returns (pose, angles, ...) of the robot, seeds the rate limits
+        self.period = period  # Nominal time between commands (s), the rate limits integrate over it
+        self.max_dt = max_dt  # A stalled caller may not jump further than max_dt worth of motion
+        self.stale_after = stale_after  # Re-seed from read_state_fn after this long without a command
+
+        self._planes = []
+        if planes is not None:
+            self.set_planes(*planes)
+        # Float tuples of the limits for the per-command path
+        self._lower, self._upper = tuple(self.lower.tolist()), tuple(self.upper.tolist())
+        self._joint_min, self._joint_max = tuple(self.joint_min.tolist()), tuple(self.joint_max.tolist())
+        self._max_velocity, self._max_acceleration = tuple(self.max_velocity.tolist()), tuple(self.max_acceleration.tolist())
+        self._max_joint_velocity = tuple(self.max_joint_velocity.tolist())
+        self._max_joint_acceleration = tuple(self.max_joint_acceleration.tolist())
+        self._wrap = (False,) * 3 + (True,) * 3  # Rotations take the short way round
+        self._pose = {'last': None, 'velocity': [0.0] * 6, 'time': 0.0}
+        self._joints = {'last': None, 'velocity': [0.0] * 6, 'time': 0.0}
+        self._safe_pose = None  # Last pose that passed the IK check, and its joints
+        self._safe_joints = None
+        self.stats = {'commands': 0, 'workspace': 0, 'polytope': 0, 'joint_limit': 0,
+                      'velocity': 0, 'acceleration': 0, 'unreachable': 0, 'ik_joint_limit': 0,
+                      'fk_workspace': 0}
+
+    def set_planes(self, A, b):
+        """Half-spaces A @ [x, y, z] <= b that the tool point has to stay inside."""
+        self.A = np.atleast_2d(np.asarray(A, dtype=np.float64))
+        self.b = np.atleast_1d(np.asarray(b, dtype=np.float64))
+        self._A_unit = self.A / np.sum(self.A ** 2, axis=1, keepdims=True)
+        # Plain float rows for the per-command path, numpy call overhead would dominate there
+        self._planes = [(a[0], a[1], a[2], bi, u[0], u[1], u[2])
+                        for a, bi, u in zip(self.A.tolist(), self.b.tolist(), self._A_unit.tolist())]
+
+    def reset(self, pose=None, angles=None):
+        """Seeds the rate limits with the robot's current pose/joints (at rest)."""
+        now = time.perf_counter()
+        for track, value in ((self._pose, pose), (self._joints, angles)):
+            track['last'] = None if value is None else [float(v) for v in value]
+            track['velocity'] = [0.0] * 6
+            track['time'] = now
+        self._safe_pose = None if pose is None else [float(v) for v in pose]
+        self._safe_joints = None if angles is None else [float(v) for v in angles]
+
+    # --- Position limits, vectorized over (..., 6) ---
+    def _project_planes(self, xyz):
+        """Moves points violating a plane onto it, a few cyclic passes for corners."""
+        projected = False
+        for _ in range(3):
+            excess = xyz @ self.A.T - self.b  # (..., n_planes)
+            if not np.any(excess > 1e-9):
+                break
+            projected = True
+            for i in range(len(self.b)):
+                excess = np.maximum(xyz @ self.A[i] - self.b[i], 0.0)
+                xyz -= excess[..., None] * self._A_unit[i]
+        return projected
+
+    def clamp_poses(self, poses):
+        """Clamps (..., 6) poses into the workspace in place, returns the number of clamped rows."""
+        clamped = 0
+        if self.A is not None and self._project_planes(poses[..., :3]):
+            self.stats['polytope'] += 1
+        outside = np.any((poses < self.lower) | (poses > self.upper), axis=-1)
+        if np.any(outside):
+            np.clip(poses, self.lower, self.upper, out=poses)
+            clamped = int(np.count_nonzero(outside))
+            self.stats['workspace'] += clamped
+        return clamped
+
+    # --- Per-command path: plain floats, a few microseconds per call ---
+    def _clamp_box(self, target, lower, upper, kind):
+        clamped = False
+        for i in range(6):
+            v = target[i]
+            if v < lower[i]:
+                target[i] = lower[i]
+                clamped = True
+            elif v > upper[i]:
+                target[i] = upper[i]
+                clamped = True
+        if clamped:
+            self.stats[kind] += 1
+
+    def _clamp_planes(self, target):
+        projected = False
+        for _ in range(3):
+            violated = False
+            for a0, a1, a2, b, u0, u1, u2 in self._planes:
+                excess = a0 * target[0] + a1 * target[1] + a2 * target[2] - b
+                if excess > 1e-9:
+                    target[0] -= excess * u0
+                    target[1] -= excess * u1
+                    target[2] -= excess * u2
+                    violated = True
+            if not violated:
+                break
+            projected = True
+        if projected:
+            self.stats['polytope'] += 1
+
+    def _limit_rate(self, track, target, max_velocity, max_acceleration, wrap, now):
+        """Limits target (a list) against the previous command of track, in place.
+
+        A command reachable within the limits passes unchanged. Otherwise the axis moves
+        towards it no faster than it can still stop within the distance decelerating at a_max
+        per step, and lands exactly on the target once the remaining distance fits in one step.
+        """
+        if track['last'] is None or now - track['time'] > self.stale_after:
+            seed = None
+            if self.read_state_fn is not None:
+                pose, angles = self.read_state_fn()[:2]
+                seed = pose if track is self._pose else angles
+            track['last'] = [float(v) for v in (target if seed is None else seed)]
+            track['velocity'] = [0.0] * 6
+            track['time'] = now
+        # Whole nominal periods, so call timing jitter does not read as acceleration
+        period = self.period
+        dt = min(period * max(1.0, round((now - track['time']) / period)), self.max_dt)
+        last = track['last']
+        last_velocity = track['velocity']
+        velocity_clamped = False
+        acceleration_clamped = False
+        for i in range(6):
+            value = target[i]
+            if wrap[i]:
+                value = (value + 180.0) % 360.0 - 180.0
+            delta = value - last[i]
+            if wrap[i]:
+                delta = (delta + 180.0) % 360.0 - 180.0
+            velocity = delta / dt
+            v_max = max_velocity[i]
+            dv_max = max_acceleration[i] * dt
+            if -v_max <= velocity <= v_max and abs(velocity - last_velocity[i]) <= dv_max:
+                target[i] = value
+                last[i] = value
+                last_velocity[i] = velocity
+                continue
+            if abs(velocity) > v_max:
+                velocity_clamped = True
+            else:
+                acceleration_clamped = True
+            # Fastest speed that still stops within |delta| decelerating by dv_max per step
+            braking = min(v_max, dv_max * (math.sqrt(0.25 + 2.0 * abs(delta) / (dv_max * dt)) - 0.5))
+            if delta < 0.0:
+                braking = -braking
+            velocity = last_velocity[i] + min(max(braking - last_velocity[i], -dv_max), dv_max)
+            step = velocity * dt
+            if (step >= delta >= 0.0) or (step <= delta <= 0.0):
+                # Arrives within this step, land on the target instead of carrying past it
+                last_velocity[i] = 0.0
+            else:
+                value = last[i] + step
+                if wrap[i]:
+                    value = (value + 180.0) % 360.0 - 180.0
+                last_velocity[i] = velocity
+            target[i] = value
+            last[i] = value
+        track['time'] = now
+        if velocity_clamped:
+            self.stats['velocity'] += 1
+        if acceleration_clamped:
+            self.stats['acceleration'] += 1
+        return target
+
+    def _check_joints(self, target):
+        """Solves target near the last safe joints, returns False if out of reach or joint limits."""
+        seed = self._safe_joints
+        if seed is None and self.read_state_fn is not None:
+            seed = [float(v) for v in self.read_state_fn()[1]]
+        joints = self.kinematics.inverse(target, seed).tolist()
+        for i in range(6):
+            q = joints[i]
+            if math.isnan(q):
+                self.stats['unreachable'] += 1
+                return False
+            if q < self._joint_min[i] or q > self._joint_max[i]:
+                self.stats['ik_joint_limit'] += 1
+                return False
+        self._safe_joints = joints
+        return True
+
+    def _inside(self, pose):
+        """True if a pose lies inside the box and the planes, leaves it unchanged."""
+        for i in range(6):
+            if pose[i] < self._lower[i] - 1e-9 or pose[i] > self._upper[i] + 1e-9:
+                return False
+        for a0, a1, a2, b, _, _, _ in self._planes:
+            if a0 * pose[0] + a1 * pose[1] + a2 * pose[2] - b > 1e-9:
+                return False
+        return True
+
+    def _hold(self, track, safe, state_index, target):
+        """Puts track at rest on the last safe command and returns a copy of it."""
+        if safe is None:
+            if self.read_state_fn is None:
+                raise ValueError(f"Command {target} is unsafe and there is no safe command to hold.")
+            safe = [float(v) for v in self.read_state_fn()[state_index]]
+        track['last'] = list(safe)
+        track['velocity'] = [0.0] * 6
+        return list(safe)
+
+    def _clamp_limited(self, track, target):
+        """Clamps a rate limited target into the planes and box again, in place.
+
+        The rate limits act per axis and can carry the target outside a plane. The track
+        continues from the clamped value.
+        """
+        if self._planes:
+            self._clamp_planes(target)
+        self._clamp_box(target, self._lower, self._upper, 'workspace')
+        track['last'][:] = target
+
+    def filter_pose(self, pose, now=None):
+        """Returns the safe version of one ServoP target [x, y, z, rx, ry, rz] as a list."""
+        now = time.perf_counter() if now is None else now
+        target = [float(v) for v in pose]
+        self.stats['commands'] += 1
+        if self._planes:
+            self._clamp_planes(target)
+        self._clamp_box(target, self._lower, self._upper, 'workspace')
+        self._limit_rate(self._pose, target, self._max_velocity, self._max_acceleration, self._wrap, now)
+        self._clamp_limited(self._pose, target)
+        if self.kinematics is not None and not self._check_joints(target):
+            return self._hold(self._pose, self._safe_pose, 0, target)
+        self._safe_pose = list(target)
+        return target
+
+    def filter_angles(self, angles, now=None):
+        """Returns the safe version of one ServoJ target (deg) as a list."""
+        now = time.perf_counter() if now is None else now
+        target = [float(v) for v in angles]
+        self.stats['commands'] += 1
+        self._clamp_box(target, self._joint_min, self._joint_max, 'joint_limit')
+        self._limit_rate(self._joints, target, self._max_joint_velocity, self._max_joint_acceleration,
+                         (False,) * 6, now)
+        for i in range(6):
+            target[i] = min(max(target[i], self._joint_min[i]), self._joint_max[i])
+        if self.kinematics is not None:
+            pose = self.kinematics.forward(target).tolist()
+            if not self._inside(pose):
+                self.stats['fk_workspace'] += 1
+                return self._hold(self._joints, self._safe_joints, 1, target)
+            self._safe_pose = pose
+        self._safe_joints = list(target)
+        return target
+
+    def filter_trajectory(self, poses, dt, start=None):
+        """Filters an (N, 6) pose trajectory sampled every dt s, returns a new array.
+
+        The workspace clamp is one vectorized pass; the rate limits depend on the previous
+        sample and run as one loop over the rows, starting from start (or the first row),
+        each limited row is clamped into the planes and box again.
+        """
+        poses = np.array(poses, dtype=np.float64)
+        self.clamp_poses(poses)
+        rows = poses.tolist()
+        track = {'last': list(rows[0] if start is None else map(float, start)), 'velocity': [0.0] * 6, 'time': 0.0}
+        saved = self.period, self.max_dt, self.stale_after
+        self.period, self.max_dt, self.stale_after = dt, dt, np.inf
+        try:
+            for i, row in enumerate(rows):
+                self._limit_rate(track, row, self._max_velocity, self._max_acceleration, self._wrap, (i + 1) * dt)
+                self._clamp_limited(track, row)
+        finally:
+            self.period, self.max_dt, self.stale_after = saved
+        return np.asarray(rows)
+
+    def check_trajectory(self, poses, ref_joints=None):
+        """Boolean mask of the (N, 6) poses that are reachable within the joint limits.
+
+        Solves all rows with the batch IK near ref_joints (the current joints), rows
+        outside the workspace are reported as well.
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        inside = np.all((poses >= self.lower) & (poses <= self.upper), axis=-1)
+        if self.A is not None:
+            inside &= np.all(poses[..., :3] @ self.A.T <= self.b + 1e-9, axis=-1)
+        if self.kinematics is None:
+            return inside
+        joints = self.kinematics.inverse(poses, ref_joints)
+        reachable = ~np.any(np.isnan(joints), axis=-1)
+        within = np.all((joints >= self.joint_min) & (joints <= self.joint_max), axis=-1)
+        return inside & reachable & within
+
+    def get_stats(self):
+        """Number of filtered commands and how often each limit clamped one."""
+        return dict(self.stats)
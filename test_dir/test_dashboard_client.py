@@ -0,0 +1,98 @@
+"""Checks for dashboard_client reply matching, run from the repo root: python -m pytest test_dir/test_dashboard_client.py"""
+import re
+import socket
+import threading
+import time
+import pytest
+from dashboard_client import DashboardClient
+from dobot_emulator import DobotEmulator
+
+COMMAND = re.compile(rb'(\w+)\(([^)]*)\)')
+
+
+class ScriptedDashboard:
+    """Dashboard stand-in that answers each command with reply_fn(name, args).
+
+    Commands that arrive together are answered together after delay s; max_unanswered is
+    the most commands it held unanswered at once.
+    """
+
+    def __init__(self, reply_fn, delay=0.02):
+        self.reply_fn = reply_fn
+        self.delay = delay
+        self.max_unanswered = 0
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        conn, _ = self.server.accept()
+        buffer = b""
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    return
+                time.sleep(self.delay)
+                conn.setblocking(False)
+                try:
+                    data += conn.recv(4096)
+                except BlockingIOError:
+                    pass
+                conn.setblocking(True)
+                buffer += data
+                commands = COMMAND.findall(buffer)
+                buffer = buffer[buffer.rfind(b")") + 1:]
+                self.max_unanswered = max(self.max_unanswered, len(commands))
+                conn.sendall(b"".join(self.reply_fn(name.decode(), args.decode()).encode() for name, args in commands))
+
+    def close(self):
+        self.server.close()
+
+
+def echo(name, args):
+    return f"0,{{{args}}},{name}({args});"
+
+
+def test_pipelined_replies_reach_their_callers():
+    emulator = DobotEmulator(dashboard_port=0, move_port=0, feedback_port=0, latency=0.001, jitter=0.0005)
+    emulator.start()
+    client = DashboardClient("127.0.0.1", emulator.dashboard_port)
+    try:
+        commands = [("GetPose",), ("GetAngle",), ("RobotMode",), ("SpeedFactor", 30)] * 8
+        replies = client.call_many(commands)
+        for (name, *_), reply in zip(commands, replies):
+            assert reply.endswith(f"{name}({','.join(str(a) for a in _)});")
+    finally:
+        client.close()
+        emulator.stop()
+
+
+@pytest.mark.parametrize("wrong_reply", ["0,{},ToolDOExecute(1,1);", "0,{400.0,0.0},GetPose();"])
+def test_mismatched_reply_fails_instead_of_being_delivered(wrong_reply):
+    server = ScriptedDashboard(lambda name, args: wrong_reply if name == "Tool" else echo(name, args))
+    client = DashboardClient("127.0.0.1", server.port, timeout=1.0)
+    try:
+        assert client.call_many([("SpeedFactor", 30)]) == ["0,{30},SpeedFactor(30);"]
+        with pytest.raises(ConnectionError):
+            client.call_many([("Tool", 1), ("GetAngle",)])
+        with pytest.raises(ConnectionError):
+            client.GetAngle()
+    finally:
+        client.close()
+        server.close()
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_batches_respect_max_in_flight(max_in_flight):
+    server = ScriptedDashboard(echo)
+    client = DashboardClient("127.0.0.1", server.port, max_in_flight=max_in_flight, timeout=1.0)
+    try:
+        commands = [("ToolDOExecute", i, 1) for i in range(7)]
+        replies = client.call_batch(commands)
+        assert replies == [echo("ToolDOExecute", f"{i},1") for i in range(7)]
+        assert server.max_unanswered == max_in_flight
+    finally:
+        client.close()
+        server.close()
@@ -6,6 +6,7 @@ from queue import Queue
 
 # Assuming these are your custom utility classes
 from dobot import Robot
+from safety_utils import clip_pose
 from camera_utils import Camera
 from record import RecordData
 
@@ -128,10 +129,6 @@ while running:
         y += (-left_axis_y) * UNITS_TO_JUMP
         z += (-right_axis_z) * UNITS_TO_JUMP
 
-        x = max(min(x, 750), 240)
-        y = max(min(y, 550), -330)
-        z = max(min(z, 300), -20)
-
         if joystick.get_button(3): rx -= 5
         if joystick.get_button(1): rx += 5
         if joystick.get_button(4): ry += 5
@@ -139,9 +136,8 @@ while running:
         if joystick.get_button(7): rz += 5
         if joystick.get_button(6): rz -= 5
 
-        rx = max(min(rx, 180), -180)
-        ry = max(min(ry, 180), -180)
-        rz = max(min(rz, 180), -180)
+        # Clamping to the shared workspace limits
+        x, y, z, rx, ry, rz = clip_pose([x, y, z, rx, ry, rz])
 
     action_gripper = r_obj.suction_on
     actions_p = [x, y, z, rx, ry, rz]
@@ -6,6 +6,7 @@ from queue import Queue
 
 # Assuming these are your custom utility classes
 from dobot import Robot
+from safety_utils import clip_pose
 from camera_utils import Camera
 from record_inv import RecordData
 
@@ -131,10 +132,6 @@ while running:
         y += (left_axis_y) * UNITS_TO_JUMP
         z += (-right_axis_z) * UNITS_TO_JUMP
 
-        x = max(min(x, 750), 240)
-        y = max(min(y, 550), -330)
-        z = max(min(z, 300), -20)
-
         if joystick.get_button(3): rx -= 5
         if joystick.get_button(1): rx += 5
         if joystick.get_button(4): ry += 5
@@ -142,9 +139,8 @@ while running:
         if joystick.get_button(7): rz += 5
         if joystick.get_button(6): rz -= 5
 
-        rx = max(min(rx, 180), -180)
-        ry = max(min(ry, 180), -180)
-        rz = max(min(rz, 180), -180)
+        # Clamping to the shared workspace limits
+        x, y, z, rx, ry, rz = clip_pose([x, y, z, rx, ry, rz])
 
     action_gripper = r_obj.suction_on
     actions_p = [x, y, z, rx, ry, rz]
@@ -161,9 +157,10 @@ while running:
         r_obj.send_angles(action_a)
         timer = time.perf_counter()
     except (UnicodeDecodeError, socket.error) as e:
+        # robot/dobot.py has no connection supervisor, the move port is reconnected here
         print(f"Connection error ({type(e).__name__}): {e}. Attempting to reconnect...")
         r_obj.move.close()
-        r_obj.move = r_obj._connect_move()
+        r_obj._connect_move()  # Re-initializes r_obj.move, the sender thread picks it up
         try:
             r_obj.send_angles(action_a)
             print("Reconnected and sent actions successfully.")
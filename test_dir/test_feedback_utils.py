@@ -0,0 +1,120 @@
+"""Checks for feedback_utils, run from the repo root: python -m pytest test_dir/test_feedback_utils.py"""
+import socket
+import threading
+import numpy as np
+from feedback_utils import (FEEDBACK_DTYPE, FEEDBACK_PACKET_SIZE, FEEDBACK_TEST_VALUE, FeedbackHistory,
+                            FeedbackReader, FeedbackStore, is_aligned, resync_offset)
+
+
+def make_packet(i):
+    """Packet i with the TestValue set and QActual = ToolVectorActual = i."""
+    packet = np.zeros(1, dtype=FEEDBACK_DTYPE)
+    packet['len'] = FEEDBACK_PACKET_SIZE
+    packet['TestValue'] = FEEDBACK_TEST_VALUE
+    packet['QActual'] = float(i)
+    packet['ToolVectorActual'] = float(i)
+    return packet.tobytes()
+
+
+def serve_once(data):
+    """Serves data to the first client on a local port and closes, returns the port."""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            # Odd-sized writes, so packets and the TestValue straddle recv() calls
+            for start in range(0, len(data), 997):
+                conn.sendall(data[start:start + 997])
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def test_resync_offset_points_at_the_next_packet():
+    stream = make_packet(1) + make_packet(2)
+    assert is_aligned(stream[:FEEDBACK_PACKET_SIZE])
+    for shift in (1, 47, 48, 57, 700, FEEDBACK_PACKET_SIZE - 1):
+        buffer = stream[shift:shift + FEEDBACK_PACKET_SIZE]
+        assert not is_aligned(buffer)
+        start = resync_offset(buffer)
+        assert (shift + start) % FEEDBACK_PACKET_SIZE == 0
+    # No whole TestValue in the buffer: keep the tail in case it straddles the next read
+    assert resync_offset(bytes(FEEDBACK_PACKET_SIZE)) == FEEDBACK_PACKET_SIZE - 7
+    shift = 52  # Cuts the first TestValue, the second one starts in the last 4 bytes
+    start = resync_offset(stream[shift:shift + FEEDBACK_PACKET_SIZE])
+    assert start == FEEDBACK_PACKET_SIZE - 7
+    buffer = stream[shift + start:shift + start + FEEDBACK_PACKET_SIZE]
+    assert (shift + start + resync_offset(buffer)) % FEEDBACK_PACKET_SIZE == 0
+
+
+def test_reader_realigns_after_garbage():
+    stream = b"\x55" * 123 + make_packet(1) + make_packet(2) + b"\x00" * 2000 + b"\xaa" * 5 + \
+        b"".join(make_packet(i) for i in range(3, 8))
+    reader = FeedbackReader("127.0.0.1", serve_once(stream))
+    try:
+        values = [float(reader.read_packet()['QActual'][0]) for _ in range(7)]
+    finally:
+        reader.close()
+    assert values == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    assert reader.resyncs > 0
+    assert reader.packets_read == 7
+
+
+def test_store_reads_are_never_torn():
+    store = FeedbackStore()
+    assert store.read()[3] == 0
+    packet = np.zeros((), dtype=FEEDBACK_DTYPE)
+    done = threading.Event()
+
+    def write():
+        for i in range(1, 20001):
+            packet['ToolVectorActual'] = i
+            packet['QActual'] = i
+            store.publish(packet, float(i))
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    pose, angles = np.empty(6), np.empty(6)
+    last_seq = 0
+    while not done.is_set():
+        _, _, stamp, seq = store.read(pose, angles)
+        if seq:
+            # Every field of a read comes from the same sample
+            assert np.all(pose == stamp) and np.all(angles == stamp)
+            assert seq >= last_seq
+            last_seq = seq
+    writer.join()
+    _, _, stamp, seq = store.read(pose, angles)
+    assert seq == 20000 and stamp == 20000.0
+    assert float(store.read_packet()['QActual'][0]) == 20000.0
+
+
+def test_history_interpolates_and_clamps():
+    history = FeedbackHistory(size=8)
+    assert history.get_at(0.0) == (None, None)
+    packet = np.zeros((), dtype=FEEDBACK_DTYPE)
+    for i in range(20):  # Wraps the ring buffer
+        packet['QActual'] = 10.0 * i
+        packet['ToolVectorActual'] = [10.0 * i] * 3 + [170.0 + 5.0 * i] * 3
+        history.append(packet, float(i))
+    pose, angles = history.get_at(15.5)
+    assert np.allclose(angles, 155.0)
+    assert np.allclose(pose[:3], 155.0)
+    # 245 deg is -115, halfway between -120 and -110 across the wrap
+    assert np.allclose(pose[3:], -112.5)
+    # Older than the buffered window and newer than the last sample clamp to the ends
+    assert np.allclose(history.get_at(0.0)[1], 130.0)
+    assert np.allclose(history.get_at(100.0)[1], 190.0)
+
+
+def test_history_rotation_takes_the_short_way():
+    history = FeedbackHistory(size=4)
+    packet = np.zeros((), dtype=FEEDBACK_DTYPE)
+    for stamp, rx in ((0.0, 179.0), (1.0, -179.0)):
+        packet['ToolVectorActual'] = [0.0, 0.0, 0.0, rx, 0.0, 0.0]
+        history.append(packet, stamp)
+    pose, _ = history.get_at(0.5)
+    assert abs(abs(pose[3]) - 180.0) < 1e-9
@@ -0,0 +1,84 @@
+"""Checks for kinematics_utils.IKCache, run from the repo root: python -m pytest test_dir/test_ik_cache.py"""
+import threading
+from kinematics_utils import IKCache
+
+POSE = [400.0, 0.0, 200.0, 180.0, 0.0, 0.0]
+JOINTS = [0.0, -30.0, -90.0, -60.0, 90.0, 0.0]
+
+
+def shifted(pose, dx=0.0, drx=0.0):
+    pose = list(pose)
+    pose[0] += dx
+    pose[3] += drx
+    return pose
+
+
+def test_get_hits_within_the_key_grid():
+    cache = IKCache()
+    assert cache.get(POSE) is None
+    cache.put(POSE, JOINTS)
+    assert cache.get(shifted(POSE, dx=0.2)).tolist() == JOINTS
+    assert cache.get(shifted(POSE, dx=0.3)) is None  # Rounds into the next cell
+    assert cache.stats() == {'hits': 1, 'warm_starts': 0, 'misses': 0, 'entries': 1}
+
+
+def test_nearest_returns_a_recent_entry_within_reach():
+    cache = IKCache(recent=2)
+    cache.put(POSE, JOINTS)
+    cached_pose, joints = cache.nearest(shifted(POSE, dx=4.0, drx=-2.0))
+    assert cached_pose.tolist() == POSE and joints.tolist() == JOINTS
+    # Rotations compare across the +-180 wrap
+    assert cache.nearest(shifted(POSE, drx=-358.0)) is not None
+    assert cache.nearest(shifted(POSE, dx=6.0)) is None
+    assert cache.nearest(shifted(POSE, drx=4.0)) is None
+    # Only the last `recent` entries are searched
+    cache.put(shifted(POSE, dx=100.0), JOINTS)
+    cache.put(shifted(POSE, dx=200.0), JOINTS)
+    assert cache.nearest(POSE) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = IKCache(size=3)
+    poses = [shifted(POSE, dx=10.0 * i) for i in range(3)]
+    for i, pose in enumerate(poses):
+        cache.put(pose, [float(i)] * 6)
+    cache.get(poses[0])  # Now the most recent
+    cache.put(shifted(POSE, dx=30.0), [3.0] * 6)
+    assert cache.get(poses[1]) is None
+    assert cache.get(poses[0]) is not None and cache.get(poses[2]) is not None
+    assert cache.stats()['entries'] == 3
+
+
+def test_counters():
+    cache = IKCache()
+    cache.count('warm_starts')
+    cache.count('misses')
+    cache.count('misses')
+    assert cache.stats() == {'hits': 0, 'warm_starts': 1, 'misses': 2, 'entries': 0}
+
+
+def test_concurrent_put_and_get():
+    cache = IKCache(size=64)
+    errors = []
+
+    def put():
+        for i in range(5000):
+            cache.put(shifted(POSE, dx=float(i % 100)), [float(i % 100)] * 6)
+
+    def read():
+        try:
+            for i in range(5000):
+                joints = cache.get(shifted(POSE, dx=float(i % 100)))
+                if joints is not None:
+                    assert joints[0] == float(i % 100)
+                cache.nearest(shifted(POSE, dx=float(i % 100)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.stats()['entries'] == 64
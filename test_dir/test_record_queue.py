@@ -0,0 +1,133 @@
+"""Checks for record_updated.RecordQueue policies, run from the repo root: python -m pytest test_dir/test_record_queue.py"""
+import threading
+import time
+import pytest
+from record_updated import RecordQueue
+
+
+class FrameLedger:
+    """Stands in for the frame buffers, counts how often each packet's frames are released."""
+
+    def __init__(self):
+        self.released = {}
+        self._lock = threading.Lock()
+
+    def release(self, i):
+        with self._lock:
+            self.released[i] = self.released.get(i, 0) + 1
+
+    def drop_frames(self, packet):
+        self.release(packet['i'])
+        return dict(packet, frames=None)
+
+
+def make_packet(i):
+    return {'i': i, 'frames': f"frames {i}"}
+
+
+def drain(queue, ledger):
+    """Gets packets up to the close sentinel, releasing the frames the recorder would write."""
+    packets = []
+    while True:
+        packet = queue.get()
+        if packet is None:
+            return packets
+        if packet['frames'] is not None:
+            ledger.release(packet['i'])
+        packets.append(packet)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RecordQueue(lambda packet: packet, policy='drop_newest')
+
+
+def test_drop_video_keeps_every_state_row():
+    ledger = FrameLedger()
+    queue = RecordQueue(ledger.drop_frames, maxsize=3, policy='drop_video')
+    for i in range(10):
+        queue.put(make_packet(i))
+    stats = queue.get_stats()
+    assert stats['dropped_video'] == 7 and stats['dropped_packets'] == 0
+    assert stats['depth'] == 10 and stats['frame_depth'] == 3 and stats['high_water'] == 10
+    queue.close()
+    packets = drain(queue, ledger)
+    assert [packet['i'] for packet in packets] == list(range(10))
+    assert [packet['frames'] is not None for packet in packets] == [True] * 3 + [False] * 7
+    assert ledger.released == {i: 1 for i in range(10)}
+    assert queue.get_stats()['depth'] == 0
+
+
+def test_drop_oldest_keeps_the_newest_packets():
+    ledger = FrameLedger()
+    queue = RecordQueue(ledger.drop_frames, maxsize=3, policy='drop_oldest')
+    for i in range(10):
+        queue.put(make_packet(i))
+    stats = queue.get_stats()
+    assert stats['dropped_packets'] == 7 and stats['dropped_video'] == 0
+    assert stats['depth'] == 3 and stats['frame_depth'] == 3
+    queue.close()
+    packets = drain(queue, ledger)
+    assert [packet['i'] for packet in packets] == [7, 8, 9]
+    assert all(packet['frames'] is not None for packet in packets)
+    assert ledger.released == {i: 1 for i in range(10)}
+
+
+def test_drop_oldest_only_counts_packets_with_frames():
+    ledger = FrameLedger()
+    queue = RecordQueue(ledger.drop_frames, maxsize=2, policy='drop_oldest')
+    queue.put(make_packet(0))
+    queue.put(make_packet(1))
+    queue.put(make_packet(2))  # Drops packet 0 and its frames
+    assert queue.get_stats()['frame_depth'] == 2
+    queue.close()
+    assert [packet['i'] for packet in drain(queue, ledger)] == [1, 2]
+    assert ledger.released == {0: 1, 1: 1, 2: 1}
+
+
+def test_block_times_out_to_drop_video():
+    ledger = FrameLedger()
+    queue = RecordQueue(ledger.drop_frames, maxsize=2, policy='block', block_timeout=0.05)
+    for i in range(3):
+        queue.put(make_packet(i))
+    stats = queue.get_stats()
+    assert stats['blocked'] == 1 and stats['dropped_video'] == 1
+    assert 0.04 <= stats['max_blocked_time'] < 1.0
+    queue.close()
+    packets = drain(queue, ledger)
+    assert [packet['frames'] is not None for packet in packets] == [True, True, False]
+    assert ledger.released == {0: 1, 1: 1, 2: 1}
+
+
+def test_block_waits_for_the_recorder():
+    ledger = FrameLedger()
+    queue = RecordQueue(ledger.drop_frames, maxsize=2, policy='block', block_timeout=5.0)
+
+    def record():
+        packet = queue.get()
+        while packet is not None:
+            time.sleep(0.002)  # Slower than the producer
+            ledger.release(packet['i'])
+            received.append(packet)
+            packet = queue.get()
+
+    received = []
+    recorder = threading.Thread(target=record)
+    recorder.start()
+    for i in range(50):
+        queue.put(make_packet(i))
+        assert queue.get_stats()['frame_depth'] <= 2
+    queue.close()
+    recorder.join(timeout=10.0)
+    stats = queue.get_stats()
+    assert stats['blocked'] > 0 and stats['dropped_video'] == 0 and stats['dropped_packets'] == 0
+    assert [packet['i'] for packet in received] == list(range(50))
+    assert ledger.released == {i: 1 for i in range(50)}
+
+
+def test_close_sentinel_follows_the_queued_packets():
+    queue = RecordQueue(lambda packet: packet, maxsize=1, policy='drop_oldest')
+    queue.put(make_packet(0))
+    queue.close()  # Not dropped even though the queue is full of frames
+    assert queue.get()['i'] == 0
+    assert queue.get() is None
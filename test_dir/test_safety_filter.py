@@ -0,0 +1,109 @@
+"""Checks for safety_utils.SafetyFilter, run from the repo root: python -m pytest test_dir/test_safety_filter.py"""
+import numpy as np
+from kinematics_utils import Kinematics
+from safety_utils import SafetyFilter
+
+PERIOD = 1.0 / 125
+HOME_JOINTS = [0.0, -30.0, -90.0, -60.0, 90.0, 0.0]  # Tool at ~[418, -141, 222] mm
+
+
+def run_filter(safety, target, steps, jitter=0.0, seed=0):
+    """Sends the same target every period (+- jitter s) and returns the filtered commands."""
+    rng = np.random.default_rng(seed)
+    now = 0.0
+    out = []
+    for _ in range(steps):
+        now += PERIOD + rng.uniform(-jitter, jitter)
+        out.append(safety.filter_pose(target, now=now))
+    return np.array(out)
+
+
+def test_step_command_settles_exactly_on_target():
+    safety = SafetyFilter(period=PERIOD)
+    start = [400.0, 0.0, 200.0, 180.0, 0.0, 0.0]
+    target = [450.0, -20.0, 150.0, -170.0, 0.0, 30.0]
+    safety.reset(start)
+    out = run_filter(safety, target, 250)
+    assert out[-1].tolist() == target
+    # Settles once and stays, never carries past the target
+    for axis in (0, 1, 2, 5):
+        sign = np.sign(target[axis] - start[axis])
+        assert np.all(sign * (out[:, axis] - target[axis]) <= 0.0)
+    assert np.all(out[-50:] == np.array(target))
+
+
+def test_rate_limits_hold_on_a_step():
+    safety = SafetyFilter(period=PERIOD)
+    safety.reset([400.0, 0.0, 200.0, 180.0, 0.0, 0.0])
+    out = run_filter(safety, [450.0, 0.0, 200.0, 180.0, 0.0, 0.0], 250)
+    velocity = np.diff(np.concatenate([[400.0], out[:, 0]])) / PERIOD
+    assert np.all(np.abs(velocity) <= safety.max_velocity[0] + 1e-6)
+    # Up to the landing step, after which the axis rests on the target
+    landing = np.flatnonzero(velocity)[-1]
+    assert np.all(np.abs(np.diff(velocity[:landing + 1])) <= safety.max_acceleration[0] * PERIOD + 1e-6)
+
+
+def test_call_jitter_is_not_counted_as_acceleration():
+    safety = SafetyFilter(period=PERIOD)
+    command = [400.0, 0.0, 200.0, 170.0, 0.0, 0.0]
+    safety.reset(command)
+    now = 0.0
+    rng = np.random.default_rng(1)
+    for i in range(68):
+        now += PERIOD + rng.uniform(-0.002, 0.002)
+        command[0] += min(10.0 * (i + 1), 50.0) * PERIOD  # Ramps up to 50 mm/s within the limits
+        assert safety.filter_pose(command, now=now) == command
+    assert safety.stats['velocity'] == 0
+    assert safety.stats['acceleration'] == 0
+
+
+def test_pose_outside_joint_limits_holds_last_safe_pose():
+    kinematics = Kinematics()
+    joint_max = [360.0] * 6
+    joint_max[0] = 10.0  # J1 may not turn past 10 deg
+    safety = SafetyFilter(kinematics=kinematics, joint_max=joint_max, period=PERIOD)
+    start = kinematics.forward(HOME_JOINTS).tolist()
+    safety.reset(start, HOME_JOINTS)
+    reachable = kinematics.forward([5.0] + HOME_JOINTS[1:]).tolist()
+    out = run_filter(safety, reachable, 400)
+    assert np.allclose(out[-1], reachable)
+    blocked = kinematics.forward([20.0] + HOME_JOINTS[1:]).tolist()
+    out = run_filter(safety, blocked, 400)
+    assert safety.stats['ik_joint_limit'] > 0
+    joints = kinematics.inverse(out, HOME_JOINTS)
+    assert np.all(joints[:, 0] <= 10.0 + 1e-6)
+
+
+def test_rate_limited_pose_stays_inside_planes():
+    # Plane x + y <= 700, x moves four times faster than y so the straight per-axis path cuts the corner
+    planes = ([[1.0, 1.0, 0.0]], [700.0])
+    safety = SafetyFilter(planes=planes, max_velocity=(20.0, 5.0, 5.0, 90.0, 90.0, 90.0), period=PERIOD)
+    safety.reset([300.0, 380.0, 200.0, 180.0, 0.0, 0.0])
+    out = run_filter(safety, [450.0, 250.0, 200.0, 180.0, 0.0, 0.0], 4000)
+    assert np.all(out[:, 0] + out[:, 1] <= 700.0 + 1e-6)
+    assert safety.stats['polytope'] > 0
+    assert np.allclose(out[-1, :3], [450.0, 250.0, 200.0])
+
+
+def test_filtered_trajectory_stays_inside_planes():
+    planes = ([[1.0, 1.0, 0.0]], [700.0])
+    safety = SafetyFilter(planes=planes, max_velocity=(20.0, 5.0, 5.0, 90.0, 90.0, 90.0))
+    poses = np.array([[300.0, 380.0, 200.0, 180.0, 0.0, 0.0]] + [[450.0, 250.0, 200.0, 180.0, 0.0, 0.0]] * 4000)
+    out = safety.filter_trajectory(poses, PERIOD)
+    assert np.all(out[:, 0] + out[:, 1] <= 700.0 + 1e-6)
+    assert safety.stats['polytope'] > 0
+    assert np.allclose(out[-1, :3], [450.0, 250.0, 200.0])
+
+
+def test_joint_command_outside_workspace_holds_last_safe_joints():
+    kinematics = Kinematics()
+    safety = SafetyFilter(kinematics=kinematics, period=PERIOD)
+    safety.reset(kinematics.forward(HOME_JOINTS).tolist(), HOME_JOINTS)
+    now = 0.0
+    out = []
+    for _ in range(400):
+        now += PERIOD
+        out.append(safety.filter_angles([-90.0] + HOME_JOINTS[1:], now=now))
+    poses = kinematics.forward(np.array(out))
+    assert safety.stats['fk_workspace'] > 0
+    assert np.all((poses >= safety.lower - 1e-6) & (poses <= safety.upper + 1e-6))
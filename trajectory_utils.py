@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from feedback_utils import wrap_degrees
+
+
+class TrajectoryLimiter:
+    """Per-axis velocity and acceleration limited tracking of a moving target.
+
+    Each axis brakes along sqrt(2 * a_max * distance) so it reaches the target without
+    overshoot. Axes flagged in wrap_mask (rotations in degrees) take the short way round.
+    """
+
+    def __init__(self, max_velocity, max_acceleration, wrap_mask=None):
+        self.max_velocity = np.asarray(max_velocity, dtype=np.float64)
+        self.max_acceleration = np.asarray(max_acceleration, dtype=np.float64)
+        self.wrap_mask = np.zeros(len(self.max_velocity), dtype=bool) if wrap_mask is None \
+            else np.asarray(wrap_mask, dtype=bool)
+        self.position = np.zeros(len(self.max_velocity))
+        self.velocity = np.zeros(len(self.max_velocity))
+
+    def reset(self, position):
+        self.position[:] = position
+        self.velocity[:] = 0.0
+
+    def step(self, target, dt):
+        """Advances the setpoint by dt towards target and returns it (the internal array)."""
+        error = np.asarray(target, dtype=np.float64) - self.position
+        error[self.wrap_mask] = wrap_degrees(error[self.wrap_mask])
+        braking_velocity = np.sign(error) * np.minimum(self.max_velocity,
+                                                       np.sqrt(2.0 * self.max_acceleration * np.abs(error)))
+        max_dv = self.max_acceleration * dt
+        self.velocity += np.clip(braking_velocity - self.velocity, -max_dv, max_dv)
+        step = self.velocity * dt
+        arrived = np.abs(step) >= np.abs(error)
+        step[arrived] = error[arrived]
+        self.velocity[arrived] = 0.0
+        self.position += step
+        self.position[self.wrap_mask] = wrap_degrees(self.position[self.wrap_mask])
+        return self.position
+
+    def is_idle(self, target):
+        error = np.asarray(target, dtype=np.float64) - self.position
+        error[self.wrap_mask] = wrap_degrees(error[self.wrap_mask])
+        return not np.any(self.velocity) and not np.any(error)
+
+
+class TrajectoryStreamer:
+    """Timer thread that streams limited setpoints towards the latest sparse target.
+
+    set_target() is a plain memory write, the thread interpolates at rate_hz on absolute
+    deadlines and hands each setpoint to send_fn. Nothing is sent while the setpoint rests
+    on the target.
+
+    Failed sends are counted and the last error kept (get_stats()). Once max_failures
+    sends failed within failure_window seconds the thread stops and set_target() raises
+    the error, so the control loop learns that setpoints no longer reach the arm.
+    """
+
+    def __init__(self, limiter, send_fn, rate_hz=125, max_failures=25, failure_window=1.0):
+        self.limiter = limiter
+        self.send_fn = send_fn
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.target = None
+        self._thread = None
+        self._is_running = False
+        self.ticks = 0
+        self.late_ticks = 0  # Ticks that started more than one period late
+        self.sent = 0
+        self.failures = 0
+        self.last_error = None
+        self.error = None  # Set when streaming stopped on repeated failures
+        self._recent_failures = deque()
+
+    def set_target(self, target):
+        """Sets the target, raises the error that stopped the streaming thread if there is one."""
+        if self.error is not None:
+            raise self.error
+        self.target = np.array(target, dtype=np.float64)
+
+    def _send_failed(self, e):
+        now = time.perf_counter()
+        self.failures += 1
+        self.last_error = e
+        self._recent_failures.append(now)
+        while now - self._recent_failures[0] > self.failure_window:
+            self._recent_failures.popleft()
+        if len(self._recent_failures) == 1:
+            print(f"Error in streaming thread: {e}")
+        if len(self._recent_failures) >= self.max_failures:
+            self.error = ConnectionError(f"Streaming stopped after {len(self._recent_failures)} failed sends "
+                                         f"within {self.failure_window} s, last: {e!r}")
+            print(self.error)
+            self._is_running = False
+
+    def _stream_loop(self):
+        """The target function for the streaming thread."""
+        next_tick = time.perf_counter()
+        while self._is_running:
+            target = self.target
+            if not self.limiter.is_idle(target):
+                setpoint = self.limiter.step(target, self.period)
+                try:
+                    self.send_fn(setpoint.tolist())
+                    self.sent += 1
+                except Exception as e:
+                    self._send_failed(e)
+            self.ticks += 1
+
+            next_tick += self.period
+            sleep_duration = next_tick - time.perf_counter()
+            if sleep_duration > 0:
+                time.sleep(sleep_duration)
+            elif sleep_duration < -self.period:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+
+    def start(self, position):
+        """Starts streaming from position (the robot's current pose or joints)."""
+        if not self._is_running:
+            self.limiter.reset(position)
+            self.set_target(position)
+            self._is_running = True
+            self._thread = threading.Thread(target=self._stream_loop)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._is_running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self):
+        """Ticks, sent setpoints, send failures and the last send error."""
+        return {'ticks': self.ticks, 'late_ticks': self.late_ticks, 'sent': self.sent, 'failures': self.failures,
+                'last_error': repr(self.last_error) if self.last_error is not None else None,
+                'stopped_on_error': self.error is not None}